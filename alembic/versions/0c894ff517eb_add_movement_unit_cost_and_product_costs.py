@@ -0,0 +1,78 @@
+"""add movement unit_cost and product_costs
+
+Revision ID: 0c894ff517eb
+Revises: 9830b79f959e
+Create Date: 2026-10-21 10:26:07.418530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c894ff517eb'
+down_revision: Union[str, Sequence[str], None] = '9830b79f959e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Unit cost of IN movements (added on the partitioned parent:
+    # every partition gets the column, no row rewrite)
+    op.add_column(
+        "inventory_movements",
+        sa.Column("unit_cost", sa.Numeric(14, 4), nullable=True),
+    )
+
+    # Per-product running valuation (moving weighted-average cost),
+    # maintained by app.core.valuation as movements are posted
+    op.create_table(
+        "product_costs",
+        sa.Column(
+            "product_id",
+            sa.Integer,
+            sa.ForeignKey("products.id"),
+            primary_key=True,
+        ),
+        sa.Column("quantity", sa.Numeric(14, 4), server_default="0", nullable=False),
+        sa.Column("received_quantity", sa.Numeric(14, 4), server_default="0", nullable=False),
+        sa.Column("average_cost", sa.Numeric(14, 4), nullable=True),
+        sa.Column(
+            "stock_value",
+            sa.Numeric(18, 4),
+            sa.Computed("GREATEST(quantity, 0) * COALESCE(average_cost, 0)", persisted=True),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+    )
+
+    # Valuation listing: keyset on (stock_value DESC, product_id DESC)
+    op.create_index(
+        "ix_product_costs_stock_value_product_id",
+        "product_costs",
+        ["stock_value", "product_id"],
+    )
+
+    # Current quantities from the ledger; no historic cost is known
+    # (average_cost NULL until the first costed receipt)
+    op.execute("""
+        INSERT INTO product_costs (product_id, quantity)
+        SELECT product_id, SUM(quantity)
+        FROM inventory_movements
+        GROUP BY product_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_product_costs_stock_value_product_id", table_name="product_costs")
+    op.drop_table("product_costs")
+    op.drop_column("inventory_movements", "unit_cost")
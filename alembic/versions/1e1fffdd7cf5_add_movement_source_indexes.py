@@ -0,0 +1,130 @@
+"""add inventory_movements source and consumption movement indexes
+
+Revision ID: 1e1fffdd7cf5
+Revises: 9df7b0855d78
+Create Date: 2026-10-23 15:27:09.804126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1e1fffdd7cf5'
+down_revision: Union[str, Sequence[str], None] = '9df7b0855d78'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Movements of given orders (cancellation), and the name suffix of its
+# partition indexes
+SOURCE_INDEX = "ix_inventory_movements_source_entity_source_id"
+SOURCE_INDEX_SUFFIX = "source_idx"
+
+
+def _partitions(table: str) -> list[str]:
+    """
+    Partitions of a partitioned table (none in offline --sql mode).
+    """
+    if op.get_context().as_sql:
+        return []
+    return op.get_bind().execute(
+        sa.text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:table AS regclass) ORDER BY c.relname"
+        ),
+        {"table": table},
+    ).scalars().all()
+
+
+def _is_invalid(name: str) -> bool:
+    """
+    True when a previous CONCURRENTLY build failed and left an INVALID index.
+    """
+    if op.get_context().as_sql:
+        return False
+    return bool(
+        op.get_bind().execute(
+            sa.text(
+                "SELECT NOT i.indisvalid FROM pg_index i "
+                "JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name"
+            ),
+            {"name": name},
+        ).scalar()
+    )
+
+
+def _create_partitioned_index_concurrently(
+    name: str, suffix: str, table: str, columns: list[str], include: list[str]
+) -> None:
+    """
+    Index a partitioned table without blocking writes (autocommit block):
+    the parent index is created ON ONLY (invalid, no scan), each
+    partition indexed CONCURRENTLY and attached; the parent becomes
+    valid once every partition is attached. Partitions created later
+    inherit it. Re-runnable: attached partitions are skipped.
+    """
+    definition = f"({', '.join(columns)})"
+    if include:
+        definition += f" INCLUDE ({', '.join(include)})"
+    op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} {definition}")
+
+    attached = set()
+    if not op.get_context().as_sql:
+        attached = set(
+            op.get_bind().execute(
+                sa.text(
+                    "SELECT t.relname FROM pg_inherits i "
+                    "JOIN pg_index x ON x.indexrelid = i.inhrelid "
+                    "JOIN pg_class t ON t.oid = x.indrelid "
+                    "WHERE i.inhparent = CAST(:name AS regclass)"
+                ),
+                {"name": name},
+            ).scalars()
+        )
+    for partition in _partitions(table):
+        if partition in attached:
+            continue
+        child = f"{partition}_{suffix}"
+        if _is_invalid(child):
+            op.execute(f"DROP INDEX CONCURRENTLY {child}")
+        op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition} {definition}")
+        op.execute(f"ALTER INDEX {name} ATTACH PARTITION {child}")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Neither build blocks writes: CONCURRENTLY cannot run inside a
+    # transaction, each statement autocommits. Re-runnable.
+    with op.get_context().autocommit_block():
+        _create_partitioned_index_concurrently(
+            SOURCE_INDEX,
+            SOURCE_INDEX_SUFFIX,
+            "inventory_movements",
+            ["source_entity", "source_id"],
+            [],
+        )
+        # FIFO cost taken by given movements (cost of the goods returned)
+        if _is_invalid("ix_cost_layer_consumptions_movement_id"):
+            op.drop_index(
+                "ix_cost_layer_consumptions_movement_id",
+                table_name="cost_layer_consumptions",
+                postgresql_concurrently=True,
+            )
+        op.create_index(
+            "ix_cost_layer_consumptions_movement_id",
+            "cost_layer_consumptions",
+            ["movement_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_cost_layer_consumptions_movement_id", table_name="cost_layer_consumptions")
+    op.drop_index(SOURCE_INDEX, table_name="inventory_movements")
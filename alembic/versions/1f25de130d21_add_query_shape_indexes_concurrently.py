@@ -0,0 +1,114 @@
+"""add query shape indexes concurrently
+
+Revision ID: 1f25de130d21
+Revises: 479439d8afa5
+Create Date: 2026-10-19 17:55:21.640388
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1f25de130d21'
+down_revision: Union[str, Sequence[str], None] = '479439d8afa5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns, INCLUDE columns) — one per hot predicate:
+# equality filter first, then the keyset sort key of the list endpoint.
+#
+# order_items(order_id) / order_items(product_id) and the plain
+# inventory_movements(created_at, id) sort index already exist.
+QUERY_SHAPE_INDEXES = [
+    # Balance SUM per product (index-only with INCLUDE quantity),
+    # adjustments, movement listing filtered by product
+    (
+        "ix_inventory_movements_product_id_created_at_id",
+        "inventory_movements",
+        ["product_id", "created_at", "id"],
+        ["quantity"],
+    ),
+    # list_orders ?customer_id= / ?status=
+    ("ix_orders_customer_id_created_at_id", "orders", ["customer_id", "created_at", "id"], None),
+    ("ix_orders_status_created_at_id", "orders", ["status", "created_at", "id"], None),
+    # list_receivables ?customer_id= / ?status=
+    (
+        "ix_accounts_receivable_customer_id_created_at_id",
+        "accounts_receivable",
+        ["customer_id", "created_at", "id"],
+        None,
+    ),
+    (
+        "ix_accounts_receivable_status_created_at_id",
+        "accounts_receivable",
+        ["status", "created_at", "id"],
+        None,
+    ),
+    # list_payables ?supplier_id= / ?status=
+    (
+        "ix_accounts_payable_supplier_id_created_at_id",
+        "accounts_payable",
+        ["supplier_id", "created_at", "id"],
+        None,
+    ),
+    (
+        "ix_accounts_payable_status_created_at_id",
+        "accounts_payable",
+        ["status", "created_at", "id"],
+        None,
+    ),
+]
+
+
+def _is_invalid(name: str) -> bool:
+    """
+    True when a previous CONCURRENTLY build failed and left an INVALID index.
+    """
+    if op.get_context().as_sql:
+        # Offline (--sql) mode: nothing to inspect
+        return False
+    return bool(
+        op.get_bind().execute(
+            sa.text(
+                "SELECT NOT i.indisvalid FROM pg_index i "
+                "JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name"
+            ),
+            {"name": name},
+        ).scalar()
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY does not block writes on live tables but
+    # cannot run inside a transaction: each statement autocommits.
+    # Re-running after a failure drops the INVALID leftover and rebuilds.
+    with op.get_context().autocommit_block():
+        for name, table, columns, include in QUERY_SHAPE_INDEXES:
+            if _is_invalid(name):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_include=include or [],
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(QUERY_SHAPE_INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,67 @@
+"""add customers document_normalized
+
+Revision ID: 479439d8afa5
+Revises: dc5bcd5a685b
+Create Date: 2026-10-19 16:48:03.552917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '479439d8afa5'
+down_revision: Union[str, Sequence[str], None] = 'dc5bcd5a685b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Digits-only CPF (11) / CNPJ (14); anything else (legacy fallbacks such
+# as "NAME-123") stays NULL. Must match app.core.documents.normalize_document
+DOCUMENT_NORMALIZED_EXPRESSION = (
+    "CASE WHEN length(regexp_replace(document, '\\D', '', 'g')) IN (11, 14) "
+    "THEN regexp_replace(document, '\\D', '', 'g') END"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The same CPF/CNPJ stored in two formats would break the unique
+    # index below: fail early with the offending documents listed
+    conn = op.get_bind()
+    duplicates = conn.execute(sa.text(f"""
+        SELECT {DOCUMENT_NORMALIZED_EXPRESSION} AS doc, array_agg(id ORDER BY id)
+        FROM customers
+        GROUP BY 1
+        HAVING {DOCUMENT_NORMALIZED_EXPRESSION} IS NOT NULL AND count(*) > 1
+        LIMIT 20
+    """)).all()
+    if duplicates:
+        listing = ", ".join(f"{doc} (customer ids {ids})" for doc, ids in duplicates)
+        raise RuntimeError(
+            f"Merge duplicated customer documents before upgrading: {listing}"
+        )
+
+    op.add_column(
+        'customers',
+        sa.Column(
+            'document_normalized',
+            sa.String(length=14),
+            sa.Computed(DOCUMENT_NORMALIZED_EXPRESSION, persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        op.f('ix_customers_document_normalized'),
+        'customers',
+        ['document_normalized'],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_customers_document_normalized'), table_name='customers')
+    op.drop_column('customers', 'document_normalized')
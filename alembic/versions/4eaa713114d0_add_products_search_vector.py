@@ -0,0 +1,55 @@
+"""add products full-text search vector
+
+Revision ID: 4eaa713114d0
+Revises: 642e90c5b09b
+Create Date: 2026-10-19 14:05:12.418230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4eaa713114d0'
+down_revision: Union[str, Sequence[str], None] = '642e90c5b09b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Weighted Portuguese document: name / manufacturer code (A),
+# short name (B), description (C)
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('portuguese', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('portuguese', coalesce(manufacturer_code, '')), 'A') || "
+    "setweight(to_tsvector('portuguese', coalesce(short_name, '')), 'B') || "
+    "setweight(to_tsvector('portuguese', coalesce(description, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'products',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR_EXPRESSION, persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        'ix_products_search_vector',
+        'products',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_search_vector', table_name='products')
+    op.drop_column('products', 'search_vector')
@@ -0,0 +1,43 @@
+"""add keyset pagination indexes
+
+Revision ID: 4eb3457f1a78
+Revises: 34a437f4b30f
+Create Date: 2026-10-19 10:04:18.227391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4eb3457f1a78'
+down_revision: Union[str, Sequence[str], None] = '34a437f4b30f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns) — one per list endpoint sort key
+KEYSET_INDEXES = [
+    ("ix_orders_created_at_id", "orders", ["created_at", "id"]),
+    ("ix_products_name_id", "products", ["name", "id"]),
+    ("ix_customers_name_id", "customers", ["name", "id"]),
+    ("ix_inventory_movements_created_at_id", "inventory_movements", ["created_at", "id"]),
+    ("ix_accounts_payable_created_at_id", "accounts_payable", ["created_at", "id"]),
+    ("ix_accounts_receivable_created_at_id", "accounts_receivable", ["created_at", "id"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Composite (sort key, id) indexes serve both directions of
+    # WHERE (k, id) < (:k, :id) ORDER BY k DESC, id DESC LIMIT n
+    for name, table, columns in KEYSET_INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(KEYSET_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,50 @@
+"""scope idempotency_keys by user
+
+Revision ID: 5e2b8c41d7a9
+Revises: 1e1fffdd7cf5
+Create Date: 2026-10-24 10:04:51.277310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2b8c41d7a9'
+down_revision: Union[str, Sequence[str], None] = '1e1fffdd7cf5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing keys have no owner; they are short-lived (TTL) replay
+    # records, so they are discarded rather than guessed
+    op.execute("DELETE FROM idempotency_keys")
+
+    op.add_column(
+        "idempotency_keys",
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+    )
+    op.drop_constraint("uq_idempotency_keys_scope_key", "idempotency_keys", type_="unique")
+    op.create_unique_constraint(
+        "uq_idempotency_keys_scope_user_key",
+        "idempotency_keys",
+        ["scope", "user_id", "key"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Keys of different users may now collide on (scope, key)
+    op.execute("DELETE FROM idempotency_keys")
+
+    op.drop_constraint("uq_idempotency_keys_scope_user_key", "idempotency_keys", type_="unique")
+    op.drop_column("idempotency_keys", "user_id")
+    op.create_unique_constraint(
+        "uq_idempotency_keys_scope_key",
+        "idempotency_keys",
+        ["scope", "key"],
+    )
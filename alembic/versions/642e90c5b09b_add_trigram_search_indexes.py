@@ -0,0 +1,57 @@
+"""add pg_trgm search indexes
+
+Revision ID: 642e90c5b09b
+Revises: 4eb3457f1a78
+Create Date: 2026-10-19 11:20:37.905532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '642e90c5b09b'
+down_revision: Union[str, Sequence[str], None] = '4eb3457f1a78'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Columns searched with ILIKE '%term%' / fuzzy match by the list endpoints
+TRIGRAM_INDEXES = [
+    ("ix_products_name_trgm", "products", "name"),
+    ("ix_products_description_trgm", "products", "description"),
+    ("ix_products_code_trgm", "products", "code"),
+    ("ix_products_barcode_trgm", "products", "barcode"),
+    ("ix_products_manufacturer_code_trgm", "products", "manufacturer_code"),
+    ("ix_customers_name_trgm", "customers", "name"),
+    ("ix_customers_document_trgm", "customers", "document"),
+    ("ix_customers_email_trgm", "customers", "email"),
+    ("ix_customers_phone_trgm", "customers", "phone"),
+    ("ix_accounts_payable_source_id_trgm", "accounts_payable", "source_id"),
+    ("ix_accounts_receivable_source_id_trgm", "accounts_receivable", "source_id"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # GIN + gin_trgm_ops serves ILIKE '%term%' and the <% word-similarity
+    # operator, so free-text search no longer needs a sequential scan.
+    for name, table, column in TRIGRAM_INDEXES:
+        op.create_index(
+            name,
+            table,
+            [column],
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The extension itself is left installed (other objects may use it)
+    for name, table, _ in reversed(TRIGRAM_INDEXES):
+        op.drop_index(name, table_name=table)
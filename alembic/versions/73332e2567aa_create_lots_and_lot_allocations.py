@@ -0,0 +1,85 @@
+"""create lots and lot_allocations
+
+Revision ID: 73332e2567aa
+Revises: f494e6d60696
+Create Date: 2026-10-22 16:05:47.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '73332e2567aa'
+down_revision: Union[str, Sequence[str], None] = 'f494e6d60696'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Lots: one per NF-e rastro line received. movement_id / received_at
+    # identify the IN movement (no FK: partitioned ledger)
+    op.create_table(
+        "lots",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("product_id", sa.Integer, sa.ForeignKey("products.id"), nullable=False),
+        sa.Column("warehouse_id", sa.Integer, sa.ForeignKey("warehouses.id"), nullable=False),
+        sa.Column("lot_number", sa.String(20), nullable=False),
+        sa.Column("manufactured_on", sa.Date, nullable=True),
+        sa.Column("expires_on", sa.Date, nullable=False),
+        sa.Column("movement_id", sa.Integer, nullable=False),
+        sa.Column("received_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("quantity", sa.Numeric(14, 4), nullable=False),
+        sa.Column("remaining", sa.Numeric(14, 4), nullable=False),
+    )
+
+    # FEFO: open lots of a product in a warehouse, expiring first.
+    # Only open lots are indexed, so both indexes stay as small as the
+    # lot-tracked stock on hand
+    op.create_index(
+        "ix_lots_open_product_id_warehouse_id_expires_on_id",
+        "lots",
+        ["product_id", "warehouse_id", "expires_on", "id"],
+        postgresql_where=sa.text("remaining > 0"),
+    )
+    # Near-expiry report: open lots by expiry date
+    op.create_index(
+        "ix_lots_open_expires_on_id",
+        "lots",
+        ["expires_on", "id"],
+        postgresql_where=sa.text("remaining > 0"),
+    )
+    op.create_index("ix_lots_product_id", "lots", ["product_id"])
+
+    # What each stock decrease took from which lot
+    op.create_table(
+        "lot_allocations",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column(
+            "lot_id",
+            sa.Integer,
+            sa.ForeignKey("lots.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("product_id", sa.Integer, sa.ForeignKey("products.id"), nullable=False),
+        sa.Column("movement_id", sa.Integer, nullable=False),
+        sa.Column("movement_type", sa.String, nullable=False),
+        sa.Column("allocated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("quantity", sa.Numeric(14, 4), nullable=False),
+    )
+    op.create_index("ix_lot_allocations_lot_id", "lot_allocations", ["lot_id"])
+    op.create_index("ix_lot_allocations_movement_id", "lot_allocations", ["movement_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_lot_allocations_movement_id", table_name="lot_allocations")
+    op.drop_index("ix_lot_allocations_lot_id", table_name="lot_allocations")
+    op.drop_table("lot_allocations")
+    op.drop_index("ix_lots_product_id", table_name="lots")
+    op.drop_index("ix_lots_open_expires_on_id", table_name="lots")
+    op.drop_index("ix_lots_open_product_id_warehouse_id_expires_on_id", table_name="lots")
+    op.drop_table("lots")
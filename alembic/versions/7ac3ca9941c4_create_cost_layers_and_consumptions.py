@@ -0,0 +1,97 @@
+"""create cost_layers and cost_layer_consumptions
+
+Revision ID: 7ac3ca9941c4
+Revises: 0c894ff517eb
+Create Date: 2026-10-21 15:42:51.207663
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7ac3ca9941c4'
+down_revision: Union[str, Sequence[str], None] = '0c894ff517eb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # FIFO layers: one per costed receipt. movement_id / received_at
+    # identify the IN movement (no FK: its key is (id, occurred_at) on a
+    # partitioned table whose old months may be detached)
+    op.create_table(
+        "cost_layers",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("product_id", sa.Integer, sa.ForeignKey("products.id"), nullable=False),
+        sa.Column("movement_id", sa.Integer, nullable=False),
+        sa.Column("received_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("quantity", sa.Numeric(14, 4), nullable=False),
+        sa.Column("remaining", sa.Numeric(14, 4), nullable=False),
+        sa.Column("unit_cost", sa.Numeric(14, 4), nullable=False),
+    )
+
+    # Oldest open layer of a product: only open layers are indexed, so
+    # the index stays as small as the stock on hand
+    op.create_index(
+        "ix_cost_layers_open_product_id_id",
+        "cost_layers",
+        ["product_id", "id"],
+        postgresql_where=sa.text("remaining > 0"),
+    )
+    # Rebuild: delete every layer of a product
+    op.create_index("ix_cost_layers_product_id", "cost_layers", ["product_id"])
+
+    # What each stock decrease took from which layer (layer_id NULL:
+    # no layer left, quantity not costed)
+    op.create_table(
+        "cost_layer_consumptions",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column(
+            "layer_id",
+            sa.Integer,
+            sa.ForeignKey("cost_layers.id", ondelete="CASCADE"),
+            nullable=True,
+        ),
+        sa.Column("product_id", sa.Integer, sa.ForeignKey("products.id"), nullable=False),
+        sa.Column("movement_id", sa.Integer, nullable=False),
+        sa.Column("movement_type", sa.String, nullable=False),
+        sa.Column("consumed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("quantity", sa.Numeric(14, 4), nullable=False),
+        sa.Column("unit_cost", sa.Numeric(14, 4), nullable=True),
+    )
+
+    # COGS by period, per product (rebuild deletes by product too)
+    op.create_index(
+        "ix_cost_layer_consumptions_product_id_consumed_at",
+        "cost_layer_consumptions",
+        ["product_id", "consumed_at"],
+    )
+    op.create_index(
+        "ix_cost_layer_consumptions_consumed_at",
+        "cost_layer_consumptions",
+        ["consumed_at"],
+    )
+    op.create_index(
+        "ix_cost_layer_consumptions_layer_id",
+        "cost_layer_consumptions",
+        ["layer_id"],
+    )
+    # Layers of existing stock: scripts/maintenance/rebuild_cost_layers.py
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_cost_layer_consumptions_layer_id", table_name="cost_layer_consumptions")
+    op.drop_index("ix_cost_layer_consumptions_consumed_at", table_name="cost_layer_consumptions")
+    op.drop_index(
+        "ix_cost_layer_consumptions_product_id_consumed_at",
+        table_name="cost_layer_consumptions",
+    )
+    op.drop_table("cost_layer_consumptions")
+    op.drop_index("ix_cost_layers_product_id", table_name="cost_layers")
+    op.drop_index("ix_cost_layers_open_product_id_id", table_name="cost_layers")
+    op.drop_table("cost_layers")
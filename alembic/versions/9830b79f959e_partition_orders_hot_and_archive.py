@@ -0,0 +1,204 @@
+"""partition orders and order_items (hot / archive)
+
+Revision ID: 9830b79f959e
+Revises: 9f94f6988700
+Create Date: 2026-10-20 14:03:18.552914
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9830b79f959e'
+down_revision: Union[str, Sequence[str], None] = '9f94f6988700'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Months created ahead of today (afterwards: scripts/maintenance/manage_partitions.py)
+MONTHS_AHEAD = 3
+
+ORDER_COLUMNS = (
+    "id, external_id, customer_id, issued_at, status, total_amount, discount_amount, "
+    "created_by, notes, active, created_at, updated_at"
+)
+ITEM_COLUMNS = (
+    "id, order_id, product_id, quantity, unit_price, discount_amount, total_price, notes"
+)
+
+# (index name, table, columns) — recreated on the partitioned tables
+ORDER_INDEXES = [
+    ("ix_orders_created_at_id", "orders", ["created_at", "id"]),
+    ("ix_orders_customer_id", "orders", ["customer_id"]),
+    ("ix_orders_customer_id_created_at_id", "orders", ["customer_id", "created_at", "id"]),
+    ("ix_orders_external_id", "orders", ["external_id"]),
+    ("ix_orders_issued_at", "orders", ["issued_at"]),
+    ("ix_orders_status", "orders", ["status"]),
+    ("ix_orders_status_created_at_id", "orders", ["status", "created_at", "id"]),
+    ("ix_order_items_order_id", "order_items", ["order_id"]),
+    ("ix_order_items_product_id", "order_items", ["product_id"]),
+]
+
+
+def _add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_subpartitions(table: str, column: str, oldest: date | None) -> None:
+    """
+    {table}_hot (archived = false): monthly, oldest month -> today + MONTHS_AHEAD
+    {table}_archive (archived = true): yearly, created by the archival job
+    Both with a DEFAULT partition for dates outside the created ranges.
+    """
+    for suffix, value in (("hot", "false"), ("archive", "true")):
+        op.execute(
+            f"CREATE TABLE {table}_{suffix} PARTITION OF {table} "
+            f"FOR VALUES IN ({value}) PARTITION BY RANGE ({column})"
+        )
+        op.execute(f"CREATE TABLE {table}_{suffix}_default PARTITION OF {table}_{suffix} DEFAULT")
+
+    current = date.today().replace(day=1)
+    month = min(oldest or current, current)
+    # Legacy rows older than 10 years stay in DEFAULT (no tiny partitions)
+    month = max(month, _add_months(current, -120))
+    while month <= _add_months(current, MONTHS_AHEAD):
+        end = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE {table}_hot_{month.year:04d}_{month.month:02d} "
+            f"PARTITION OF {table}_hot "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        month = end
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # -----------------------------------------------------------------
+    # 1) Move the current tables out of the way (data kept for the copy)
+    # -----------------------------------------------------------------
+    op.execute("ALTER TABLE order_items DROP CONSTRAINT order_items_order_id_fkey")
+    for table in ("orders", "order_items"):
+        op.rename_table(table, f"{table}_old")
+        op.execute(f"ALTER TABLE {table}_old RENAME CONSTRAINT {table}_pkey TO {table}_old_pkey")
+    for name, _, _ in ORDER_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+
+    # -----------------------------------------------------------------
+    # 2) orders: LIST (archived) -> RANGE (issued_at)
+    #    Partition keys must be part of the primary key; the existing
+    #    id sequence is kept (ids stay unique and growing).
+    # -----------------------------------------------------------------
+    op.execute("""
+        CREATE TABLE orders (
+            LIKE orders_old INCLUDING DEFAULTS INCLUDING COMMENTS,
+            archived BOOLEAN NOT NULL DEFAULT false,
+            CONSTRAINT orders_pkey PRIMARY KEY (id, archived, issued_at),
+            CONSTRAINT orders_customer_id_fkey FOREIGN KEY (customer_id) REFERENCES customers (id),
+            CONSTRAINT orders_created_by_fkey FOREIGN KEY (created_by) REFERENCES users (id)
+        ) PARTITION BY LIST (archived)
+    """)
+    op.execute("COMMENT ON COLUMN orders.archived IS 'Moved to the cold (archive) partitions'")
+    op.execute("ALTER SEQUENCE orders_id_seq OWNED BY orders.id")
+
+    # -----------------------------------------------------------------
+    # 3) order_items: co-partitioned with its order (same keys, copied
+    #    from the header). The composite FK cascades archival moves
+    #    (cross-partition UPDATE of the order) to the items.
+    # -----------------------------------------------------------------
+    op.execute("""
+        CREATE TABLE order_items (
+            LIKE order_items_old INCLUDING DEFAULTS INCLUDING COMMENTS,
+            order_issued_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            archived BOOLEAN NOT NULL DEFAULT false,
+            CONSTRAINT order_items_pkey PRIMARY KEY (id, archived, order_issued_at),
+            CONSTRAINT order_items_order_id_fkey FOREIGN KEY (order_id, archived, order_issued_at)
+                REFERENCES orders (id, archived, issued_at)
+                ON UPDATE CASCADE,
+            CONSTRAINT order_items_product_id_fkey FOREIGN KEY (product_id) REFERENCES products (id)
+        ) PARTITION BY LIST (archived)
+    """)
+    op.execute("COMMENT ON COLUMN order_items.order_issued_at IS 'Copy of orders.issued_at (partition key)'")
+    op.execute("COMMENT ON COLUMN order_items.archived IS 'Copy of orders.archived (partition key)'")
+    op.execute("ALTER SEQUENCE order_items_id_seq OWNED BY order_items.id")
+
+    # -----------------------------------------------------------------
+    # 4) Partitions: monthly hot from the oldest order, archive empty
+    # -----------------------------------------------------------------
+    oldest = None
+    if not op.get_context().as_sql:
+        oldest = op.get_bind().execute(sa.text(
+            "SELECT date_trunc('month', min(issued_at))::date FROM orders_old"
+        )).scalar()
+
+    _create_subpartitions("orders", "issued_at", oldest)
+    _create_subpartitions("order_items", "order_issued_at", oldest)
+
+    for name, table, columns in ORDER_INDEXES:
+        op.create_index(name, table, columns)
+
+    # -----------------------------------------------------------------
+    # 5) Copy rows (all hot) and drop the old tables
+    # -----------------------------------------------------------------
+    op.execute(f"""
+        INSERT INTO orders ({ORDER_COLUMNS}, archived)
+        SELECT {ORDER_COLUMNS}, false
+        FROM orders_old
+    """)
+    op.execute(f"""
+        INSERT INTO order_items ({ITEM_COLUMNS}, order_issued_at, archived)
+        SELECT {', '.join('i.' + c.strip() for c in ITEM_COLUMNS.split(','))}, o.issued_at, false
+        FROM order_items_old i
+        JOIN orders_old o ON o.id = i.order_id
+    """)
+    op.drop_table("order_items_old")
+    op.drop_table("orders_old")
+    op.execute("ANALYZE orders")
+    op.execute("ANALYZE order_items")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, _, _ in ORDER_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    for table in ("orders", "order_items"):
+        op.rename_table(table, f"{table}_partitioned")
+        op.execute(
+            f"ALTER TABLE {table}_partitioned RENAME CONSTRAINT {table}_pkey TO {table}_partitioned_pkey"
+        )
+
+    op.execute("""
+        CREATE TABLE orders (
+            LIKE orders_partitioned INCLUDING DEFAULTS INCLUDING COMMENTS,
+            CONSTRAINT orders_pkey PRIMARY KEY (id),
+            CONSTRAINT orders_customer_id_fkey FOREIGN KEY (customer_id) REFERENCES customers (id),
+            CONSTRAINT orders_created_by_fkey FOREIGN KEY (created_by) REFERENCES users (id)
+        )
+    """)
+    op.drop_column("orders", "archived")
+    op.execute("ALTER SEQUENCE orders_id_seq OWNED BY orders.id")
+
+    op.execute("""
+        CREATE TABLE order_items (
+            LIKE order_items_partitioned INCLUDING DEFAULTS INCLUDING COMMENTS,
+            CONSTRAINT order_items_pkey PRIMARY KEY (id),
+            CONSTRAINT order_items_order_id_fkey FOREIGN KEY (order_id)
+                REFERENCES orders (id) ON DELETE CASCADE,
+            CONSTRAINT order_items_product_id_fkey FOREIGN KEY (product_id) REFERENCES products (id)
+        )
+    """)
+    op.drop_column("order_items", "order_issued_at")
+    op.drop_column("order_items", "archived")
+    op.execute("ALTER SEQUENCE order_items_id_seq OWNED BY order_items.id")
+
+    op.execute(f"INSERT INTO orders ({ORDER_COLUMNS}) SELECT {ORDER_COLUMNS} FROM orders_partitioned")
+    op.execute(f"INSERT INTO order_items ({ITEM_COLUMNS}) SELECT {ITEM_COLUMNS} FROM order_items_partitioned")
+    op.drop_table("order_items_partitioned")
+    op.drop_table("orders_partitioned")
+
+    for name, table, columns in ORDER_INDEXES:
+        op.create_index(name, table, columns)
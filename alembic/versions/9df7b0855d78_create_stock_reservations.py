@@ -0,0 +1,66 @@
+"""create stock_reservations and warehouse_balances.reserved
+
+Revision ID: 9df7b0855d78
+Revises: 73332e2567aa
+Create Date: 2026-10-23 10:12:36.540917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9df7b0855d78'
+down_revision: Union[str, Sequence[str], None] = '73332e2567aa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Reserved counter next to the on-hand projection (available to
+    # promise = quantity - reserved); constant default, no rewrite
+    op.add_column(
+        "warehouse_balances",
+        sa.Column("reserved", sa.Numeric(14, 4), server_default="0", nullable=False),
+    )
+
+    # One reservation per DRAFT / OPEN order line. order_id /
+    # order_item_id: no FK (partitioned orders, composite keys)
+    op.create_table(
+        "stock_reservations",
+        sa.Column("id", sa.BigInteger, primary_key=True),
+        sa.Column("order_id", sa.BigInteger, nullable=False),
+        sa.Column("order_item_id", sa.BigInteger, nullable=False),
+        sa.Column("product_id", sa.Integer, sa.ForeignKey("products.id"), nullable=False),
+        sa.Column("warehouse_id", sa.Integer, sa.ForeignKey("warehouses.id"), nullable=False),
+        sa.Column("quantity", sa.Numeric(14, 4), nullable=False),
+        sa.Column("status", sa.String(20), server_default="ACTIVE", nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("closed_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_stock_reservations_order_id", "stock_reservations", ["order_id"])
+    # Sweeper: oldest active reservations past their TTL (partial:
+    # closed reservations leave the index)
+    op.create_index(
+        "ix_stock_reservations_active_expires_at_id",
+        "stock_reservations",
+        ["expires_at", "id"],
+        postgresql_where=sa.text("status = 'ACTIVE'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_stock_reservations_active_expires_at_id", table_name="stock_reservations")
+    op.drop_index("ix_stock_reservations_order_id", table_name="stock_reservations")
+    op.drop_table("stock_reservations")
+    op.drop_column("warehouse_balances", "reserved")
@@ -0,0 +1,168 @@
+"""partition inventory_movements by month
+
+Revision ID: 9f94f6988700
+Revises: 1f25de130d21
+Create Date: 2026-10-20 09:12:44.301577
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f94f6988700'
+down_revision: Union[str, Sequence[str], None] = '1f25de130d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Months created ahead of today (afterwards: scripts/maintenance/manage_partitions.py)
+MONTHS_AHEAD = 3
+
+# Old (non-partitioned) indexes, renamed out of the way during the copy
+OLD_INDEXES = [
+    "inventory_movements_pkey",
+    "ix_inventory_movements_created_at_id",
+    "ix_inventory_movements_product_id_created_at_id",
+]
+
+# Indexes of the partitioned table (created on every partition)
+PARTITIONED_INDEXES = [
+    # list_inventory_movements: keyset on (occurred_at, id), pruned by date
+    ("ix_inventory_movements_occurred_at_id", ["occurred_at", "id"], None),
+    # audit order / created_at filters
+    ("ix_inventory_movements_created_at_id", ["created_at", "id"], None),
+    # balance SUM per product (index-only), movement listing by product
+    (
+        "ix_inventory_movements_product_id_occurred_at_id",
+        ["product_id", "occurred_at", "id"],
+        ["quantity"],
+    ),
+]
+
+
+def _add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _month_partition(start: date) -> None:
+    end = _add_months(start, 1)
+    op.execute(
+        f"CREATE TABLE inventory_movements_{start.year:04d}_{start.month:02d} "
+        f"PARTITION OF inventory_movements "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # -----------------------------------------------------------------
+    # 1) Move the current table out of the way (data kept for the copy)
+    # -----------------------------------------------------------------
+    op.rename_table("inventory_movements", "inventory_movements_old")
+    for name in OLD_INDEXES:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name}_old")
+
+    # -----------------------------------------------------------------
+    # 2) Partitioned table: RANGE (occurred_at), monthly partitions.
+    #    The partition key must be part of the primary key.
+    #    The existing id sequence is kept (ids stay unique and growing).
+    # -----------------------------------------------------------------
+    op.execute("""
+        CREATE TABLE inventory_movements (
+            id INTEGER NOT NULL DEFAULT nextval('inventory_movements_id_seq'),
+            product_id INTEGER NOT NULL
+                CONSTRAINT inventory_movements_product_id_fkey REFERENCES products (id),
+            movement_type VARCHAR NOT NULL,
+            quantity NUMERIC(14, 4) NOT NULL,
+            occurred_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            source_entity VARCHAR NOT NULL,
+            source_id VARCHAR NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            CONSTRAINT inventory_movements_pkey PRIMARY KEY (id, occurred_at)
+        ) PARTITION BY RANGE (occurred_at)
+    """)
+    op.execute("ALTER SEQUENCE inventory_movements_id_seq OWNED BY inventory_movements.id")
+
+    for name, columns, include in PARTITIONED_INDEXES:
+        op.create_index(name, "inventory_movements", columns, postgresql_include=include or [])
+
+    # -----------------------------------------------------------------
+    # 3) One partition per month from the oldest movement to today +
+    #    MONTHS_AHEAD; anything else (bad legacy dates) goes to DEFAULT
+    # -----------------------------------------------------------------
+    conn = op.get_bind()
+    oldest = None
+    if not op.get_context().as_sql:
+        oldest = conn.execute(sa.text(
+            "SELECT date_trunc('month', min(occurred_at))::date FROM inventory_movements_old"
+        )).scalar()
+
+    current = date.today().replace(day=1)
+    month = min(oldest or current, current)
+    # Legacy rows older than 10 years stay in DEFAULT (no tiny partitions)
+    month = max(month, _add_months(current, -120))
+    while month <= _add_months(current, MONTHS_AHEAD):
+        _month_partition(month)
+        month = _add_months(month, 1)
+
+    op.execute("CREATE TABLE inventory_movements_default PARTITION OF inventory_movements DEFAULT")
+
+    # -----------------------------------------------------------------
+    # 4) Copy rows (routed to their partitions) and drop the old table
+    # -----------------------------------------------------------------
+    op.execute("""
+        INSERT INTO inventory_movements (
+            id, product_id, movement_type, quantity, occurred_at,
+            source_entity, source_id, created_at
+        )
+        SELECT
+            id, product_id, movement_type, quantity, occurred_at,
+            source_entity, source_id, created_at
+        FROM inventory_movements_old
+    """)
+    op.drop_table("inventory_movements_old")
+    op.execute("ANALYZE inventory_movements")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.rename_table("inventory_movements", "inventory_movements_partitioned")
+    op.execute("ALTER TABLE inventory_movements_partitioned RENAME CONSTRAINT inventory_movements_pkey TO inventory_movements_partitioned_pkey")
+    for name, _, _ in PARTITIONED_INDEXES:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name}_partitioned")
+
+    op.execute("""
+        CREATE TABLE inventory_movements (
+            id INTEGER NOT NULL DEFAULT nextval('inventory_movements_id_seq'),
+            product_id INTEGER NOT NULL
+                CONSTRAINT inventory_movements_product_id_fkey REFERENCES products (id),
+            movement_type VARCHAR NOT NULL,
+            quantity NUMERIC(14, 4) NOT NULL,
+            occurred_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            source_entity VARCHAR NOT NULL,
+            source_id VARCHAR NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            CONSTRAINT inventory_movements_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute("ALTER SEQUENCE inventory_movements_id_seq OWNED BY inventory_movements.id")
+    op.execute("""
+        INSERT INTO inventory_movements
+        SELECT id, product_id, movement_type, quantity, occurred_at,
+               source_entity, source_id, created_at
+        FROM inventory_movements_partitioned
+    """)
+    op.drop_table("inventory_movements_partitioned")
+
+    op.create_index("ix_inventory_movements_created_at_id", "inventory_movements", ["created_at", "id"])
+    op.create_index(
+        "ix_inventory_movements_product_id_created_at_id",
+        "inventory_movements",
+        ["product_id", "created_at", "id"],
+        postgresql_include=["quantity"],
+    )
@@ -0,0 +1,31 @@
+"""add global search lookup indexes
+
+Revision ID: dc5bcd5a685b
+Revises: 4eaa713114d0
+Create Date: 2026-10-19 15:32:48.107264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dc5bcd5a685b'
+down_revision: Union[str, Sequence[str], None] = '4eaa713114d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Exact lookups by GET /api/v1/search (EAN and legacy order id)
+    op.create_index(op.f('ix_products_barcode'), 'products', ['barcode'], unique=False)
+    op.create_index(op.f('ix_orders_external_id'), 'orders', ['external_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_orders_external_id'), table_name='orders')
+    op.drop_index(op.f('ix_products_barcode'), table_name='products')
@@ -0,0 +1,226 @@
+"""add warehouses and warehouse_balances
+
+Revision ID: f494e6d60696
+Revises: 7ac3ca9941c4
+Create Date: 2026-10-22 09:31:14.662815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f494e6d60696'
+down_revision: Union[str, Sequence[str], None] = '7ac3ca9941c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Ledger index per location (balance / history of a product in one
+# warehouse, index-only), and the name suffix of its partition indexes
+WAREHOUSE_INDEX = "ix_inventory_movements_warehouse_id_product_id_occurred_at_id"
+WAREHOUSE_INDEX_SUFFIX = "warehouse_product_idx"
+WAREHOUSE_FK = "inventory_movements_warehouse_id_fkey"
+
+
+def _partitions(table: str) -> list[str]:
+    """
+    Partitions of a partitioned table (none in offline --sql mode).
+    """
+    if op.get_context().as_sql:
+        return []
+    return op.get_bind().execute(
+        sa.text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:table AS regclass) ORDER BY c.relname"
+        ),
+        {"table": table},
+    ).scalars().all()
+
+
+def _exists(kind: str, name: str, table: str | None = None) -> bool:
+    """
+    True when a relation (kind "relation") or a constraint of `table`
+    (kind "constraint") exists: re-runs skip finished steps.
+    """
+    if op.get_context().as_sql:
+        return False
+    if kind == "relation":
+        query, params = "SELECT to_regclass(:name) IS NOT NULL", {"name": name}
+    else:
+        query = (
+            "SELECT EXISTS (SELECT 1 FROM pg_constraint "
+            "WHERE conname = :name AND conrelid = CAST(:table AS regclass))"
+        )
+        params = {"name": name, "table": table}
+    return bool(op.get_bind().execute(sa.text(query), params).scalar())
+
+
+def _is_invalid(name: str) -> bool:
+    """
+    True when a previous CONCURRENTLY build failed and left an INVALID index.
+    """
+    if op.get_context().as_sql:
+        return False
+    return bool(
+        op.get_bind().execute(
+            sa.text(
+                "SELECT NOT i.indisvalid FROM pg_index i "
+                "JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name"
+            ),
+            {"name": name},
+        ).scalar()
+    )
+
+
+def _create_partitioned_index_concurrently(
+    name: str, suffix: str, table: str, columns: list[str], include: list[str]
+) -> None:
+    """
+    Index a partitioned table without blocking writes (autocommit block):
+    the parent index is created ON ONLY (invalid, no scan), each
+    partition indexed CONCURRENTLY and attached; the parent becomes
+    valid once every partition is attached. Partitions created later
+    inherit it. Re-runnable: attached partitions are skipped.
+    """
+    definition = f"({', '.join(columns)})"
+    if include:
+        definition += f" INCLUDE ({', '.join(include)})"
+    op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} {definition}")
+
+    attached = set()
+    if not op.get_context().as_sql:
+        attached = set(
+            op.get_bind().execute(
+                sa.text(
+                    "SELECT t.relname FROM pg_inherits i "
+                    "JOIN pg_index x ON x.indexrelid = i.inhrelid "
+                    "JOIN pg_class t ON t.oid = x.indrelid "
+                    "WHERE i.inhparent = CAST(:name AS regclass)"
+                ),
+                {"name": name},
+            ).scalars()
+        )
+    for partition in _partitions(table):
+        if partition in attached:
+            continue
+        child = f"{partition}_{suffix}"
+        if _is_invalid(child):
+            op.execute(f"DROP INDEX CONCURRENTLY {child}")
+        op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition} {definition}")
+        op.execute(f"ALTER INDEX {name} ATTACH PARTITION {child}")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Steps 1-3 are transactional; step 4 runs in an autocommit block
+    # (it commits them first). A re-run after a failure in step 4 skips
+    # straight to it.
+    if not _exists("relation", "warehouse_balances"):
+        _create_warehouses()
+
+    # -----------------------------------------------------------------
+    # 4) Ledger FK and index without locking the ledger against writes:
+    #    NOT VALID + VALIDATE per partition (a partitioned table cannot
+    #    take a NOT VALID FK), then the parent FK adopts the validated
+    #    ones (no scan); index per partition CONCURRENTLY, attached
+    # -----------------------------------------------------------------
+    with op.get_context().autocommit_block():
+        for partition in _partitions("inventory_movements"):
+            if not _exists("constraint", WAREHOUSE_FK, partition):
+                op.execute(
+                    f"ALTER TABLE {partition} ADD CONSTRAINT {WAREHOUSE_FK} "
+                    "FOREIGN KEY (warehouse_id) REFERENCES warehouses (id) NOT VALID"
+                )
+            op.execute(f"ALTER TABLE {partition} VALIDATE CONSTRAINT {WAREHOUSE_FK}")
+        if not _exists("constraint", WAREHOUSE_FK, "inventory_movements"):
+            op.execute(
+                f"ALTER TABLE inventory_movements ADD CONSTRAINT {WAREHOUSE_FK} "
+                "FOREIGN KEY (warehouse_id) REFERENCES warehouses (id)"
+            )
+
+        _create_partitioned_index_concurrently(
+            WAREHOUSE_INDEX,
+            WAREHOUSE_INDEX_SUFFIX,
+            "inventory_movements",
+            ["warehouse_id", "product_id", "occurred_at", "id"],
+            ["quantity"],
+        )
+
+
+def _create_warehouses() -> None:
+    """
+    Steps 1-3 of upgrade() (transactional).
+    """
+    # -----------------------------------------------------------------
+    # 1) Warehouses (stock locations); id 1 = existing single location
+    # -----------------------------------------------------------------
+    op.create_table(
+        "warehouses",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("code", sa.String(20), nullable=False, unique=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("active", sa.Boolean, server_default=sa.true(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+    )
+    op.execute("INSERT INTO warehouses (id, code, name) VALUES (1, 'MAIN', 'Main warehouse')")
+    op.execute("SELECT setval('warehouses_id_seq', (SELECT max(id) FROM warehouses))")
+
+    # -----------------------------------------------------------------
+    # 2) Ledger dimension: constant default (no row rewrite), every
+    #    existing movement belongs to the main warehouse (FK and
+    #    index: step 4)
+    # -----------------------------------------------------------------
+    op.add_column(
+        "inventory_movements",
+        sa.Column("warehouse_id", sa.Integer, server_default="1", nullable=False),
+    )
+
+    # -----------------------------------------------------------------
+    # 3) Per-(product, warehouse) balance projection, kept by
+    #    post_movements; filled from the ledger
+    # -----------------------------------------------------------------
+    op.create_table(
+        "warehouse_balances",
+        sa.Column("product_id", sa.Integer, sa.ForeignKey("products.id"), nullable=False),
+        sa.Column("warehouse_id", sa.Integer, sa.ForeignKey("warehouses.id"), nullable=False),
+        sa.Column("quantity", sa.Numeric(14, 4), server_default="0", nullable=False),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("product_id", "warehouse_id"),
+    )
+    # Stock of one warehouse (listing by product)
+    op.create_index(
+        "ix_warehouse_balances_warehouse_id_product_id",
+        "warehouse_balances",
+        ["warehouse_id", "product_id"],
+        postgresql_include=["quantity"],
+    )
+    op.execute("""
+        INSERT INTO warehouse_balances (product_id, warehouse_id, quantity)
+        SELECT product_id, warehouse_id, SUM(quantity)
+        FROM inventory_movements
+        GROUP BY product_id, warehouse_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_warehouse_balances_warehouse_id_product_id", table_name="warehouse_balances")
+    op.drop_table("warehouse_balances")
+    op.drop_index(WAREHOUSE_INDEX, table_name="inventory_movements")
+    op.drop_column("inventory_movements", "warehouse_id")
+    op.drop_table("warehouses")
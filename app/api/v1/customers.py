@@ -1,12 +1,14 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import or_
 
 from app.core.deps import get_db
 from app.core.security import get_current_user
 from app.core.audit import log_action
+from app.core.pagination import paginate
+from app.core.search import fuzzy_filter, fuzzy_rank
+from app.core.documents import normalize_document, find_by_document
 
 from app.models.customer import Customer
 from app.models.user import User
@@ -81,12 +83,14 @@ def create_customer(
 # ---------------------------------------------------------------------------
 @router.get("", response_model=List[CustomerOut])
 def list_customers(
+    response: Response,
     search: Optional[str] = Query(
         None, description="Busca livre por nome, documento, email ou telefone"
     ),
     active: Optional[bool] = Query(None),
     type: Optional[str] = Query(None),
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
@@ -95,25 +99,27 @@ def list_customers(
     Retrieve a list of customers.
 
     - Supports:
-        - Free text search (name, document, email, phone)
+        - Free text search (name, document, email, phone),
+          trigram-indexed, results ranked by similarity
+        - A full CPF/CNPJ (any format) is an exact indexed lookup
         - Filtering by active status
         - Filtering by customer type
-    - Uses pagination (skip & limit)
+    - Keyset pagination on (name, id); next cursor in X-Next-Cursor
+      (skip is a deprecated offset fallback)
     """
 
     query = db.query(Customer)
 
-    # Free search (UX-driven)
-    if search:
-        like = f"%{search}%"
-        query = query.filter(
-            or_(
-                Customer.name.ilike(like),
-                Customer.document.ilike(like),
-                Customer.email.ilike(like),
-                Customer.phone.ilike(like),
-            )
-        )
+    # Free search (UX-driven, trigram-indexed)
+    rank = None
+    document = normalize_document(search)
+    if document:
+        # Complete CPF/CNPJ: exact match on the normalized unique index
+        query = query.filter(Customer.document_normalized == document)
+    elif search:
+        search_columns = [Customer.name, Customer.document, Customer.email, Customer.phone]
+        query = query.filter(fuzzy_filter(search_columns, search))
+        rank = fuzzy_rank(search_columns, search)
 
     # Business filters
     if active is not None:
@@ -122,7 +128,62 @@ def list_customers(
     if type is not None:
         query = query.filter(Customer.type == type)
 
-    return query.offset(skip).limit(limit).all()
+    if rank is None:
+        return paginate(
+            query,
+            [Customer.name, Customer.id],
+            cursor=cursor,
+            skip=skip,
+            limit=limit,
+            response=response,
+        )
+
+    # Search: best matches first, keyset on (rank, id)
+    rows = paginate(
+        query.add_columns(rank.label("search_rank")),
+        [rank, Customer.id],
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
+        response=response,
+        descending=True,
+        row_keys=lambda row: (row.search_rank, row[0].id),
+    )
+    return [customer for customer, _ in rows]
+
+
+# ---------------------------------------------------------------------------
+# READ (BY DOCUMENT)
+# ---------------------------------------------------------------------------
+# Exact CPF/CNPJ lookup, any format:
+# - GET /api/v1/customers/by-document/12345678000190
+# - GET /api/v1/customers/by-document/12.345.678%2F0001-90
+#
+# Declared before /{customer_id}.
+# ---------------------------------------------------------------------------
+@router.get("/by-document/{document:path}", response_model=CustomerOut)
+def get_customer_by_document(
+    document: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Retrieve a customer / supplier by CPF or CNPJ.
+
+    - Punctuation is ignored (uses the document_normalized index)
+    - Raises 422 if the value is not an 11 or 14 digit document
+    - Raises 404 if not found
+    """
+
+    if normalize_document(document) is None:
+        raise HTTPException(status_code=422, detail="Invalid CPF/CNPJ")
+
+    customer = find_by_document(db, document)
+
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
+
+    return customer
 
 
 # ---------------------------------------------------------------------------
@@ -172,6 +233,15 @@ def update_customer(
 
     updates = payload.dict(exclude_unset=True)
 
+    # Same CPF/CNPJ in another format is still a duplicate
+    if updates.get("document"):
+        other = find_by_document(db, updates["document"])
+        if other is not None and other.id != customer.id:
+            raise HTTPException(
+                status_code=409,
+                detail="Customer with this document already exists"
+            )
+
     for field, value in updates.items():
         setattr(customer, field, value)
 
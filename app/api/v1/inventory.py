@@ -1,16 +1,59 @@
 # app/api/v1/inventory.py
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+import csv
+import io
+import json
+import uuid
+import zlib
+from decimal import Decimal, InvalidOperation
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import Date, DateTime, Numeric, case, cast, func, literal_column, or_, select
 from datetime import datetime, timezone
 
+from app.core.database import SessionLocal
 from app.core.deps import get_db
+from app.core.audit import log_action
+from app.core.inventory import (
+    DEFAULT_WAREHOUSE_ID,
+    lock_products_exclusive,
+    post_movements,
+    stock_balance,
+    stock_balances,
+)
+from app.core.pagination import paginate
+from app.core.reservations import reserved_quantities
+from app.core.search import substring_filter
+from app.core.security import get_current_user
+from app.models.cost_layer_consumption import CostLayerConsumption
 from app.models.inventory_movement import InventoryMovement
+from app.models.lot import Lot
+from app.models.product_cost import ProductCost
+from app.models.user import User
+from app.models.warehouse import Warehouse
+from app.models.warehouse_balance import WarehouseBalance
+from app.api.v1.schemas_inventory import (
+    InventoryBalancesRequest,
+    InventoryBalancesResponse,
+    InventoryCountLine,
+    InventoryCogsResponse,
+    InventoryCountReport,
+    InventoryTransferCreate,
+    InventoryTransferResponse,
+    InventoryValuationResponse,
+    ExpiringLot,
+    LotOut,
+    StockHistoryResponse,
+    WarehouseCreate,
+    WarehouseOut,
+    WarehouseStock,
+)
 
-from datetime import date
-from typing import Optional
-from sqlalchemy import or_
+from datetime import date, timedelta
+from typing import List, Optional
 from app.models.product import Product
 
 # Router for inventory-related endpoints
@@ -23,19 +66,29 @@ router = APIRouter(
 @router.get("/product/{product_id}")
 def get_stock_balance(
     product_id: int,
+    warehouse_id: Optional[int] = Query(None, description="Balance in one warehouse (default: all)"),
     db: Session = Depends(get_db),
 ):
     """
     Read-only stock balance for a single product.
 
-    Stock is computed as the sum of inventory movements.
+    Stock is computed as the sum of inventory movements; the balance in
+    one warehouse is read from the per-location projection (PK lookup).
+    available (to promise) = balance - reserved, the reserved quantity
+    coming from the counters kept next to the projection.
     """
 
-    balance = (
-        db.query(func.coalesce(func.sum(InventoryMovement.quantity), 0))
-        .filter(InventoryMovement.product_id == product_id)
-        .scalar()
-    )
+    if warehouse_id is None:
+        balance = stock_balance(db, product_id)
+        reserved = reserved_quantities(db, [product_id])[product_id]
+    else:
+        row = db.execute(
+            select(WarehouseBalance.quantity, WarehouseBalance.reserved).where(
+                WarehouseBalance.product_id == product_id,
+                WarehouseBalance.warehouse_id == warehouse_id,
+            )
+        ).first()
+        balance, reserved = row if row else (0, 0)
 
     product = db.query(Product).get(product_id)
 
@@ -43,47 +96,597 @@ def get_stock_balance(
         "product_id": product_id,
         "product_name": product.name if product else None,
         "manufacturer_code": product.manufacturer_code if product else None,
+        "warehouse_id": warehouse_id,
         "balance": balance,
+        "reserved": reserved,
+        "available": balance - reserved,
+    }
+
+
+# Stock of a product in every warehouse
+@router.get("/product/{product_id}/warehouses", response_model=List[WarehouseStock])
+def get_stock_by_warehouse(
+    product_id: int,
+    db: Session = Depends(get_db),
+):
+    """
+    Balance of one product per warehouse (active warehouses, zero
+    included), from the per-location projection.
+    """
+
+    rows = db.execute(
+        select(
+            Warehouse.id,
+            Warehouse.code,
+            Warehouse.name,
+            func.coalesce(WarehouseBalance.quantity, 0).label("balance"),
+            func.coalesce(WarehouseBalance.reserved, 0).label("reserved"),
+        )
+        .outerjoin(
+            WarehouseBalance,
+            (WarehouseBalance.warehouse_id == Warehouse.id)
+            & (WarehouseBalance.product_id == product_id),
+        )
+        .where(Warehouse.active.is_(True))
+        .order_by(Warehouse.id)
+    ).all()
+
+    return [
+        {
+            "warehouse_id": row.id,
+            "code": row.code,
+            "name": row.name,
+            "balance": row.balance,
+            "reserved": row.reserved,
+            "available": row.balance - row.reserved,
+        }
+        for row in rows
+    ]
+
+
+# Open lots of a product (allocation order)
+@router.get("/product/{product_id}/lots", response_model=List[LotOut])
+def get_product_lots(
+    product_id: int,
+    warehouse_id: int = Query(DEFAULT_WAREHOUSE_ID),
+    db: Session = Depends(get_db),
+):
+    """
+    Lot-level stock of one product in one warehouse: its open lots in
+    the order stock decreases take them (earliest expiry first).
+
+    Range on the FEFO index (ix_lots_open_product_id_warehouse_id_expires_on_id).
+    """
+
+    return db.execute(
+        select(Lot)
+        .where(
+            Lot.product_id == product_id,
+            Lot.warehouse_id == warehouse_id,
+            Lot.remaining > 0,
+        )
+        .order_by(Lot.expires_on, Lot.id)
+    ).scalars().all()
+
+
+
+# ---------------------------------------------------------------------------
+# Stock history (time series for charts)
+# ---------------------------------------------------------------------------
+# ONE query: the movements since date_from are summed per bucket, the
+# buckets generated with generate_series and the balances accumulated
+# with a window SUM over them. The opening balance is the current
+# balance (projection, PK lookup) minus the movements since date_from:
+# only the partitions from date_from on are read.
+# ---------------------------------------------------------------------------
+HISTORY_MAX_POINTS = 1000
+
+
+def _bucket_count(date_from: date, date_to: date, bucket: str) -> int:
+    if bucket == "day":
+        return (date_to - date_from).days + 1
+    if bucket == "week":
+        return ((date_to - date_from).days + date_from.weekday()) // 7 + 1
+    return (date_to.year - date_from.year) * 12 + date_to.month - date_from.month + 1
+
+
+@router.get("/product/{product_id}/history", response_model=StockHistoryResponse)
+def get_stock_history(
+    product_id: int,
+    date_from: Optional[date] = Query(None, alias="from", description="Default: one year before `to`"),
+    date_to: Optional[date] = Query(None, alias="to", description="Inclusive; default: today"),
+    bucket: str = Query("day", pattern="^(day|week|month)$", description="day, week or month"),
+    warehouse_id: Optional[int] = Query(None, description="Stock in one warehouse (default: all)"),
+    db: Session = Depends(get_db),
+):
+    """
+    Stock of a product at the end of each day / week / month of a period.
+
+    Buckets start on their calendar boundary (weeks on Monday), so the
+    first one may start before `from`; movements before `from` are in
+    the opening balance.
+    """
+
+    if db.get(Product, product_id) is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    date_to = date_to or datetime.now(timezone.utc).date()
+    date_from = date_from or date_to - timedelta(days=365)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="from must be before to")
+    if _bucket_count(date_from, date_to, bucket) > HISTORY_MAX_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many points (max {HISTORY_MAX_POINTS}): use a shorter period or a larger bucket",
+        )
+
+    # Movements since date_from per bucket; the ones after date_to are
+    # grouped apart (NULL bucket: in the opening balance only)
+    bucket_start = case(
+        (
+            InventoryMovement.occurred_at < date_to + timedelta(days=1),
+            cast(func.date_trunc(bucket, InventoryMovement.occurred_at), Date),
+        ),
+    )
+    deltas = (
+        select(
+            bucket_start.label("bucket"),
+            func.sum(InventoryMovement.quantity).label("quantity"),
+        )
+        .where(
+            InventoryMovement.product_id == product_id,
+            InventoryMovement.occurred_at >= date_from,
+        )
+        .group_by(bucket_start)
+    )
+    current = select(func.coalesce(func.sum(WarehouseBalance.quantity), 0)).where(
+        WarehouseBalance.product_id == product_id
+    )
+    if warehouse_id is not None:
+        deltas = deltas.where(InventoryMovement.warehouse_id == warehouse_id)
+        current = current.where(WarehouseBalance.warehouse_id == warehouse_id)
+    deltas = deltas.cte("deltas")
+
+    opening = (
+        current.scalar_subquery()
+        - select(func.coalesce(func.sum(deltas.c.quantity), 0)).scalar_subquery()
+    )
+    series = select(
+        cast(
+            func.generate_series(
+                func.date_trunc(bucket, cast(date_from, DateTime)),
+                cast(date_to, DateTime),
+                literal_column(f"interval '1 {bucket}'"),
+            ),
+            Date,
+        ).label("bucket")
+    ).cte("series")
+
+    rows = db.execute(
+        select(
+            series.c.bucket,
+            opening.label("opening"),
+            (
+                opening
+                + func.sum(func.coalesce(deltas.c.quantity, 0)).over(order_by=series.c.bucket)
+            ).label("balance"),
+        )
+        .select_from(series.outerjoin(deltas, deltas.c.bucket == series.c.bucket))
+        .order_by(series.c.bucket)
+    ).all()
+
+    opening_balance = rows[0].opening if rows else Decimal(0)
+    return {
+        "product_id": product_id,
+        "warehouse_id": warehouse_id,
+        "bucket": bucket,
+        "date_from": date_from,
+        "date_to": date_to,
+        "opening_balance": opening_balance,
+        "closing_balance": rows[-1].balance if rows else opening_balance,
+        "points": [(row.bucket, row.balance) for row in rows],
     }
 
 
+# ---------------------------------------------------------------------------
+# Bulk stock balances (order entry / purchasing screens)
+# ---------------------------------------------------------------------------
+BALANCES_MAX_PRODUCTS = 1000
+
+
+@router.post("/balances", response_model=InventoryBalancesResponse)
+def get_stock_balances(
+    payload: InventoryBalancesRequest,
+    db: Session = Depends(get_db),
+):
+    """
+    Stock balances of many products in ONE grouped query.
+
+    Products are matched by id, code or barcode (indexed) and their
+    movements summed through the per-product ledger index, so the cost
+    grows with the number of products asked for, not with the catalog.
+    With warehouse_id, balances are read from the per-location
+    projection instead (one PK lookup per product). Reserved quantities
+    come from the counters next to the projection (available to promise
+    = balance - reserved).
+    """
+
+    ids = set(payload.product_ids)
+    codes = {code.strip() for code in payload.codes if code.strip()}
+    barcodes = {barcode.strip() for barcode in payload.barcodes if barcode.strip()}
+
+    requested = len(ids) + len(codes) + len(barcodes)
+    if requested == 0:
+        raise HTTPException(status_code=400, detail="No products requested")
+    if requested > BALANCES_MAX_PRODUCTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many products (max {BALANCES_MAX_PRODUCTS} per request)",
+        )
+
+    matches = []
+    if ids:
+        matches.append(Product.id.in_(ids))
+    if codes:
+        matches.append(Product.code.in_(codes))
+    if barcodes:
+        matches.append(Product.barcode.in_(barcodes))
+
+    columns = [
+        Product.id,
+        Product.code,
+        Product.barcode,
+        Product.name,
+        Product.manufacturer_code,
+    ]
+    if payload.warehouse_id is None:
+        reserved = (
+            select(func.coalesce(func.sum(WarehouseBalance.reserved), 0))
+            .where(WarehouseBalance.product_id == Product.id)
+            .scalar_subquery()
+        )
+        query = (
+            select(
+                *columns,
+                func.coalesce(func.sum(InventoryMovement.quantity), 0).label("balance"),
+                reserved.label("reserved"),
+            )
+            .outerjoin(InventoryMovement, InventoryMovement.product_id == Product.id)
+            .group_by(Product.id)
+        )
+    else:
+        query = select(
+            *columns,
+            func.coalesce(WarehouseBalance.quantity, 0).label("balance"),
+            func.coalesce(WarehouseBalance.reserved, 0).label("reserved"),
+        ).outerjoin(
+            WarehouseBalance,
+            (WarehouseBalance.product_id == Product.id)
+            & (WarehouseBalance.warehouse_id == payload.warehouse_id),
+        )
+
+    rows = db.execute(query.where(or_(*matches)).order_by(Product.id)).all()
+
+    return {
+        "balances": [
+            {
+                "product_id": row.id,
+                "code": row.code,
+                "barcode": row.barcode,
+                "name": row.name,
+                "manufacturer_code": row.manufacturer_code,
+                "balance": row.balance,
+                "reserved": row.reserved,
+                "available": row.balance - row.reserved,
+            }
+            for row in rows
+        ],
+        "not_found": {
+            "product_ids": sorted(ids - {row.id for row in rows}),
+            "codes": sorted(codes - {row.code for row in rows}),
+            "barcodes": sorted(barcodes - {row.barcode for row in rows}),
+        },
+    }
+
+
+# ---------------------------------------------------------------------------
+# Inventory valuation (moving weighted-average cost)
+# ---------------------------------------------------------------------------
+@router.get("/valuation", response_model=InventoryValuationResponse)
+def get_inventory_valuation(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """
+    Value of the stock on hand, total and per product.
+
+    Reads product_costs (one row per product, kept up to date as
+    movements are posted): the ledger is never replayed.
+
+    - Totals: ONE aggregate over product_costs
+    - Products: keyset on (stock_value, product_id) descending
+      (index ix_product_costs_stock_value_product_id)
+    """
+
+    totals = db.execute(
+        select(
+            func.coalesce(func.sum(ProductCost.stock_value), 0).label("total_value"),
+            func.coalesce(
+                func.sum(func.greatest(ProductCost.quantity, 0)), 0
+            ).label("total_quantity"),
+            func.count().filter(ProductCost.stock_value > 0).label("valued_products"),
+            func.count().filter(
+                ProductCost.quantity > 0, ProductCost.average_cost.is_(None)
+            ).label("uncosted_products"),
+        )
+    ).one()
+
+    query = (
+        db.query(
+            ProductCost.product_id,
+            Product.code,
+            Product.name,
+            ProductCost.quantity,
+            ProductCost.average_cost,
+            ProductCost.stock_value,
+        )
+        .join(Product, Product.id == ProductCost.product_id)
+        .filter(ProductCost.stock_value > 0)
+    )
+
+    rows = paginate(
+        query,
+        [ProductCost.stock_value, ProductCost.product_id],
+        cursor=cursor,
+        skip=0,
+        limit=limit,
+        response=response,
+        descending=True,
+    )
+
+    return {
+        "total_value": totals.total_value,
+        "total_quantity": totals.total_quantity,
+        "valued_products": totals.valued_products,
+        "uncosted_products": totals.uncosted_products,
+        "products": [
+            {
+                "product_id": row.product_id,
+                "code": row.code,
+                "name": row.name,
+                "quantity": row.quantity,
+                "average_cost": row.average_cost,
+                "stock_value": row.stock_value,
+            }
+            for row in rows
+        ],
+    }
+
+
+
+# ---------------------------------------------------------------------------
+# Cost of goods sold (FIFO layers)
+# ---------------------------------------------------------------------------
+@router.get("/cogs", response_model=InventoryCogsResponse)
+def get_cost_of_goods_sold(
+    response: Response,
+    date_from: Optional[date] = Query(None, description="Default: first day of the current month"),
+    date_to: Optional[date] = Query(None, description="Inclusive; default: today"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """
+    FIFO cost of goods sold over a period, total and per product.
+
+    Sums the layer consumptions of OUT movements (recorded when the
+    order was posted, see app.core.cost_layers): the ledger is not
+    replayed. Range on consumed_at (index).
+    """
+
+    today = datetime.now(timezone.utc).date()
+    date_to = date_to or today
+    date_from = date_from or date_to.replace(day=1)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must be before date_to")
+
+    in_period = (
+        CostLayerConsumption.movement_type == "OUT",
+        CostLayerConsumption.consumed_at >= date_from,
+        CostLayerConsumption.consumed_at < date_to + timedelta(days=1),
+    )
+    cost = func.coalesce(
+        cast(func.sum(CostLayerConsumption.quantity * CostLayerConsumption.unit_cost), Numeric(18, 4)),
+        0,
+    )
+    uncosted = func.coalesce(
+        func.sum(CostLayerConsumption.quantity).filter(CostLayerConsumption.unit_cost.is_(None)), 0
+    )
+
+    totals = db.execute(
+        select(
+            cost.label("total_cost"),
+            func.coalesce(func.sum(CostLayerConsumption.quantity), 0).label("total_quantity"),
+            uncosted.label("uncosted_quantity"),
+        ).where(*in_period)
+    ).one()
+
+    query = (
+        db.query(
+            CostLayerConsumption.product_id,
+            Product.code,
+            Product.name,
+            func.sum(CostLayerConsumption.quantity).label("quantity"),
+            cost.label("cost"),
+            uncosted.label("uncosted_quantity"),
+        )
+        .join(Product, Product.id == CostLayerConsumption.product_id)
+        .filter(*in_period)
+        .group_by(CostLayerConsumption.product_id, Product.code, Product.name)
+    )
+
+    rows = paginate(
+        query,
+        [CostLayerConsumption.product_id],
+        cursor=cursor,
+        skip=0,
+        limit=limit,
+        response=response,
+    )
+
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "total_cost": totals.total_cost,
+        "total_quantity": totals.total_quantity,
+        "uncosted_quantity": totals.uncosted_quantity,
+        "products": [
+            {
+                "product_id": row.product_id,
+                "code": row.code,
+                "name": row.name,
+                "quantity": row.quantity,
+                "cost": row.cost,
+                "uncosted_quantity": row.uncosted_quantity,
+            }
+            for row in rows
+        ],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Near-expiry report (open lots)
+# ---------------------------------------------------------------------------
+@router.get("/lots/expiring", response_model=List[ExpiringLot])
+def list_expiring_lots(
+    response: Response,
+    days: int = Query(30, ge=0, le=3650, description="Expiring within N days (expired lots included)"),
+    warehouse_id: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """
+    Open lots expiring on or before today + `days`, earliest first.
+
+    - Range on the partial index ix_lots_open_expires_on_id (open lots
+      only: consumed lots never reach the report)
+    - Keyset on (expires_on, id), next page in X-Next-Cursor
+    """
+
+    today = date.today()
+    query = (
+        db.query(Lot, Product.code, Product.name)
+        .join(Product, Product.id == Lot.product_id)
+        .filter(Lot.remaining > 0, Lot.expires_on <= today + timedelta(days=days))
+    )
+    if warehouse_id is not None:
+        query = query.filter(Lot.warehouse_id == warehouse_id)
+
+    rows = paginate(
+        query,
+        [Lot.expires_on, Lot.id],
+        cursor=cursor,
+        skip=0,
+        limit=limit,
+        response=response,
+        row_keys=lambda row: (row.Lot.expires_on, row.Lot.id),
+    )
+
+    return [
+        {
+            **LotOut.model_validate(lot).model_dump(),
+            "code": code,
+            "name": name,
+            "days_left": (lot.expires_on - today).days,
+        }
+        for lot, code, name in rows
+    ]
+
+
 
 # Inventory Stock Listing Endpoint
 @router.get("/")
 def list_stock(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(20, ge=1, le=100),
+    below: Optional[Decimal] = Query(None, description="Only products with balance below this value"),
+    active: Optional[bool] = Query(None, description="Filter by product active flag"),
+    warehouse_id: Optional[int] = Query(None, description="Stock of one warehouse (default: all)"),
     db: Session = Depends(get_db),
 ):
     """
-    List current stock balance for all products.
+    List current stock balance for all products (zero stock included).
 
     Stock is computed, never stored.
+
+    - Pages over products with a keyset on (name, id) (index ix_products_name_id)
+    - The balance is a correlated subquery: Postgres only evaluates it
+      for the products of the page (per-product ledger index), never
+      for the whole movement table
+    - below= evaluates the balance while walking the keyset, until the
+      page is full
+    - warehouse_id= reads the per-location projection instead (PK
+      lookup per product)
     """
 
-    rows = (
-        db.query(
-            Product.id,
-            Product.name,
-            Product.manufacturer_code,
-            func.coalesce(func.sum(InventoryMovement.quantity), 0).label("balance"),
+    if warehouse_id is None:
+        balance = (
+            select(func.coalesce(func.sum(InventoryMovement.quantity), 0))
+            .where(InventoryMovement.product_id == Product.id)
+            .correlate(Product)
+            .scalar_subquery()
+        )
+    else:
+        balance = func.coalesce(
+            select(WarehouseBalance.quantity)
+            .where(
+                WarehouseBalance.product_id == Product.id,
+                WarehouseBalance.warehouse_id == warehouse_id,
+            )
+            .correlate(Product)
+            .scalar_subquery(),
+            0,
         )
-        .join(InventoryMovement, InventoryMovement.product_id == Product.id)
-        .group_by(Product.id, Product.name, Product.manufacturer_code)
-        .order_by(Product.name)
-        .offset(skip)
-        .limit(limit)
-        .all()
+
+    query = db.query(
+        Product.id,
+        Product.code,
+        Product.name,
+        Product.manufacturer_code,
+        Product.active,
+        balance.label("balance"),
+    )
+
+    if active is not None:
+        query = query.filter(Product.active.is_(active))
+
+    if below is not None:
+        query = query.filter(balance < below)
+
+    rows = paginate(
+        query,
+        [Product.name, Product.id],
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
+        response=response,
     )
 
     return [
         {
-            "product_id": product_id,
-            "product_name": name,
-            "manufacturer_code": manufacturer_code,
-            "balance": balance,
+            "product_id": row.id,
+            "code": row.code,
+            "product_name": row.name,
+            "manufacturer_code": row.manufacturer_code,
+            "active": row.active,
+            "balance": row.balance,
         }
-        for product_id, name, manufacturer_code, balance in rows
+        for row in rows
     ]
 
 
@@ -93,16 +696,19 @@ def list_stock(
 # ---------------------------------------------------------------------------
 @router.get("/movements")
 def list_inventory_movements(
+    response: Response,
     search: Optional[str] = Query(
         None, description="Search by product name, code or barcode"
     ),
     product_id: Optional[int] = Query(None),
+    warehouse_id: Optional[int] = Query(None),
     movement_type: Optional[str] = Query(
-        None, description="IN, OUT or ADJUST"
+        None, description="IN, OUT, ADJUST or TRANSFER"
     ),
     date_from: Optional[date] = Query(None),
     date_to: Optional[date] = Query(None),
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_db),
 ):
@@ -111,6 +717,9 @@ def list_inventory_movements(
 
     This endpoint returns raw inventory movements.
     It does NOT calculate stock balances.
+
+    date_from / date_to (inclusive) filter on occurred_at, the partition
+    key: only the monthly partitions in range are scanned.
     """
 
     # Explicitly select both entities (no ORM relationship required)
@@ -119,15 +728,12 @@ def list_inventory_movements(
         .join(Product, Product.id == InventoryMovement.product_id)
     )
 
-    # Free text search on product fields (UX-driven)
+    # Free text search on product fields (substring, trigram-indexed)
     if search:
-        like = f"%{search}%"
         query = query.filter(
-            or_(
-                Product.name.ilike(like),
-                Product.code.ilike(like),
-                Product.barcode.ilike(like),
-                Product.manufacturer_code.ilike(like),
+            substring_filter(
+                [Product.name, Product.code, Product.barcode, Product.manufacturer_code],
+                search,
             )
         )
 
@@ -135,29 +741,43 @@ def list_inventory_movements(
     if product_id is not None:
         query = query.filter(InventoryMovement.product_id == product_id)
 
-    # Filter by movement type (IN / OUT / ADJUST)
+    # Filter by stock location
+    if warehouse_id is not None:
+        query = query.filter(InventoryMovement.warehouse_id == warehouse_id)
+
+    # Filter by movement type (IN / OUT / ADJUST / TRANSFER)
     if movement_type is not None:
         query = query.filter(InventoryMovement.movement_type == movement_type)
 
-    # Date range filters
+    # Date range filters (partition pruning on occurred_at)
     if date_from is not None:
-        query = query.filter(InventoryMovement.created_at >= date_from)
+        query = query.filter(InventoryMovement.occurred_at >= date_from)
 
     if date_to is not None:
-        query = query.filter(InventoryMovement.created_at <= date_to)
+        query = query.filter(InventoryMovement.occurred_at < date_to + timedelta(days=1))
 
-    # Order by most recent movements first
-    query = query.order_by(InventoryMovement.created_at.desc())
-
-    rows = query.offset(skip).limit(limit).all()
+    # Most recent movements first, keyset on (occurred_at, id):
+    # the newest partition is read first and older ones only if needed
+    rows = paginate(
+        query,
+        [InventoryMovement.occurred_at, InventoryMovement.id],
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
+        response=response,
+        descending=True,
+        row_keys=lambda row: (row[0].occurred_at, row[0].id),
+    )
 
     # Shape response explicitly for frontend consumption
     return [
         {
             "id": m.id,
             "date": m.created_at,
+            "occurred_at": m.occurred_at,
             "movement_type": m.movement_type,
             "quantity": m.quantity,
+            "warehouse_id": m.warehouse_id,
             "product": {
                 "id": p.id,
                 "name": p.name,
@@ -169,6 +789,174 @@ def list_inventory_movements(
     ]
 
 
+# ---------------------------------------------------------------------------
+# EXPORT Inventory Movements (streaming CSV / NDJSON)
+# ---------------------------------------------------------------------------
+# Rows read from a server-side cursor (yield_per) and written to the
+# response as they arrive: memory stays constant for any ledger size.
+# ---------------------------------------------------------------------------
+
+# Rows fetched from the server-side cursor per round trip
+EXPORT_FETCH_SIZE = 5000
+
+EXPORT_COLUMNS = (
+    "id",
+    "occurred_at",
+    "created_at",
+    "product_id",
+    "product_code",
+    "product_name",
+    "warehouse_id",
+    "movement_type",
+    "quantity",
+    "unit_cost",
+    "source_entity",
+    "source_id",
+)
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _export_value(value):
+    """
+    JSON-safe value (decimals as strings, no precision lost).
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _export_lines(query, fmt: str):
+    """
+    Encode the export rows as CSV / NDJSON, one chunk per fetch.
+
+    Runs in its own session: the request session is closed before the
+    response body is sent.
+    """
+    db = SessionLocal()
+    try:
+        # Repeatable read: one snapshot for the whole export
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        result = db.execute(query.execution_options(yield_per=EXPORT_FETCH_SIZE))
+
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            for rows in result.partitions():
+                writer.writerows(rows)
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue().encode("utf-8")
+        else:
+            for rows in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(EXPORT_COLUMNS, map(_export_value, row)))) + "\n"
+                    for row in rows
+                ).encode("utf-8")
+    finally:
+        db.close()
+
+
+def _gzip_chunks(chunks):
+    """
+    Gzip a stream of chunks on the fly (gzip framing: wbits=31).
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@router.get("/movements/export")
+def export_inventory_movements(
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="csv or ndjson"),
+    gzip: bool = Query(False, description="Gzip-compress the file"),
+    product_id: Optional[int] = Query(None),
+    warehouse_id: Optional[int] = Query(None),
+    movement_type: Optional[str] = Query(
+        None, description="IN, OUT, ADJUST or TRANSFER"
+    ),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+):
+    """
+    Export the inventory ledger (audit), oldest movement first.
+
+    Unlike GET /movements there is no page size: every matching row is
+    streamed. date_from / date_to (inclusive) prune the monthly
+    partitions; the export is one consistent snapshot.
+    """
+    query = (
+        select(
+            InventoryMovement.id,
+            InventoryMovement.occurred_at,
+            InventoryMovement.created_at,
+            InventoryMovement.product_id,
+            Product.code,
+            Product.name,
+            InventoryMovement.warehouse_id,
+            InventoryMovement.movement_type,
+            InventoryMovement.quantity,
+            InventoryMovement.unit_cost,
+            InventoryMovement.source_entity,
+            InventoryMovement.source_id,
+        )
+        .join(Product, Product.id == InventoryMovement.product_id)
+        .order_by(InventoryMovement.occurred_at, InventoryMovement.id)
+    )
+
+    if product_id is not None:
+        query = query.where(InventoryMovement.product_id == product_id)
+
+    if warehouse_id is not None:
+        query = query.where(InventoryMovement.warehouse_id == warehouse_id)
+
+    if movement_type is not None:
+        query = query.where(InventoryMovement.movement_type == movement_type)
+
+    if date_from is not None:
+        query = query.where(InventoryMovement.occurred_at >= date_from)
+
+    if date_to is not None:
+        query = query.where(InventoryMovement.occurred_at < date_to + timedelta(days=1))
+
+    body = _export_lines(query, format)
+    filename = f"inventory_movements.{format}"
+    media_type = EXPORT_MEDIA_TYPES[format]
+
+    # A .gz file to download (not a transfer encoding the client would undo)
+    if gzip:
+        body = _gzip_chunks(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _get_warehouse(db: Session, warehouse_id: int, active: bool = False) -> Warehouse:
+    """
+    Load a warehouse or fail with 400 (optionally requiring it active).
+    """
+    warehouse = db.get(Warehouse, warehouse_id)
+    if warehouse is None or (active and not warehouse.active):
+        raise HTTPException(status_code=400, detail=f"Invalid warehouse_id: {warehouse_id}")
+    return warehouse
+
+
 # ---------------------------------------------------------------------------
 # CREATE Inventory Manual Adjustment
 # ---------------------------------------------------------------------------
@@ -176,6 +964,7 @@ def list_inventory_movements(
 def create_inventory_adjustment(
     product_id: int,
     counted_quantity: int,
+    warehouse_id: int = DEFAULT_WAREHOUSE_ID,
     db: Session = Depends(get_db),
 ):
     """
@@ -184,38 +973,411 @@ def create_inventory_adjustment(
     The user provides the REAL counted stock.
     The backend calculates the delta and stores it
     as an ADJUST inventory movement.
+
+    The product is locked exclusively first: order / purchase writes of
+    the same product wait (or are waited for), so the delta is computed
+    against the balance it is applied to.
     """
 
-    # 1. Calculate current stock (source of truth)
-    current_stock = (
-        db.query(func.coalesce(func.sum(InventoryMovement.quantity), 0))
-        .filter(InventoryMovement.product_id == product_id)
-        .scalar()
-    )
+    _get_warehouse(db, warehouse_id)
+
+    # 0. Serialize with other writers of this product (until commit)
+    lock_products_exclusive(db, [product_id])
+
+    # 1. Calculate current stock in the counted warehouse (source of truth)
+    current_stock = stock_balance(db, product_id, warehouse_id)
 
     # 2. Calculate delta (difference between counted and current)
     delta = counted_quantity - current_stock
 
-    # 3. Create adjustment movement (no direct stock update)
-    movement = InventoryMovement(
-        product_id=product_id,
-        quantity=delta,
-        movement_type="ADJUST",
-        occurred_at=datetime.now(timezone.utc),
-        source_entity="MANUAL_ADJUSTMENT",
-        source_id=f"MANUAL_{datetime.now(timezone.utc).isoformat()}",
+    # 3. Create adjustment movement (no direct stock update;
+    #    product_costs follows in the same transaction)
+    adjusted_at = datetime.now(timezone.utc)
+    [movement_id] = post_movements(
+        db,
+        [
+            {
+                "product_id": product_id,
+                "quantity": delta,
+                "movement_type": "ADJUST",
+                "warehouse_id": warehouse_id,
+                "occurred_at": adjusted_at,
+                "source_entity": "MANUAL_ADJUSTMENT",
+                "source_id": f"MANUAL_{adjusted_at.isoformat()}",
+            }
+        ],
     )
-
-    db.add(movement)
     db.commit()
-    db.refresh(movement)
 
     # 4. Return clear result for UI
     return {
         "product_id": product_id,
+        "warehouse_id": warehouse_id,
         "previous_stock": current_stock,
         "counted_stock": counted_quantity,
         "adjustment": delta,
-        "movement_id": movement.id,
+        "movement_id": movement_id,
     }
 
+
+
+# ---------------------------------------------------------------------------
+# Physical inventory count sessions (bulk adjustments)
+# ---------------------------------------------------------------------------
+# One session = one transaction, whatever the number of lines:
+#
+#   1) products resolved by code / barcode     ONE query
+#   2) products locked exclusively             ONE statement (sorted ids)
+#   3) current balances                        ONE grouped query
+#   4) ADJUST movements (variance != 0)        ONE multi-row INSERT
+#
+# Movements are traceable as source_entity="INVENTORY_COUNT",
+# source_id=<session_id>.
+# ---------------------------------------------------------------------------
+COUNT_MAX_LINES = 50_000
+COUNT_SOURCE_ENTITY = "INVENTORY_COUNT"
+
+# Accepted CSV headers (case-insensitive)
+COUNT_PRODUCT_COLUMNS = ("product", "code", "barcode", "ean")
+COUNT_QUANTITY_COLUMNS = ("counted_quantity", "counted", "quantity", "qty")
+
+
+def _resolve_products(db: Session, keys: set[str]) -> tuple[dict, dict]:
+    """
+    Map each key to a product (code first, then barcode) in ONE query.
+    Returns (resolved key -> product row, unresolved key -> reason).
+    """
+    rows = db.execute(
+        select(Product.id, Product.code, Product.barcode, Product.name)
+        .where(or_(Product.code.in_(keys), Product.barcode.in_(keys)))
+    ).all()
+
+    by_code = {row.code: row for row in rows}
+    by_barcode: dict[str, list] = {}
+    for row in rows:
+        if row.barcode in keys:
+            by_barcode.setdefault(row.barcode, []).append(row)
+
+    resolved, unresolved = {}, {}
+    for key in keys:
+        if key in by_code:
+            resolved[key] = by_code[key]
+        elif len(by_barcode.get(key, [])) == 1:
+            resolved[key] = by_barcode[key][0]
+        elif key in by_barcode:
+            unresolved[key] = "Barcode shared by several products"
+        else:
+            unresolved[key] = "Product not found"
+    return resolved, unresolved
+
+
+def _apply_count(
+    db: Session,
+    lines: list[InventoryCountLine],
+    dry_run: bool,
+    warehouse_id: int,
+) -> dict:
+    _get_warehouse(db, warehouse_id)
+    if not lines:
+        raise HTTPException(status_code=400, detail="No lines to count")
+    if len(lines) > COUNT_MAX_LINES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many lines (max {COUNT_MAX_LINES} per session)",
+        )
+
+    # Same product on several lines (shelves / bins): summed
+    counted_by_key: dict[str, Decimal] = {}
+    for line in lines:
+        key = line.product.strip()
+        counted_by_key[key] = counted_by_key.get(key, Decimal(0)) + line.counted_quantity
+
+    resolved, unresolved = _resolve_products(db, set(counted_by_key))
+
+    counted: dict[int, Decimal] = {}
+    products = {}
+    for key, row in resolved.items():
+        counted[row.id] = counted.get(row.id, Decimal(0)) + counted_by_key[key]
+        products[row.id] = row
+
+    # Balances read under the exclusive lock: no order / purchase
+    # movement of these products can commit in between
+    lock_products_exclusive(db, counted)
+    balances = stock_balances(db, counted, warehouse_id)
+
+    session_id = uuid.uuid4().hex
+    counted_at = datetime.now(timezone.utc)
+
+    variances = [
+        {
+            "product_id": product_id,
+            "code": products[product_id].code,
+            "name": products[product_id].name,
+            "previous_stock": balances[product_id],
+            "counted_quantity": quantity,
+            "variance": quantity - balances[product_id],
+        }
+        for product_id, quantity in counted.items()
+    ]
+    to_post = [v for v in variances if v["variance"] != 0]
+
+    if not dry_run:
+        movement_ids = post_movements(
+            db,
+            [
+                {
+                    "product_id": v["product_id"],
+                    "movement_type": "ADJUST",
+                    "quantity": v["variance"],
+                    "warehouse_id": warehouse_id,
+                    "occurred_at": counted_at,
+                    "source_entity": COUNT_SOURCE_ENTITY,
+                    "source_id": session_id,
+                }
+                for v in to_post
+            ],
+        )
+        for variance, movement_id in zip(to_post, movement_ids):
+            variance["movement_id"] = movement_id
+        db.commit()
+    else:
+        db.rollback()  # releases the locks
+
+    variances.sort(key=lambda v: (-abs(v["variance"]), v["code"]))
+
+    return {
+        "session_id": session_id,
+        "dry_run": dry_run,
+        "warehouse_id": warehouse_id,
+        "counted_at": counted_at,
+        "lines": len(lines),
+        "products": len(variances),
+        "adjusted": len(to_post),
+        "total_variance": sum((v["variance"] for v in variances), Decimal(0)),
+        "variances": variances,
+        "unresolved": [
+            {"product": key, "reason": reason}
+            for key, reason in sorted(unresolved.items())
+        ],
+    }
+
+
+def _read_count_csv(file: UploadFile) -> list[InventoryCountLine]:
+    """
+    Parse an uploaded count CSV line by line (never loaded whole).
+
+    - Header required: a product column (product / code / barcode / ean)
+      and a quantity column (counted_quantity / counted / quantity / qty)
+    - "," or ";" separated; with ";" a decimal comma is accepted
+    """
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    header = stream.readline()
+    delimiter = ";" if header.count(";") > header.count(",") else ","
+    columns = [name.strip().lower() for name in next(csv.reader([header], delimiter=delimiter), [])]
+
+    product_col = next((columns.index(c) for c in COUNT_PRODUCT_COLUMNS if c in columns), None)
+    quantity_col = next((columns.index(c) for c in COUNT_QUANTITY_COLUMNS if c in columns), None)
+    if product_col is None or quantity_col is None:
+        raise HTTPException(
+            status_code=400,
+            detail="CSV header must have a product (code/barcode) and a counted quantity column",
+        )
+
+    lines = []
+    for number, record in enumerate(csv.reader(stream, delimiter=delimiter), start=2):
+        if not any(field.strip() for field in record):
+            continue
+        if len(lines) >= COUNT_MAX_LINES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many lines (max {COUNT_MAX_LINES} per session)",
+            )
+        try:
+            raw = record[quantity_col].strip()
+            if delimiter == ";":
+                raw = raw.replace(".", "").replace(",", ".") if "," in raw else raw
+            lines.append(
+                InventoryCountLine(
+                    product=record[product_col].strip(),
+                    counted_quantity=Decimal(raw),
+                )
+            )
+        except (IndexError, InvalidOperation, ValueError):
+            raise HTTPException(status_code=400, detail=f"Invalid CSV line {number}")
+
+    return lines
+
+
+# JSON count session
+@router.post("/counts", response_model=InventoryCountReport)
+def create_inventory_count(
+    lines: List[InventoryCountLine],
+    dry_run: bool = Query(False, description="Only report variances, post nothing"),
+    warehouse_id: int = Query(DEFAULT_WAREHOUSE_ID, description="Counted warehouse"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Post a physical count for many products at once (JSON array).
+
+    Each counted product gets ONE ADJUST movement (counted - current);
+    products whose count matches the ledger get none.
+    Returns the variance report of the session.
+    """
+    return _apply_count(db, lines, dry_run, warehouse_id)
+
+
+# CSV count session
+@router.post("/counts/upload", response_model=InventoryCountReport)
+def upload_inventory_count(
+    file: UploadFile = File(...),
+    dry_run: bool = Query(False, description="Only report variances, post nothing"),
+    warehouse_id: int = Query(DEFAULT_WAREHOUSE_ID, description="Counted warehouse"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Post a physical count from a CSV file (collector / spreadsheet export).
+
+    Same processing and report as POST /counts.
+    """
+    return _apply_count(db, _read_count_csv(file), dry_run, warehouse_id)
+
+
+
+# ---------------------------------------------------------------------------
+# Warehouses (stock locations)
+# ---------------------------------------------------------------------------
+@router.get("/warehouses", response_model=List[WarehouseOut])
+def list_warehouses(
+    active: Optional[bool] = Query(None, description="Filter by active flag"),
+    db: Session = Depends(get_db),
+):
+    """
+    List stock locations (few rows: not paginated).
+    """
+    query = db.query(Warehouse)
+    if active is not None:
+        query = query.filter(Warehouse.active.is_(active))
+    return query.order_by(Warehouse.id).all()
+
+
+@router.post("/warehouses", response_model=WarehouseOut, status_code=201)
+def create_warehouse(
+    payload: WarehouseCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Create a stock location. Its balances start empty (no movements).
+    """
+    warehouse = Warehouse(code=payload.code.strip().upper(), name=payload.name.strip())
+    try:
+        db.add(warehouse)
+        db.flush()
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Warehouse with this code already exists")
+
+    log_action(
+        db=db,
+        user_id=current_user.id,
+        action="CREATE_WAREHOUSE",
+        resource="warehouse",
+        resource_id=warehouse.id,
+    )
+    return warehouse
+
+
+# ---------------------------------------------------------------------------
+# Transfers between warehouses
+# ---------------------------------------------------------------------------
+# One transfer = one transaction: per product a TRANSFER movement out of
+# the source (negative) and one into the destination (positive), same
+# source_id. Company-wide stock, valuation and FIFO layers are unchanged.
+# ---------------------------------------------------------------------------
+TRANSFER_SOURCE_ENTITY = "TRANSFER"
+
+
+@router.post("/transfers", response_model=InventoryTransferResponse, status_code=201)
+def create_inventory_transfer(
+    payload: InventoryTransferCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Move stock from one warehouse to another.
+
+    The products are locked exclusively (like a stock count) and the
+    source balances checked: a transfer never takes more than the source
+    warehouse holds (409 with the shortfalls).
+    """
+
+    if payload.from_warehouse_id == payload.to_warehouse_id:
+        raise HTTPException(status_code=400, detail="Source and destination warehouses must differ")
+    _get_warehouse(db, payload.from_warehouse_id, active=True)
+    _get_warehouse(db, payload.to_warehouse_id, active=True)
+
+    # Same product on several lines: summed
+    quantities: dict[int, Decimal] = {}
+    for line in payload.lines:
+        quantities[line.product_id] = quantities.get(line.product_id, Decimal(0)) + line.quantity
+
+    known_products = set(
+        db.execute(select(Product.id).where(Product.id.in_(quantities))).scalars()
+    )
+    missing = sorted(set(quantities) - known_products)
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid product_id: {', '.join(map(str, missing))}",
+        )
+
+    # Source balances read under the exclusive lock
+    lock_products_exclusive(db, quantities)
+    available = stock_balances(db, quantities, payload.from_warehouse_id)
+    shortfalls = [
+        {"product_id": product_id, "requested": str(quantity), "available": str(available[product_id])}
+        for product_id, quantity in sorted(quantities.items())
+        if quantity > available[product_id]
+    ]
+    if shortfalls:
+        db.rollback()  # releases the locks
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Insufficient stock in the source warehouse", "shortfalls": shortfalls},
+        )
+
+    transfer_id = uuid.uuid4().hex
+    transferred_at = datetime.now(timezone.utc)
+    movement_ids = post_movements(
+        db,
+        [
+            {
+                "product_id": product_id,
+                "movement_type": "TRANSFER",
+                "quantity": sign * quantity,
+                "warehouse_id": warehouse_id,
+                "occurred_at": transferred_at,
+                "source_entity": TRANSFER_SOURCE_ENTITY,
+                "source_id": transfer_id,
+            }
+            for product_id, quantity in sorted(quantities.items())
+            for sign, warehouse_id in (
+                (-1, payload.from_warehouse_id),
+                (1, payload.to_warehouse_id),
+            )
+        ],
+    )
+
+    db.commit()
+
+    return {
+        "transfer_id": transfer_id,
+        "from_warehouse_id": payload.from_warehouse_id,
+        "to_warehouse_id": payload.to_warehouse_id,
+        "occurred_at": transferred_at,
+        "lines": len(quantities),
+        "movement_ids": movement_ids,
+    }
@@ -1,19 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import or_
+from sqlalchemy import insert, select, func
 from datetime import datetime
 
 from app.core.deps import get_db
 from app.models.order import Order
 from app.models.order_item import OrderItem
-from app.models.inventory_movement import InventoryMovement
-from app.api.v1.schemas import OrderCreate, OrderResponse, OrderUpdate
+from app.models.product import Product
+from app.api.v1.schemas import (
+    OrderCreate,
+    OrderResponse,
+    OrderUpdate,
+    OrderBulkResponse,
+    OrderCancelRequest,
+    OrderCancelResponse,
+    OrderListItem,
+)
 from app.core.security import require_min_role
 from app.models.user import User
 from app.core.audit import log_action
+from app.core import idempotency
+from app.core.cancellation import cancel_orders
+from app.core.inventory import DEFAULT_WAREHOUSE_ID, lock_products_shared, post_movements
+from app.core.pagination import paginate
+from app.core.reservations import RESERVING_STATUSES, consume_reservations, reserve
+from app.core.search import substring_filter
 from app.models.customer import Customer
 from app.models.account_receivable import AccountReceivable
+from app.models.warehouse import Warehouse
 
 # router = APIRouter(prefix="/orders", tags=["Orders"])
 
@@ -48,10 +63,13 @@ from app.models.user import User
 # ---------------------------------------------------------------------------
 # Order Listing Endpoint with Flexible Filters (READ-ONLY)
 # ---------------------------------------------------------------------------
-@router.get("/", response_model=list[OrderResponse])
+@router.get("/", response_model=list[OrderListItem])
 def list_orders(
-    # Pagination
-    skip: int = Query(0, ge=0),
+    response: Response,
+
+    # Pagination (keyset; skip is a deprecated offset fallback)
+    cursor: str | None = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(20, ge=1, le=100),
 
     # Optional filters (technical)
@@ -63,6 +81,12 @@ def list_orders(
     # UX-driven free search
     customer_search: str | None = Query(None),
 
+    # Items are NOT part of the list read-model unless asked for
+    include_items: bool = Query(False, description="Also return the items of each order"),
+
+    # Hot (working set) partitions unless the archive is asked for
+    archived: bool = Query(False, description="List archived (cold) orders instead"),
+
     db: Session = Depends(get_db),
     current_user: User = Depends(require_min_role(10)),
 ):
@@ -71,21 +95,61 @@ def list_orders(
 
     Design principles:
     - Domain models are NOT mutated
-    - Response is enriched explicitly (read-model)
-    - relationship() is used only for navigation
+    - Response is a dedicated read-model: header fields, customer_name
+      and item aggregates (item_count, item_total) computed in SQL
+    - One row per order: item rows are never joined into the page
+    - Items are loaded only with include_items=true (one extra IN query
+      for the page, the selectinload strategy), or via GET /orders/{id}
+    - Only the hot partitions are read, unless archived=true
     """
 
     # -----------------------------------------------------
-    # Base query
-    # - joinedload avoids N+1 queries
-    # - does NOT add fields to the model
+    # Item aggregates as correlated subqueries.
+    # Postgres evaluates them only for the rows that survive
+    # ORDER BY + LIMIT (index lookup on order_items.order_id,
+    # pruned to the order's own partition by the copied keys).
+    # -----------------------------------------------------
+    same_order = (
+        OrderItem.order_id == Order.id,
+        OrderItem.archived == Order.archived,
+        OrderItem.order_issued_at == Order.issued_at,
+    )
+    item_count = (
+        select(func.count(OrderItem.id))
+        .where(*same_order)
+        .correlate(Order)
+        .scalar_subquery()
+    )
+    item_total = (
+        select(func.coalesce(func.sum(OrderItem.total_price), 0))
+        .where(*same_order)
+        .correlate(Order)
+        .scalar_subquery()
+    )
+
+    # -----------------------------------------------------
+    # Base read-model query (columns only, no ORM entities)
     # -----------------------------------------------------
     query = (
-        db.query(Order)
-        .options(
-            joinedload(Order.items),
-            joinedload(Order.customer),
+        db.query(
+            Order.id,
+            Order.external_id,
+            Order.customer_id,
+            Customer.name.label("customer_name"),
+            Order.issued_at,
+            Order.status,
+            Order.total_amount,
+            Order.discount_amount,
+            Order.notes,
+            Order.active,
+            Order.archived,
+            Order.created_at,
+            Order.updated_at,
+            item_count.label("item_count"),
+            item_total.label("item_total"),
         )
+        .join(Customer, Order.customer_id == Customer.id)
+        .filter(Order.archived.is_(archived))
     )
 
     # -----------------------------------------------------
@@ -104,48 +168,233 @@ def list_orders(
         query = query.filter(Order.created_at <= date_to)
 
     # -----------------------------------------------------
-    # Free-text customer search (UX)
-    # Requires explicit JOIN for filtering
+    # Free-text customer search (substring, trigram-indexed)
     # -----------------------------------------------------
     if customer_search:
-        ilike = f"%{customer_search}%"
-        query = (
-            query
-            .join(Customer, Order.customer_id == Customer.id)
-            .filter(
-                or_(
-                    Customer.name.ilike(ilike),
-                    Customer.document.ilike(ilike),
-                )
-            )
+        query = query.filter(
+            substring_filter([Customer.name, Customer.document], customer_search)
         )
 
     # -----------------------------------------------------
-    # Pagination + deterministic ordering
+    # Keyset pagination on (created_at, id), newest first
     # -----------------------------------------------------
-    orders = (
-        query
-        .order_by(Order.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    rows = paginate(
+        query,
+        [Order.created_at, Order.id],
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
+        response=response,
+        descending=True,
     )
 
+    orders = [row._asdict() for row in rows]
+
     # -----------------------------------------------------
-    # Build READ-MODEL response (no ORM mutation)
+    # Optional items: ONE query for the whole page, restricted
+    # to the partitions spanned by the page's issue dates
     # -----------------------------------------------------
-    return [
-        {
-            **order.__dict__,
-            "customer_name": order.customer.name if order.customer else None,
-        }
-        for order in orders
-    ]
+    if include_items and orders:
+        items_by_order = {order["id"]: [] for order in orders}
+        issued = [order["issued_at"] for order in orders]
+        page_items = (
+            db.query(OrderItem)
+            .filter(
+                OrderItem.order_id.in_(items_by_order),
+                OrderItem.archived.is_(archived),
+                OrderItem.order_issued_at.between(min(issued), max(issued)),
+            )
+            .order_by(OrderItem.order_id, OrderItem.id)
+            .all()
+        )
+        for item in page_items:
+            items_by_order[item.order_id].append(item)
+
+        for order in orders:
+            order["items"] = items_by_order[order["id"]]
+
+    return orders
+
+
+# ---------------------------------------------------------------------------
+# Order aggregate write path (shared by single and bulk creation)
+# ---------------------------------------------------------------------------
+# Bulk requests are split into chunks; each chunk is ONE transaction.
+BULK_CHUNK_SIZE = 200
+BULK_MAX_ORDERS = 5000
+
+# Orders per bulk cancellation (ONE transaction)
+BULK_CANCEL_MAX_ORDERS = 1000
+
+# Idempotency-Key scopes (one namespace per endpoint)
+CREATE_ORDER_SCOPE = "POST /api/v1/orders"
+CREATE_ORDERS_BULK_SCOPE = "POST /api/v1/orders/bulk"
+
+
+def _insert_orders(db: Session, payloads: list[OrderCreate]) -> list[dict]:
+    """
+    Persist a batch of order aggregates with multi-row INSERTs.
+
+    For N orders (any number of lines) this issues one INSERT per table
+    (headers, items, stock OUT movements / reservations, receivables)
+    instead of one statement per row. RETURNING gives back the
+    DB-generated fields, so no flush/refresh round-trips are needed.
+
+    - Does NOT commit: the caller owns the transaction
+    - Returns one dict per order, in the same order as `payloads`:
+      header values as stored by the DB + the stored items
+    """
+
+    # ------------------------------------------------------------
+    # 1) Headers (RETURNING keeps rows aligned with the payload order)
+    # ------------------------------------------------------------
+    headers = db.execute(
+        insert(Order).returning(
+            Order.id,
+            Order.total_amount,
+            Order.discount_amount,
+            Order.active,
+            Order.created_at,
+            Order.updated_at,
+            sort_by_parameter_order=True,
+        ),
+        [
+            {
+                "external_id": p.external_id,
+                "customer_id": p.customer_id,
+                "issued_at": p.issued_at,
+                "status": p.status,
+                "total_amount": p.total_amount,
+                "discount_amount": p.discount_amount,
+                "notes": p.notes,
+            }
+            for p in payloads
+        ],
+    ).mappings().all()
+
+    # ------------------------------------------------------------
+    # 2) Items + stock OUT movements (one row each per order line)
+    # ------------------------------------------------------------
+    # Business rule:
+    # - Each order item generates exactly ONE inventory movement,
+    #   or ONE reservation while the order is DRAFT / OPEN (the OUT
+    #   movement is posted when it is confirmed: app.core.reservations)
+    # - We do not calculate stock here
+    # - We only register the physical event (stock leaving)
+    item_rows = []
+    movement_rows = []
+    reservation_rows = []
+    for header, p in zip(headers, payloads):
+        reserving = p.status in RESERVING_STATUSES
+        for item in p.items:
+            item_rows.append(
+                {
+                    "order_id": header["id"],
+                    # Partition keys copied from the header (co-partitioning)
+                    "order_issued_at": p.issued_at,
+                    "product_id": item.product_id,
+                    "quantity": item.quantity,
+                    "unit_price": item.unit_price,
+                    "discount_amount": item.discount_amount,
+                    "total_price": item.total_price,
+                    "notes": item.notes,
+                }
+            )
+            if reserving:
+                reservation_rows.append(
+                    {
+                        "item_index": len(item_rows) - 1,
+                        "order_id": header["id"],
+                        "product_id": item.product_id,
+                        "warehouse_id": p.warehouse_id or DEFAULT_WAREHOUSE_ID,
+                        "quantity": item.quantity,
+                    }
+                )
+                continue
+            movement_rows.append(
+                {
+                    "product_id": item.product_id,
+                    "movement_type": "OUT",
+                    # Negative quantity because stock is leaving
+                    "quantity": -item.quantity,
+                    "occurred_at": p.issued_at,
+                    "warehouse_id": p.warehouse_id or DEFAULT_WAREHOUSE_ID,
+                    # Traceability: this movement came from an order
+                    "source_entity": "order",
+                    "source_id": str(header["id"]),
+                }
+            )
+
+    # Stock OUT of these products: no adjustment may interleave
+    lock_products_shared(db, (row["product_id"] for row in movement_rows + reservation_rows))
+
+    items = db.execute(
+        insert(OrderItem).returning(
+            OrderItem.id,
+            OrderItem.quantity,
+            OrderItem.unit_price,
+            OrderItem.discount_amount,
+            OrderItem.total_price,
+            sort_by_parameter_order=True,
+        ),
+        item_rows,
+    ).mappings().all()
+
+    post_movements(db, movement_rows)
+    reserve(
+        db,
+        [
+            # Position of the line in item_rows -> its RETURNING id
+            {**row, "order_item_id": items[row.pop("item_index")]["id"]}
+            for row in reservation_rows
+        ],
+    )
+
+    # ------------------------------------------------------------
+    # 3) Accounts Receivable (1 order -> 1 receivable)
+    # ------------------------------------------------------------
+    db.execute(
+        insert(AccountReceivable).returning(
+            AccountReceivable.id, sort_by_parameter_order=True
+        ),
+        [
+            {
+                "customer_id": p.customer_id,
+                "source_entity": "ORDER",
+                "source_id": str(header["id"]),
+                "amount": p.total_amount,
+                "due_date": p.issued_at.date(),  # MVP: same day
+                "status": "OPEN",
+            }
+            for header, p in zip(headers, payloads)
+        ],
+    )
+
+    # ------------------------------------------------------------
+    # 4) Re-slice the flat item list back into orders
+    # ------------------------------------------------------------
+    written = []
+    offset = 0
+    for header, p in zip(headers, payloads):
+        written.append(
+            {
+                **header,
+                "items": items[offset:offset + len(p.items)],
+            }
+        )
+        offset += len(p.items)
+
+    return written
 
 
 # Order Creation Endpoint
 @router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
-def create_order(payload: OrderCreate, db: Session = Depends(get_db)):
+def create_order(
+    payload: OrderCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_min_role(10)),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
+):
     """
     Create an Order + its OrderItems atomically.
 
@@ -156,90 +405,58 @@ def create_order(payload: OrderCreate, db: Session = Depends(get_db)):
     Notes:
     - This endpoint is CORE-only: no legacy fields, no staging awareness.
     - Validation is assumed to be handled by Pydantic schemas + DB constraints.
+    - Writes go through the batched path: a constant number of statements
+      regardless of how many lines the order has.
+    - With an Idempotency-Key header, a retried request returns the
+      stored response and creates nothing.
     """
 
-    try:
-        # ------------------------------------------------------------
-        # 1) Create the order header (aggregate root)
-        # ------------------------------------------------------------
-        order = Order(
-            external_id=payload.external_id,
-            customer_id=payload.customer_id,
-            issued_at=payload.issued_at,
-            status=payload.status,
-            total_amount=payload.total_amount,
-            discount_amount=payload.discount_amount,
-            notes=payload.notes,
-        )
-
-        # Add to session but do NOT commit yet (we want atomic behavior)
-        db.add(order)
-
-        # Flush sends pending INSERTs to the DB so we get order.id
-        # without ending the transaction.
-        db.flush()
+    # ------------------------------------------------------------
+    # 0) Idempotency: replay a stored response or claim the key
+    # ------------------------------------------------------------
+    replay = idempotency.replay_or_claim(
+        db,
+        scope=CREATE_ORDER_SCOPE,
+        user_id=current_user.id,
+        key=idempotency_key,
+        payload=payload,
+    )
+    if replay is not None:
+        return replay
 
+    try:
         # ------------------------------------------------------------
-        # 2) Create all items referencing the new order.id
+        # 1) Header + items + stock OUT + receivable (multi-row INSERTs)
         # ------------------------------------------------------------
-        for item in payload.items:
-            order_item = OrderItem(
-                order_id=order.id,               # link item -> order
-                product_id=item.product_id,      # product being sold
-                quantity=item.quantity,          # quantity
-                unit_price=item.unit_price,      # unit price
-                discount_amount=item.discount_amount,
-                total_price=item.total_price,    # final line total
-                notes=item.notes,                # contextual sale notes (optional)
-            )
-            db.add(order_item)
+        written = _insert_orders(db, [payload])[0]
 
         # ------------------------------------------------------------
-        # 2.1) Register stock OUT for each sold item
+        # 2) Build the response from the payload + RETURNING values
+        # (no refresh: everything the DB generated is already known)
         # ------------------------------------------------------------
-        # Business rule:
-        # - Each order item generates exactly ONE inventory movement
-        # - We do not calculate stock here
-        # - We only register the physical event (stock leaving)
-
-        for item in payload.items:
-            movement = InventoryMovement(
-                product_id=item.product_id,
-                movement_type="OUT",
-                # Negative quantity because stock is leaving
-                quantity=-item.quantity,
-                occurred_at=order.issued_at,
-                # Traceability: this movement came from an order
-                source_entity="order",
-                source_id=str(order.id),
-            )
-            db.add(movement)
+        response = {
+            **payload.model_dump(exclude={"items"}),
+            **written,
+            "items": [
+                {**item.model_dump(), **stored}
+                for item, stored in zip(payload.items, written["items"])
+            ],
+        }
 
-        # ------------------------------------------------------------
-        # 2.2) Create Accounts Receivable (1 order -> 1 receivable)
-        # ------------------------------------------------------------
-        receivable = AccountReceivable(
-            customer_id=order.customer_id,
-            source_entity="ORDER",
-            source_id=str(order.id),
-            amount=order.total_amount,
-            due_date=order.issued_at.date(),  # MVP: same day (can evolve later)
-            status="OPEN",
+        idempotency.save_response(
+            db,
+            scope=CREATE_ORDER_SCOPE,
+            user_id=current_user.id,
+            key=idempotency_key,
+            status_code=status.HTTP_201_CREATED,
+            body=OrderResponse.model_validate(response),
         )
-        db.add(receivable)
 
         # ------------------------------------------------------------
-        # 3) Commit once: atomic persistence (order + items)
+        # 3) Commit once: aggregate (+ stored response) persisted atomically
         # ------------------------------------------------------------
         db.commit()
 
-        # Refresh ensures the returned object has DB-populated fields
-        # such as created_at/updated_at (server defaults).
-        db.refresh(order)
-
-        # Returning the ORM object works because OrderResponse uses from_attributes=True
-        return order
-
     except SQLAlchemyError:
         # Any DB error must roll back the entire transaction.
         db.rollback()
@@ -250,6 +467,227 @@ def create_order(payload: OrderCreate, db: Session = Depends(get_db)):
             detail="Failed to create order",
         )
 
+    return response
+
+
+def _write_orders_bulk(db: Session, payload: list[OrderCreate]) -> dict:
+    """
+    Validate and write the orders of a bulk request (one commit per
+    chunk). Returns the per-order report.
+    """
+    results = {}
+
+    # ------------------------------------------------------------
+    # 1) Set-based reference validation (one query per entity)
+    # ------------------------------------------------------------
+    customer_ids = {p.customer_id for p in payload}
+    product_ids = {item.product_id for p in payload for item in p.items}
+    warehouse_ids = {p.warehouse_id for p in payload if p.warehouse_id is not None}
+
+    known_customers = {
+        row[0]
+        for row in db.query(Customer.id).filter(Customer.id.in_(customer_ids))
+    }
+    known_products = {
+        row[0]
+        for row in db.query(Product.id).filter(Product.id.in_(product_ids))
+    }
+    known_warehouses = {
+        row[0]
+        for row in db.query(Warehouse.id).filter(Warehouse.id.in_(warehouse_ids))
+    }
+
+    valid = []
+    for index, p in enumerate(payload):
+        error = None
+        if p.customer_id not in known_customers:
+            error = f"Invalid customer_id: {p.customer_id}"
+        elif p.warehouse_id is not None and p.warehouse_id not in known_warehouses:
+            error = f"Invalid warehouse_id: {p.warehouse_id}"
+        else:
+            missing = sorted(
+                {item.product_id for item in p.items} - known_products
+            )
+            if missing:
+                error = f"Invalid product_id: {', '.join(map(str, missing))}"
+
+        if error:
+            results[index] = {
+                "index": index,
+                "external_id": p.external_id,
+                "success": False,
+                "error": error,
+            }
+        else:
+            valid.append((index, p))
+
+    # ------------------------------------------------------------
+    # 2) Chunked persistence (one transaction per chunk)
+    # ------------------------------------------------------------
+    for start in range(0, len(valid), BULK_CHUNK_SIZE):
+        chunk = valid[start:start + BULK_CHUNK_SIZE]
+
+        try:
+            written = _insert_orders(db, [p for _, p in chunk])
+            db.commit()
+            outcomes = [
+                (index, p, order["id"], None)
+                for (index, p), order in zip(chunk, written)
+            ]
+
+        except SQLAlchemyError:
+            db.rollback()
+
+            # Isolate the failing order(s): retry this chunk row by row
+            outcomes = []
+            for index, p in chunk:
+                try:
+                    order_id = _insert_orders(db, [p])[0]["id"]
+                    db.commit()
+                    outcomes.append((index, p, order_id, None))
+                except SQLAlchemyError:
+                    db.rollback()
+                    outcomes.append((index, p, None, "Failed to create order"))
+
+        for index, p, order_id, error in outcomes:
+            results[index] = {
+                "index": index,
+                "external_id": p.external_id,
+                "success": error is None,
+                "order_id": order_id,
+                "error": error,
+            }
+
+    ordered = [results[i] for i in range(len(payload))]
+    created = sum(1 for r in ordered if r["success"])
+
+    return {
+        "total": len(payload),
+        "created": created,
+        "failed": len(payload) - created,
+        "results": ordered,
+    }
+
+
+# Bulk Order Creation Endpoint
+@router.post("/bulk", response_model=OrderBulkResponse)
+def create_orders_bulk(
+    payload: list[OrderCreate],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_min_role(10)),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
+):
+    """
+    Create many orders in a single request (integrations / POS).
+
+    Design:
+    - References (customers, products) are validated set-based up front
+    - Valid orders are written in chunks: multi-row INSERTs, one commit per chunk
+    - If a chunk fails in the DB, its orders are retried one by one,
+      so a single bad order does not sink its neighbours
+    - The response reports success or failure per submitted order
+    - With an Idempotency-Key header the key is claimed (and committed)
+      before the first chunk; a retry returns the stored report, or 409
+      while the original request is still running. A request that fails
+      unexpectedly releases its claim (chunks already committed stay)
+    """
+
+    if not payload:
+        raise HTTPException(status_code=400, detail="No orders to create")
+
+    if len(payload) > BULK_MAX_ORDERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many orders (max {BULK_MAX_ORDERS} per request)",
+        )
+
+    # Spans several transactions: the claim is committed on its own
+    replay = idempotency.replay_or_claim(
+        db,
+        scope=CREATE_ORDERS_BULK_SCOPE,
+        user_id=current_user.id,
+        key=idempotency_key,
+        payload=payload,
+    )
+    if replay is not None:
+        return replay
+    db.commit()
+
+    # From here on a failure must free the key, or every retry would
+    # get 409 until it expires
+    try:
+        response = _write_orders_bulk(db, payload)
+        idempotency.save_response(
+            db,
+            scope=CREATE_ORDERS_BULK_SCOPE,
+            user_id=current_user.id,
+            key=idempotency_key,
+            status_code=status.HTTP_200_OK,
+            body=OrderBulkResponse.model_validate(response),
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        idempotency.release_claim(
+            db, scope=CREATE_ORDERS_BULK_SCOPE, user_id=current_user.id, key=idempotency_key
+        )
+        raise
+
+    return response
+
+
+# Bulk Order Cancellation Endpoint
+@router.post("/cancel", response_model=OrderCancelResponse)
+def cancel_orders_bulk(
+    payload: OrderCancelRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_min_role(50)),  # ROLE_MANAGER
+):
+    """
+    Cancel many orders in ONE set-based transaction.
+
+    Each canceled order gets its compensating IN movements, its
+    reservations released and its receivable canceled
+    (app.core.cancellation); the statements do not grow with the number
+    of orders. Orders that cannot be canceled (not found, already
+    canceled, archived, receivable paid) are reported per order and do
+    not block the others.
+    """
+
+    if len(payload.order_ids) > BULK_CANCEL_MAX_ORDERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many orders (max {BULK_CANCEL_MAX_ORDERS} per request)",
+        )
+
+    try:
+        errors = cancel_orders(db, payload.order_ids)
+        db.commit()
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Failed to cancel orders")
+
+    results = [
+        {"order_id": order_id, "success": error is None, "error": error}
+        for order_id, error in errors.items()
+    ]
+    canceled = sum(1 for r in results if r["success"])
+
+    if canceled:
+        log_action(
+            db=db,
+            user_id=current_user.id,
+            action="CANCEL_ORDERS_BULK",
+            resource="orders",
+        )
+
+    return {
+        "total": len(results),
+        "canceled": canceled,
+        "failed": len(results) - canceled,
+        "results": results,
+    }
+
 
 # Get Order by ID Endpoint
 @router.get("/{order_id}", response_model=OrderResponse)
@@ -305,12 +743,16 @@ def update_order(
 
     This endpoint allows updating only specific fields
     (status, notes, active) without overwriting the entire record.
+
+    Leaving DRAFT / OPEN consumes the order's stock reservations (OUT
+    movements); status CANCELED goes through the cancellation (see
+    POST /{order_id}/cancel).
     """
 
     # --------------------------------------------------
-    # 1) Fetch order
+    # 1) Fetch order (row-locked: status changes move stock)
     # --------------------------------------------------
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = db.query(Order).filter(Order.id == order_id).with_for_update().first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
@@ -319,6 +761,23 @@ def update_order(
     # --------------------------------------------------
     update_data = payload.dict(exclude_unset=True)
 
+    # --------------------------------------------------
+    # 2b) Reservations follow the status (same transaction)
+    # --------------------------------------------------
+    new_status = update_data.get("status")
+    if new_status == "CANCELED" and order.status != "CANCELED":
+        error = cancel_orders(db, [order.id])[order.id]
+        if error:
+            db.rollback()
+            raise HTTPException(status_code=409, detail=error)
+        update_data.pop("status")
+    elif (
+        new_status is not None
+        and order.status in RESERVING_STATUSES
+        and new_status not in RESERVING_STATUSES
+    ):
+        consume_reservations(db, order.id)
+
     # --------------------------------------------------
     # 3) Apply changes dynamically
     # --------------------------------------------------
@@ -343,3 +802,44 @@ def update_order(
     )
 
     return order
+
+
+# Order Cancellation Endpoint
+@router.post("/{order_id}/cancel", response_model=OrderResponse)
+def cancel_order(
+    order_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_min_role(10)),
+):
+    """
+    Cancel an order atomically.
+
+    - Compensating IN movements for the stock that left (same warehouse)
+    - Reservations released, receivable CANCELED
+    - 404 if the order does not exist, 409 if it cannot be canceled
+      (already canceled, archived, receivable paid)
+    """
+
+    error = cancel_orders(db, [order_id])[order_id]
+    if error:
+        db.rollback()
+        raise HTTPException(
+            status_code=404 if error == "Order not found" else 409,
+            detail=error,
+        )
+    db.commit()
+
+    log_action(
+        db=db,
+        user_id=current_user.id,
+        action="CANCEL_ORDER",
+        resource="orders",
+        resource_id=order_id,
+    )
+
+    return (
+        db.query(Order)
+        .options(joinedload(Order.items))
+        .filter(Order.id == order_id)
+        .first()
+    )
@@ -1,11 +1,12 @@
 from typing import List, Optional
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 
 from app.core.deps import get_db
 from app.core.security import get_current_user
+from app.core.pagination import paginate
+from app.core.search import substring_filter
 from app.models.user import User
 from app.models.account_payable import AccountPayable
 from app.models.customer import Customer
@@ -59,13 +60,15 @@ def create_payable(
 # ---------------------------------------------------------------------------
 @router.get("", response_model=List[AccountPayableOut])
 def list_payables(
+    response: Response,
     search: Optional[str] = Query(
         None,
         description="Free search by supplier name, document or purchase reference",
     ),
     status: Optional[str] = Query(None, description="OPEN or PAID"),
     supplier_id: Optional[int] = Query(None),
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
@@ -90,15 +93,13 @@ def list_payables(
     )
 
     # ------------------------------------------------------------
-    # Free text search (UX-first)
+    # Free text search (exact references: substring, trigram-indexed)
     # ------------------------------------------------------------
     if search:
-        like = f"%{search}%"
         query = query.filter(
-            or_(
-                Customer.name.ilike(like),
-                Customer.document.ilike(like),
-                AccountPayable.source_id.ilike(like),
+            substring_filter(
+                [Customer.name, Customer.document, AccountPayable.source_id],
+                search,
             )
         )
 
@@ -112,14 +113,17 @@ def list_payables(
         query = query.filter(AccountPayable.supplier_id == supplier_id)
 
     # ------------------------------------------------------------
-    # Pagination + deterministic ordering
+    # Keyset pagination on (created_at, id), newest first
     # ------------------------------------------------------------
-    rows = (
-        query
-        .order_by(AccountPayable.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    rows = paginate(
+        query,
+        [AccountPayable.created_at, AccountPayable.id],
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
+        response=response,
+        descending=True,
+        row_keys=lambda row: (row[0].created_at, row[0].id),
     )
 
     # ------------------------------------------------------------
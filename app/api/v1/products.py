@@ -1,22 +1,25 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from fastapi import Query, Depends
 from datetime import datetime
 
-from sqlalchemy import or_
 
 
 from app.models.product import Product
 from app.api.v1.schemas import (
                 ProductCreate, 
                 ProductOut, 
-                ProductUpdate
+                ProductUpdate,
+                ProductSuggestion,
 )
 from app.core.deps import get_db
 from app.core.security import get_current_user
 from app.models.user import User
 from app.core.audit import log_action
+from app.core.pagination import paginate
+from app.core.search import fuzzy_filter, fuzzy_rank, text_filter, text_rank
+from app.core.product_index import product_index
 
 # ============================================================================
 # Products Router
@@ -62,6 +65,9 @@ def create_product(
     db.commit()
     db.refresh(product)
 
+    # Make it suggestible right away in this worker
+    product_index.invalidate()
+
     return product
 
 
@@ -70,13 +76,17 @@ def create_product(
 # ---------------------------------------------------------------------------
 # Supports:
 # - Filtering by active status
-# - Pagination using skip & limit
+# - q: full-text search (Portuguese stemming, web-style syntax:
+#   "quoted phrase", OR, -exclude), ordered by relevance
+# - Keyset pagination on (name, id): pass the X-Next-Cursor header value
+#   back as ?cursor= (skip is kept as a deprecated offset fallback)
 # - Backend-enforced max limit to prevent abuse
 #
 # Examples:
 # - GET /api/v1/products
 # - GET /api/v1/products?active=true
-# - GET /api/v1/products?skip=0&limit=20
+# - GET /api/v1/products?q=filtro oleo -diesel
+# - GET /api/v1/products?limit=20&cursor=<X-Next-Cursor>
 # ---------------------------------------------------------------------------
 # Now the database session is injected by FastAPI.
 # The endpoint no longer creates or closes the DB connection manually.
@@ -84,11 +94,14 @@ def create_product(
 
 @router.get("", response_model=List[ProductOut])
 def list_products(
+    response: Response,
     active: Optional[bool] = Query(None),
+    q: Optional[str] = Query(None, description="Full-text search (websearch syntax)"),
     search: Optional[str] = Query(None),
     barcode: Optional[str] = Query(None),
     manufacturer_code: Optional[str] = Query(None),
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
@@ -96,7 +109,10 @@ def list_products(
     """
     List products with optional filters.
 
-    - search: free text (name / description)
+    - q: full-text search over name / short name / description /
+      manufacturer code, results ranked by ts_rank
+    - search: free text (name / description / manufacturer code),
+      trigram-indexed, results ranked by similarity
     - barcode: exact match (EAN)
     - manufacturer_code: exact match
     """
@@ -107,16 +123,18 @@ def list_products(
     if active is not None:
         query = query.filter(Product.active == active)
 
-    # Free text search (case-insensitive)
+    # Free text search (trigram-indexed, fuzzy)
+    rank = None
     if search:
-        ilike = f"%{search}%"
-        query = query.filter(
-            or_(
-                Product.name.ilike(ilike),
-                Product.description.ilike(ilike),
-                Product.manufacturer_code.ilike(ilike),
-            )
-        )
+        search_columns = [Product.name, Product.description, Product.manufacturer_code]
+        query = query.filter(fuzzy_filter(search_columns, search))
+        rank = fuzzy_rank(search_columns, search)
+
+    # Full-text search (tsvector, GIN-indexed); its relevance wins
+    # over the trigram similarity when both are given
+    if q and q.strip():
+        query = query.filter(text_filter(Product.search_vector, q))
+        rank = text_rank(Product.search_vector, q)
 
     # Exact barcode match
     if barcode:
@@ -126,8 +144,60 @@ def list_products(
     if manufacturer_code:
         query = query.filter(Product.manufacturer_code == manufacturer_code)
 
-    # Pagination
-    return query.offset(skip).limit(limit).all()
+    # Keyset pagination on (name, id)
+    if rank is None:
+        return paginate(
+            query,
+            [Product.name, Product.id],
+            cursor=cursor,
+            skip=skip,
+            limit=limit,
+            response=response,
+        )
+
+    # Search: best matches first, keyset on (rank, id)
+    rows = paginate(
+        query.add_columns(rank.label("search_rank")),
+        [rank, Product.id],
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
+        response=response,
+        descending=True,
+        row_keys=lambda row: (row.search_rank, row[0].id),
+    )
+    return [product for product, _ in rows]
+
+
+# ---------------------------------------------------------------------------
+# AUTOCOMPLETE
+# ---------------------------------------------------------------------------
+# Order-entry screens call this on every keystroke.
+# Served from a per-worker in-memory prefix index over code, barcode,
+# manufacturer code and name words (see app/core/product_index.py); the
+# database is only touched by the periodic incremental refresh.
+#
+# Declared before /{product_id} so "suggest" is not parsed as an id.
+#
+# Examples:
+# - GET /api/v1/products/suggest?prefix=abra
+# - GET /api/v1/products/suggest?prefix=7891
+# - GET /api/v1/products/suggest?prefix=filtro ol&limit=5
+# ---------------------------------------------------------------------------
+@router.get("/suggest", response_model=List[ProductSuggestion])
+def suggest_products(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Top active products whose code, barcode, manufacturer code or a
+    name word starts with `prefix`.
+    """
+
+    product_index.refresh(db)
+    return product_index.suggest(prefix, limit)
 
 
 # ---------------------------------------------------------------------------
@@ -235,5 +305,7 @@ def update_product(
     db.commit()
     db.refresh(product)
 
+    product_index.invalidate()
+
     return product
 
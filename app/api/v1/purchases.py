@@ -14,11 +14,10 @@ from typing import List
 from decimal import Decimal
 from datetime import datetime, UTC
 from sqlalchemy.orm import Session
-from fastapi import Depends
+from fastapi import Depends, Header
 
 from app.core.deps import get_db
 from app.core.security import get_current_user
-from app.models.inventory_movement import InventoryMovement
 from app.models.product import Product
 from app.models.user import User
 from app.api.v1.schemas import (
@@ -30,8 +29,13 @@ from app.api.v1.schemas import (
 from app.models.account_payable import AccountPayable
 
 from app.models.customer import Customer
+from app.models.warehouse import Warehouse
 
 from app.core.audit import log_action
+from app.core import idempotency
+from app.core.documents import find_by_document
+from app.core.inventory import DEFAULT_WAREHOUSE_ID, lock_products_shared, post_movements
+from app.core.lots import open_lots
 
 # Router for purchase-related endpoints
 router = APIRouter(
@@ -39,15 +43,22 @@ router = APIRouter(
     tags=["purchases"]
     )
 
+# Idempotency-Key scope for purchase confirmation
+CONFIRM_PURCHASE_SCOPE = "POST /api/v1/purchases/xml/confirm"
+
 # Purchase XML preview endpoint
 @router.post("/xml/preview")
-async def preview_purchase_xml(file: UploadFile = File(...)):
+def preview_purchase_xml(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+):
     """
     Preview a supplier purchase XML (NF-e).
 
     - Read-only
     - No persistence
     - Returns purchase header + item preview
+    - Resolves the supplier by CNPJ/CPF (document_normalized index)
     """
 
     # ---------------------------------------------------------
@@ -59,9 +70,10 @@ async def preview_purchase_xml(file: UploadFile = File(...)):
     # ---------------------------------------------------------
     # 2) Save uploaded XML to a temporary file
     # ---------------------------------------------------------
-    # read_nfe_xml expects a file path
+    # read_nfe_xml expects a file path. Plain def (thread pool): the
+    # supplier lookup below is a blocking query
     with tempfile.NamedTemporaryFile(delete=False, suffix=".xml") as tmp:
-        xml_bytes = await file.read()
+        xml_bytes = file.file.read()
         tmp.write(xml_bytes)
         tmp_path = tmp.name
 
@@ -80,6 +92,11 @@ async def preview_purchase_xml(file: UploadFile = File(...)):
         # -----------------------------------------------------
         matched, needs_review = match_items_by_ean(items)
 
+        # -----------------------------------------------------
+        # 4b) Resolve the supplier (None when not registered yet)
+        # -----------------------------------------------------
+        supplier = find_by_document(db, parsed["supplier_document"])
+
         # -----------------------------------------------------
         # 5) Return preview response
         # -----------------------------------------------------
@@ -92,6 +109,11 @@ async def preview_purchase_xml(file: UploadFile = File(...)):
                     "supplier_document": parsed["supplier_document"],
                     "issue_date": parsed["issue_date"],
                     "total_amount": parsed["total_amount"],
+                    "supplier": (
+                        {"id": supplier.id, "name": supplier.name, "type": supplier.type}
+                        if supplier
+                        else None
+                    ),
                 },
                 # Item resolution
                 "matched": matched,
@@ -119,6 +141,7 @@ def confirm_purchase_xml(
     payload: PurchaseConfirmPayload,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),  # Requires authentication
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
 ):
     """
     Confirm a purchase XML after preview.
@@ -128,28 +151,35 @@ def confirm_purchase_xml(
     - Generates IN inventory movements
     - Persists stock changes atomically
     - Creates ONE accounts payable entry (purchase-based)
+
+    Duplicate protection:
+    - Idempotency-Key header: a retried request returns the stored response
+    - Without a key: an NF-e already confirmed is rejected with 409
+      (checked before any item validation)
     """
 
+    # ---------------------------------------------------------
+    # Idempotency: replay a stored response or claim the key
+    # ---------------------------------------------------------
+    replay = idempotency.replay_or_claim(
+        db,
+        scope=CONFIRM_PURCHASE_SCOPE,
+        user_id=current_user.id,
+        key=idempotency_key,
+        payload=payload,
+    )
+    if replay is not None:
+        return replay
+
     # ---------------------------------------------------------
     # Basic validation
     # ---------------------------------------------------------
     if not payload.items:
         raise HTTPException(status_code=400, detail="No items to confirm")
 
-    for item in payload.items:
-        if item.quantity <= 0:
-            raise HTTPException(status_code=400, detail="Quantity must be greater than zero")
-
-        product = db.get(Product, item.product_id)
-        if not product:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid product_id: {item.product_id}",
-            )
-
-    # Check if this purchase XML has already been confirmed (idempotency)
+    # Check if this purchase XML has already been confirmed (cheap, indexed)
     exists = (
-        db.query(AccountPayable)
+        db.query(AccountPayable.id)
         .filter(
             AccountPayable.source_entity == "PURCHASE",
             AccountPayable.source_id == payload.source_id,
@@ -163,6 +193,31 @@ def confirm_purchase_xml(
             detail="This purchase XML has already been confirmed",
         )
 
+    for item in payload.items:
+        if item.quantity <= 0:
+            raise HTTPException(status_code=400, detail="Quantity must be greater than zero")
+        if sum(lot.quantity for lot in item.lots) > item.quantity:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Lot quantities exceed the item quantity (product_id {item.product_id})",
+            )
+
+    # All products validated with ONE query
+    product_ids = {item.product_id for item in payload.items}
+    known_products = {
+        row[0]
+        for row in db.query(Product.id).filter(Product.id.in_(product_ids))
+    }
+    for item in payload.items:
+        if item.product_id not in known_products:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid product_id: {item.product_id}",
+            )
+
+    if payload.warehouse_id is not None and not db.get(Warehouse, payload.warehouse_id):
+        raise HTTPException(status_code=400, detail="Invalid warehouse_id")
+
     # Simple supplier validation (existence + type)
     supplier = db.get(Customer, payload.supplier_id)
     if not supplier:
@@ -172,18 +227,47 @@ def confirm_purchase_xml(
         supplier.type = "both"
 
     # ---------------------------------------------------------
-    # Process each confirmed item (stock IN)
+    # Process each confirmed item (stock IN, ONE multi-row INSERT)
+    # Stock counts of these products wait for this commit; the unit
+    # cost feeds the weighted-average valuation (product_costs) and the
+    # rastro lines open lots (app.core.lots)
     # ---------------------------------------------------------
-    for item in payload.items:
-        movement = InventoryMovement(
-            product_id=item.product_id,
-            movement_type="IN",
-            quantity=item.quantity,
-            occurred_at=datetime.now(UTC),
-            source_entity="purchase_xml",
-            source_id=payload.source_id,  # NF-e key
-        )
-        db.add(movement)
+    lock_products_shared(db, product_ids)
+    received_at = datetime.now(UTC)
+    warehouse_id = payload.warehouse_id or DEFAULT_WAREHOUSE_ID
+    movement_ids = post_movements(
+        db,
+        [
+            {
+                "product_id": item.product_id,
+                "movement_type": "IN",
+                "quantity": item.quantity,
+                "unit_cost": item.unit_cost,
+                "warehouse_id": warehouse_id,
+                "occurred_at": received_at,
+                "source_entity": "purchase_xml",
+                "source_id": payload.source_id,  # NF-e key
+            }
+            for item in payload.items
+        ],
+    )
+    open_lots(
+        db,
+        [
+            {
+                "product_id": item.product_id,
+                "warehouse_id": warehouse_id,
+                "lot_number": lot.lot_number,
+                "manufactured_on": lot.manufactured_on,
+                "expires_on": lot.expires_on,
+                "movement_id": movement_id,
+                "received_at": received_at,
+                "quantity": lot.quantity,
+            }
+            for item, movement_id in zip(payload.items, movement_ids)
+            for lot in item.lots
+        ],
+    )
 
     # ---------------------------------------------------------
     # Create Accounts Payable (1 purchase -> 1 payable)
@@ -198,19 +282,31 @@ def confirm_purchase_xml(
     )
     db.add(payable)
 
-    # ---------------------------------------------------------
-    # Commit atomically
-    # ---------------------------------------------------------
-    db.commit()
-
-    return {
+    response = {
         "status": "ok",
         "data": {
             "items_created": len(payload.items),
+            "lots_created": sum(len(item.lots) for item in payload.items),
             "payable_created": True,
         },
     }
 
+    idempotency.save_response(
+        db,
+        scope=CONFIRM_PURCHASE_SCOPE,
+        user_id=current_user.id,
+        key=idempotency_key,
+        status_code=200,
+        body=response,
+    )
+
+    # ---------------------------------------------------------
+    # Commit atomically (stock + payable + stored response)
+    # ---------------------------------------------------------
+    db.commit()
+
+    return response
+
 
 
 # ---------------------------------------------------------
@@ -2,13 +2,14 @@
 # Endpoints for Accounts Receivable (sales-based)
 
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 
 from app.core.deps import get_db
 from app.core.security import get_current_user
 from app.core.audit import log_action
+from app.core.pagination import paginate
+from app.core.search import substring_filter
 from app.models.account_receivable import AccountReceivable
 from app.models.customer import Customer
 from app.models.user import User
@@ -25,13 +26,15 @@ router = APIRouter(
 # ---------------------------------------------------------------------------
 @router.get("", response_model=list[ReceivableOut])
 def list_receivables(
+    response: Response,
     search: str | None = Query(
         None,
         description="Free search by customer name, document or order reference",
     ),
-    status: str | None = Query(None, description="OPEN or PAID"),
+    status: str | None = Query(None, description="OPEN, PAID or CANCELED"),
     customer_id: int | None = Query(None),
-    skip: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
@@ -56,15 +59,13 @@ def list_receivables(
     )
 
     # ------------------------------------------------------------
-    # Free text search (UX-first)
+    # Free text search (exact references: substring, trigram-indexed)
     # ------------------------------------------------------------
     if search:
-        like = f"%{search}%"
         query = query.filter(
-            or_(
-                Customer.name.ilike(like),
-                Customer.document.ilike(like),
-                AccountReceivable.source_id.ilike(like),
+            substring_filter(
+                [Customer.name, Customer.document, AccountReceivable.source_id],
+                search,
             )
         )
 
@@ -78,14 +79,17 @@ def list_receivables(
         query = query.filter(AccountReceivable.customer_id == customer_id)
 
     # ------------------------------------------------------------
-    # Pagination + deterministic ordering
+    # Keyset pagination on (created_at, id), newest first
     # ------------------------------------------------------------
-    rows = (
-        query
-        .order_by(AccountReceivable.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    rows = paginate(
+        query,
+        [AccountReceivable.created_at, AccountReceivable.id],
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
+        response=response,
+        descending=True,
+        row_keys=lambda row: (row[0].created_at, row[0].id),
     )
 
     # ------------------------------------------------------------
@@ -113,13 +117,15 @@ def pay_receivable(
     Mark a receivable as PAID.
 
     Rules:
-    - Only OPEN receivables can be paid
+    - Only OPEN receivables can be paid (not PAID / CANCELED)
     - paid_at is set by backend (UTC now)
     """
 
+    # Row lock: an order cancellation may be canceling this receivable
     receivable = (
         db.query(AccountReceivable)
         .filter(AccountReceivable.id == receivable_id)
+        .with_for_update()
         .first()
     )
 
@@ -129,6 +135,9 @@ def pay_receivable(
     if receivable.status == "PAID":
         raise HTTPException(status_code=400, detail="Receivable already paid")
 
+    if receivable.status == "CANCELED":
+        raise HTTPException(status_code=400, detail="Receivable canceled (order canceled)")
+
     if payload.paid:
         receivable.status = "PAID"
         receivable.paid_at = datetime.now(timezone.utc)
@@ -56,6 +56,19 @@ class ProductOut(BaseModel):
         from_attributes = True
 
 
+class ProductSuggestion(BaseModel):
+    """
+    Autocomplete entry (GET /api/v1/products/suggest).
+
+    - Served from the in-memory prefix index, not the database
+    """
+    id: int
+    code: Optional[str] = None
+    name: Optional[str] = None
+    barcode: Optional[str] = None
+    manufacturer_code: Optional[str] = None
+
+
 class CustomerBase(BaseModel):
     """
     Base schema for Customer.
@@ -143,9 +156,51 @@ class OrderCreate(BaseModel):
     total_amount: Decimal = Field(..., ge=0, description="Final total amount of the order")
     discount_amount: Optional[Decimal] = Field(None, ge=0, description="Total discount applied to the order")
     notes: Optional[str] = Field(None, description="General order notes")
+    warehouse_id: Optional[int] = Field(None, description="Stock location the goods leave (default: main warehouse)")
     items: List[OrderItemCreate] = Field(..., min_items=1, description="Order items")
 
 
+class OrderBulkResult(BaseModel):
+    """
+    Outcome of a single order inside a bulk request.
+
+    - index: position of the order in the submitted array
+    - success=False carries a human-readable error
+    """
+    index: int
+    external_id: Optional[str] = None
+    success: bool
+    order_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class OrderBulkResponse(BaseModel):
+    total: int
+    created: int
+    failed: int
+    results: List[OrderBulkResult]
+
+
+class OrderCancelRequest(BaseModel):
+    order_ids: List[int] = Field(..., min_length=1, description="Orders to cancel")
+
+
+class OrderCancelResult(BaseModel):
+    """
+    Outcome of one order inside a bulk cancellation (error when not canceled).
+    """
+    order_id: int
+    success: bool
+    error: Optional[str] = None
+
+
+class OrderCancelResponse(BaseModel):
+    total: int
+    canceled: int
+    failed: int
+    results: List[OrderCancelResult]
+
+
 class OrderUpdate(BaseModel):
     status: Optional[str] = Field(None, description="Updated order status")
     notes: Optional[str] = Field(None, description="Updated order notes")
@@ -163,6 +218,7 @@ class OrderResponse(BaseModel):
     discount_amount: Optional[Decimal]
     notes: Optional[str]
     active: bool
+    archived: bool = False
     created_at: datetime
     updated_at: datetime
     items: List[OrderItemResponse]
@@ -171,14 +227,54 @@ class OrderResponse(BaseModel):
         from_attributes = True
 
 
+class OrderListItem(BaseModel):
+    """
+    Order list read-model (GET /api/v1/orders).
+
+    - Header fields + customer_name + item aggregates computed in SQL
+    - items is only filled when explicitly requested (include_items=true)
+    """
+    id: int
+    external_id: Optional[str]
+    customer_id: int
+    customer_name: Optional[str] = None
+    issued_at: datetime
+    status: str
+    total_amount: Decimal
+    discount_amount: Optional[Decimal]
+    notes: Optional[str]
+    active: bool
+    archived: bool = False
+    created_at: datetime
+    updated_at: datetime
+    item_count: int
+    item_total: Decimal
+    items: Optional[List[OrderItemResponse]] = None
+
+    class Config:
+        from_attributes = True
+
+
 # ============================================================
 # XML Purchase Import Schemas
 # ============================================================
 
 # Purchase XML confirm schemas
+class PurchaseItemLot(BaseModel):
+    # NF-e rastro (preview item "lots"): nLote / qLote / dFab / dVal
+    lot_number: str = Field(..., min_length=1, max_length=20)
+    quantity: Decimal = Field(..., gt=0)
+    manufactured_on: Optional[date] = None
+    expires_on: date
+
+
 class PurchaseItemConfirm(BaseModel):
     product_id: int
     quantity: Decimal
+    # NF-e unit price (preview item "unit_price"): values the stock
+    unit_cost: Optional[Decimal] = Field(None, ge=0)
+    # Lot-tracked items: one entry per lot received (at most `quantity`)
+    lots: List[PurchaseItemLot] = []
 
 
 class PurchaseConfirmPayload(BaseModel):
@@ -192,6 +288,9 @@ class PurchaseConfirmPayload(BaseModel):
     issue_date: date
     total_amount: Decimal
 
+    # Stock location receiving the goods (default: main warehouse)
+    warehouse_id: Optional[int] = None
+
     # Confirmed items
     items: List[PurchaseItemConfirm]
 
@@ -0,0 +1,253 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+
+# ============================================================
+# Physical Inventory Count Schemas
+# ============================================================
+
+class InventoryCountLine(BaseModel):
+    """
+    One counted line: product code or barcode + quantity found.
+
+    Lines for the same product are summed (several shelves / bins).
+    """
+    product: str = Field(..., min_length=1, max_length=100, description="Product code or barcode")
+    counted_quantity: Decimal = Field(..., ge=0, description="Quantity physically counted")
+
+
+class InventoryCountVariance(BaseModel):
+    product_id: int
+    code: str
+    name: str
+    previous_stock: Decimal
+    counted_quantity: Decimal
+    variance: Decimal
+    movement_id: Optional[int] = None
+
+
+class InventoryCountUnresolved(BaseModel):
+    product: str
+    reason: str
+
+
+class InventoryCountReport(BaseModel):
+    """
+    Variance report of a count session.
+
+    - variances: one per counted product, largest absolute variance first
+    - unresolved: lines whose product could not be identified (not posted)
+    - dry_run=True: report only, no ADJUST movement written
+    """
+    session_id: str
+    dry_run: bool
+    warehouse_id: int
+    counted_at: datetime
+    lines: int
+    products: int
+    adjusted: int
+    total_variance: Decimal
+    variances: List[InventoryCountVariance]
+    unresolved: List[InventoryCountUnresolved] = []
+
+
+# ============================================================
+# Stock Balance Schemas
+# ============================================================
+
+class InventoryBalancesRequest(BaseModel):
+    """
+    Products to look up, by any mix of ids, codes and barcodes.
+    """
+    product_ids: List[int] = []
+    codes: List[str] = []
+    barcodes: List[str] = []
+    # Balances of one warehouse (default: company-wide)
+    warehouse_id: Optional[int] = None
+
+
+class InventoryBalance(BaseModel):
+    product_id: int
+    code: str
+    barcode: Optional[str] = None
+    name: str
+    manufacturer_code: Optional[str] = None
+    balance: Decimal
+    # Held by DRAFT / OPEN orders; available = balance - reserved
+    reserved: Decimal
+    available: Decimal
+
+
+class InventoryBalancesNotFound(BaseModel):
+    product_ids: List[int] = []
+    codes: List[str] = []
+    barcodes: List[str] = []
+
+
+class InventoryBalancesResponse(BaseModel):
+    """
+    Balances of the requested products (ordered by product id).
+
+    - Products without movements have balance 0
+    - not_found: requested identifiers that match no product
+    """
+    balances: List[InventoryBalance]
+    not_found: InventoryBalancesNotFound
+
+
+class StockHistoryResponse(BaseModel):
+    """
+    Stock of one product over time, one point per bucket.
+
+    - points: [bucket start, balance at the end of the bucket (or at
+      date_to for the last one)], oldest first
+    - opening_balance: stock before date_from
+    """
+    product_id: int
+    warehouse_id: Optional[int] = None
+    bucket: str
+    date_from: date
+    date_to: date
+    opening_balance: Decimal
+    closing_balance: Decimal
+    points: List[Tuple[date, Decimal]]
+
+
+# ============================================================
+# Inventory Valuation Schemas
+# ============================================================
+
+class InventoryValuationItem(BaseModel):
+    product_id: int
+    code: str
+    name: str
+    quantity: Decimal
+    average_cost: Optional[Decimal] = None
+    stock_value: Decimal
+
+
+class InventoryValuationResponse(BaseModel):
+    """
+    Inventory value at moving weighted-average cost.
+
+    - Totals cover every product; `products` is one keyset page
+      (most valuable first, next page in X-Next-Cursor)
+    - uncosted_products: stock on hand without any known cost (valued 0)
+    """
+    total_value: Decimal
+    total_quantity: Decimal
+    valued_products: int
+    uncosted_products: int
+    products: List[InventoryValuationItem]
+
+
+# ============================================================
+# Cost of Goods Sold (FIFO) Schemas
+# ============================================================
+
+class InventoryCogsProduct(BaseModel):
+    product_id: int
+    code: str
+    name: str
+    quantity: Decimal
+    cost: Decimal
+    uncosted_quantity: Decimal
+
+
+class InventoryCogsResponse(BaseModel):
+    """
+    FIFO cost of the goods sold (OUT movements) in [date_from, date_to].
+
+    - Totals cover every product; `products` is one keyset page
+      (by product id, next page in X-Next-Cursor)
+    - uncosted_quantity: sold with no cost layer left (not in `cost`)
+    """
+    date_from: date
+    date_to: date
+    total_cost: Decimal
+    total_quantity: Decimal
+    uncosted_quantity: Decimal
+    products: List[InventoryCogsProduct]
+
+
+# ============================================================
+# Warehouse / Transfer Schemas
+# ============================================================
+
+class WarehouseCreate(BaseModel):
+    code: str = Field(..., min_length=1, max_length=20)
+    name: str = Field(..., min_length=1, max_length=255)
+
+
+class WarehouseOut(BaseModel):
+    id: int
+    code: str
+    name: str
+    active: bool
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class WarehouseStock(BaseModel):
+    warehouse_id: int
+    code: str
+    name: str
+    balance: Decimal
+    reserved: Decimal
+    available: Decimal
+
+
+class InventoryTransferLine(BaseModel):
+    product_id: int
+    quantity: Decimal = Field(..., gt=0)
+
+
+class InventoryTransferCreate(BaseModel):
+    """
+    Move stock between two warehouses (company-wide stock unchanged).
+    """
+    from_warehouse_id: int
+    to_warehouse_id: int
+    lines: List[InventoryTransferLine] = Field(..., min_length=1)
+
+
+class InventoryTransferResponse(BaseModel):
+    transfer_id: str
+    from_warehouse_id: int
+    to_warehouse_id: int
+    occurred_at: datetime
+    lines: int
+    movement_ids: List[int]
+
+
+# ============================================================
+# Lot / Expiry Schemas
+# ============================================================
+
+class LotOut(BaseModel):
+    id: int
+    product_id: int
+    warehouse_id: int
+    lot_number: str
+    manufactured_on: Optional[date] = None
+    expires_on: date
+    received_at: datetime
+    quantity: Decimal
+    remaining: Decimal
+
+    class Config:
+        from_attributes = True
+
+
+class ExpiringLot(LotOut):
+    """
+    Open lot expiring within the report window (days_left < 0: expired).
+    """
+    code: str
+    name: str
+    days_left: int
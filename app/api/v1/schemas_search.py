@@ -0,0 +1,35 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class SearchHit(BaseModel):
+    """
+    One ranked hit of the global search.
+
+    - match: which lookup found it (document, barcode, nfe_key,
+      external_id, code, text)
+    - score: 1.0 for exact identifier matches, similarity otherwise
+    """
+    id: int
+    label: str
+    detail: str | None = None
+    match: str
+    score: float
+
+
+class SearchResponse(BaseModel):
+    """
+    Grouped hits for GET /api/v1/search.
+
+    - detected: query shapes recognized (cpf, cnpj, gtin, nfe_key, code, text)
+    - incomplete: groups with a lookup that failed or timed out (its
+      hits are missing)
+    """
+    query: str
+    detected: List[str]
+    products: List[SearchHit] = []
+    customers: List[SearchHit] = []
+    orders: List[SearchHit] = []
+    payables: List[SearchHit] = []
+    incomplete: List[str] = []
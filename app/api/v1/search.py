@@ -0,0 +1,294 @@
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.security import get_current_user
+from app.core.search import fuzzy_filter, fuzzy_rank
+from app.models.user import User
+from app.models.product import Product
+from app.models.customer import Customer
+from app.models.order import Order
+from app.models.account_payable import AccountPayable
+from app.api.v1.schemas_search import SearchResponse
+
+# ============================================================================
+# Global Search Router
+# ============================================================================
+# One search box for the whole system: GET /api/v1/search?q=
+#
+# The query shape decides which lookups run (all of them indexed):
+#
+#   11 digits            CPF      -> customers.document_normalized
+#   14 digits            CNPJ     -> customers.document_normalized
+#                        GTIN-14  -> products.barcode
+#   8 / 12 / 13 digits   EAN/GTIN -> products.barcode (valid check digit)
+#   44 digits            NF-e key -> accounts_payable (PURCHASE, source_id)
+#   single token         code     -> orders.external_id, products.code
+#   anything else        text     -> products / customers (pg_trgm, ranked)
+#
+# Punctuation is ignored for digit strings ("12.345.678/0001-90").
+# Lookups run concurrently, each with its own session (a Session is not
+# thread-safe), and hits come back grouped by entity, best first.
+# A lookup that fails or outlives SEARCH_LOOKUP_TIMEOUT_SECONDS is
+# dropped (its group listed in `incomplete`), not the whole search.
+# ============================================================================
+
+router = APIRouter(
+    prefix="/api/v1/search",
+    tags=["search"]
+)
+
+logger = logging.getLogger(__name__)
+
+# Shared by all requests, one thread per pooled DB connection: lookups
+# of concurrent searches run side by side instead of queueing
+_executor = ThreadPoolExecutor(
+    max_workers=settings.db_pool_size + settings.db_max_overflow,
+    thread_name_prefix="search",
+)
+
+_DIGIT_PUNCTUATION = re.compile(r"[\s.\-/]")
+
+
+# ---------------------------------------------------------------------------
+# Query shape detection
+# ---------------------------------------------------------------------------
+def _gtin_check_digit_ok(digits: str) -> bool:
+    """
+    GS1 mod-10 check digit (EAN-8, UPC-A, EAN-13, GTIN-14).
+    """
+    body, check = digits[:-1], int(digits[-1])
+    total = sum(
+        int(d) * (3 if i % 2 == 0 else 1)
+        for i, d in enumerate(reversed(body))
+    )
+    return (10 - total % 10) % 10 == check
+
+
+def detect_query_kinds(q: str) -> tuple[list[str], str]:
+    """
+    Recognized shapes of `q` and the value to look up with
+    (digits only for numeric identifiers).
+    """
+    value = q.strip()
+
+    if value[:3].upper() == "NFE" and value[3:].isdigit() and len(value) == 47:
+        return ["nfe_key"], value[3:]
+
+    digits = _DIGIT_PUNCTUATION.sub("", value)
+    if digits.isdigit():
+        kinds = []
+        if len(digits) == 44:
+            return ["nfe_key"], digits
+        if len(digits) == 11:
+            kinds.append("cpf")
+        if len(digits) == 14:
+            kinds.append("cnpj")
+        if len(digits) in (8, 12, 13, 14) and _gtin_check_digit_ok(digits):
+            kinds.append("gtin")
+        kinds.append("code")
+        return kinds, digits
+
+    if " " not in value and any(ch.isdigit() for ch in value):
+        return ["code", "text"], value
+
+    return ["text"], value
+
+
+# ---------------------------------------------------------------------------
+# Lookups (each runs in its own session)
+# ---------------------------------------------------------------------------
+def _customers_by_document(db, digits, limit):
+    rows = db.execute(
+        select(Customer.id, Customer.name, Customer.document, Customer.type)
+        .where(Customer.document_normalized == digits)
+        .limit(limit)
+    ).all()
+    return [
+        {"id": r.id, "label": r.name, "detail": f"{r.type} · {r.document}", "match": "document", "score": 1.0}
+        for r in rows
+    ]
+
+
+def _products_by_barcode(db, digits, limit):
+    rows = db.execute(
+        select(Product.id, Product.name, Product.code)
+        .where(Product.barcode == digits)
+        .limit(limit)
+    ).all()
+    return [
+        {"id": r.id, "label": r.name, "detail": r.code, "match": "barcode", "score": 1.0}
+        for r in rows
+    ]
+
+
+def _products_by_code(db, value, limit):
+    rows = db.execute(
+        select(Product.id, Product.name, Product.code)
+        .where(Product.code == value)
+        .limit(limit)
+    ).all()
+    return [
+        {"id": r.id, "label": r.name, "detail": r.code, "match": "code", "score": 1.0}
+        for r in rows
+    ]
+
+
+def _orders_by_external_id(db, value, limit):
+    rows = db.execute(
+        select(Order.id, Order.external_id, Order.status, Order.total_amount, Customer.name)
+        .join(Customer, Customer.id == Order.customer_id)
+        .where(Order.external_id == value)
+        .order_by(Order.id.desc())
+        .limit(limit)
+    ).all()
+    return [
+        {
+            "id": r.id,
+            "label": f"Order {r.external_id}",
+            "detail": f"{r.name} · {r.status} · {r.total_amount}",
+            "match": "external_id",
+            "score": 1.0,
+        }
+        for r in rows
+    ]
+
+
+def _payables_by_nfe_key(db, digits, limit):
+    rows = db.execute(
+        select(AccountPayable.id, AccountPayable.amount, AccountPayable.status, Customer.name)
+        .join(Customer, Customer.id == AccountPayable.supplier_id)
+        .where(
+            AccountPayable.source_entity == "PURCHASE",
+            AccountPayable.source_id.in_([digits, f"NFe{digits}"]),
+        )
+        .limit(limit)
+    ).all()
+    return [
+        {
+            "id": r.id,
+            "label": r.name,
+            "detail": f"{r.status} · {r.amount}",
+            "match": "nfe_key",
+            "score": 1.0,
+        }
+        for r in rows
+    ]
+
+
+def _products_by_text(db, value, limit):
+    columns = [Product.name, Product.description, Product.manufacturer_code]
+    rank = fuzzy_rank(columns, value)
+    rows = db.execute(
+        select(Product.id, Product.name, Product.code, rank.label("score"))
+        .where(Product.active.is_(True), fuzzy_filter(columns, value))
+        .order_by(rank.desc(), Product.id.desc())
+        .limit(limit)
+    ).all()
+    return [
+        {"id": r.id, "label": r.name, "detail": r.code, "match": "text", "score": r.score}
+        for r in rows
+    ]
+
+
+def _customers_by_text(db, value, limit):
+    columns = [Customer.name, Customer.email]
+    rank = fuzzy_rank(columns, value)
+    rows = db.execute(
+        select(Customer.id, Customer.name, Customer.document, Customer.type, rank.label("score"))
+        .where(Customer.active.is_(True), fuzzy_filter(columns, value))
+        .order_by(rank.desc(), Customer.id.desc())
+        .limit(limit)
+    ).all()
+    return [
+        {"id": r.id, "label": r.name, "detail": f"{r.type} · {r.document or '-'}", "match": "text", "score": r.score}
+        for r in rows
+    ]
+
+
+# Query shape -> (group, lookup) pairs to run
+LOOKUPS = {
+    "cpf": [("customers", _customers_by_document)],
+    "cnpj": [("customers", _customers_by_document)],
+    "gtin": [("products", _products_by_barcode)],
+    "nfe_key": [("payables", _payables_by_nfe_key)],
+    "code": [("orders", _orders_by_external_id), ("products", _products_by_code)],
+    "text": [("products", _products_by_text), ("customers", _customers_by_text)],
+}
+
+
+def _run_lookup(lookup, value, limit):
+    """
+    Run one lookup in a dedicated session (executor thread).
+    """
+    db = SessionLocal()
+    try:
+        return lookup(db, value, limit)
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------------------------
+# SEARCH
+# ---------------------------------------------------------------------------
+# Examples:
+# - GET /api/v1/search?q=12.345.678/0001-90
+# - GET /api/v1/search?q=7891234567895
+# - GET /api/v1/search?q=35240112345678000190550010000012341000012345
+# - GET /api/v1/search?q=filtro oleo
+# ---------------------------------------------------------------------------
+@router.get("", response_model=SearchResponse)
+def global_search(
+    q: str = Query(..., min_length=2, max_length=100),
+    limit: int = Query(5, ge=1, le=20, description="Max hits per group"),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Search products, customers, orders and payables at once.
+
+    - Only the lookups matching the query shape are executed
+    - Identifier matches score 1.0 and rank above fuzzy text matches
+    """
+
+    kinds, value = detect_query_kinds(q)
+
+    futures = [
+        (group, _executor.submit(_run_lookup, lookup, value, limit))
+        for kind in kinds
+        for group, lookup in LOOKUPS[kind]
+    ]
+
+    # Merge per group: one hit per id (best score), best first.
+    # One deadline for all lookups (they run concurrently)
+    deadline = time.monotonic() + settings.search_lookup_timeout_seconds
+    groups: dict[str, dict[int, dict]] = {}
+    incomplete: list[str] = []
+    for group, future in futures:
+        hits = groups.setdefault(group, {})
+        try:
+            found = future.result(timeout=max(deadline - time.monotonic(), 0))
+        except Exception:
+            future.cancel()
+            logger.exception("Search lookup failed (group %s, q=%r)", group, q)
+            if group not in incomplete:
+                incomplete.append(group)
+            continue
+        for hit in found:
+            current = hits.get(hit["id"])
+            if current is None or hit["score"] > current["score"]:
+                hits[hit["id"]] = hit
+
+    response = {"query": q, "detected": kinds, "incomplete": incomplete}
+    for group, hits in groups.items():
+        response[group] = sorted(
+            hits.values(),
+            key=lambda hit: (-hit["score"], hit["label"]),
+        )[:limit]
+
+    return response
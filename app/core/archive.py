@@ -0,0 +1,163 @@
+# app/core/archive.py
+
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.partitions import (
+    add_months,
+    create_month_partition,
+    create_year_partition,
+    month_start,
+    partition_name,
+)
+from app.models.order import Order
+
+# ---------------------------------------------------------------------------
+# Order archival (hot -> cold partitions)
+# ---------------------------------------------------------------------------
+# orders / order_items are LIST partitioned by `archived`:
+#
+#   orders_hot      archived = false   monthly partitions (working set)
+#   orders_archive  archived = true    yearly partitions (cold)
+#
+# Archiving is an UPDATE of the partition key: Postgres moves the row
+# into the archive partition, and the ON UPDATE CASCADE foreign key
+# moves its items along. Hot indexes then only cover recent or still
+# open orders and stay in memory.
+#
+# Only finished orders (ARCHIVABLE_STATUSES) older than the horizon are
+# moved; run scripts/maintenance/archive_orders.py from cron.
+#
+# Hot monthly partitions are created ahead of time by
+# scripts/maintenance/manage_partitions.py (ensure_order_partitions).
+# ---------------------------------------------------------------------------
+
+ARCHIVABLE_STATUSES = ("CLOSED", "CANCELED")
+
+# Co-partitioned tables: (hot table, archive table, partition key column)
+ORDER_TABLES = [
+    ("orders_hot", "orders_archive", "issued_at"),
+    ("order_items_hot", "order_items_archive", "order_issued_at"),
+]
+
+
+def create_order_month_partitions(db: Session, month: date) -> bool:
+    """
+    Create the hot partitions of `month` for orders and order items.
+    Returns True if created.
+
+    Orders of that month already in the hot DEFAULT partition cannot be
+    deleted and re-inserted (their items reference them), so they take
+    a detour: flagged archived (the FK cascade moves the items too), the
+    partitions are created, then flagged back into them.
+    """
+    month = month_start(month)
+    if all(
+        db.execute(select(func.to_regclass(partition_name(hot, month)))).scalar()
+        for hot, _, _ in ORDER_TABLES
+    ):
+        return False
+
+    in_month = (Order.issued_at >= month, Order.issued_at < add_months(month, 1))
+    stray_ids = db.execute(
+        update(Order)
+        .where(Order.archived.is_(False), *in_month)
+        .values(archived=True)
+        .returning(Order.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+
+    for hot, _, column in ORDER_TABLES:
+        create_month_partition(db, hot, column, month)
+
+    if stray_ids:
+        db.execute(
+            update(Order)
+            .where(Order.archived.is_(True), *in_month, Order.id.in_(stray_ids))
+            .values(archived=False)
+            .execution_options(synchronize_session=False)
+        )
+    return True
+
+
+def ensure_order_partitions(
+    db: Session,
+    months_ahead: int = 3,
+    today: date | None = None,
+) -> list[str]:
+    """
+    Hot partitions for the current month and the next `months_ahead`.
+    Returns the names of the orders partitions created.
+    """
+    current = month_start(today or datetime.now(timezone.utc).date())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if create_order_month_partitions(db, month):
+            created.append(partition_name("orders_hot", month))
+    return created
+
+
+def archive_cutoff(horizon_days: int | None = None) -> datetime:
+    days = settings.order_archive_horizon_days if horizon_days is None else horizon_days
+    return datetime.now(timezone.utc) - timedelta(days=days)
+
+
+def _archivable(cutoff: datetime):
+    return (
+        Order.archived.is_(False),
+        Order.status.in_(ARCHIVABLE_STATUSES),
+        Order.issued_at < cutoff,
+    )
+
+
+def ensure_archive_partitions(db: Session, cutoff: datetime) -> list[str]:
+    """
+    Create the yearly archive partitions the archivable orders will land in.
+    """
+    oldest = db.execute(
+        select(func.min(Order.issued_at)).where(*_archivable(cutoff))
+    ).scalar()
+    if oldest is None:
+        return []
+
+    created = []
+    for year in range(oldest.year, cutoff.year + 1):
+        for _, archive, column in ORDER_TABLES:
+            if create_year_partition(db, archive, column, year):
+                created.append(f"{archive}_{year:04d}")
+    db.commit()
+    return created
+
+
+def archive_orders(db: Session, cutoff: datetime, batch_size: int = 1000) -> int:
+    """
+    Move archivable orders (and their items) to the archive partitions,
+    in batches (one commit each). Returns the number of orders moved.
+    """
+    ensure_archive_partitions(db, cutoff)
+
+    moved = 0
+    while True:
+        batch_ids = (
+            select(Order.id)
+            .where(*_archivable(cutoff))
+            .order_by(Order.issued_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        updated = db.execute(
+            update(Order)
+            .where(Order.archived.is_(False), Order.id.in_(batch_ids))
+            .values(archived=True)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+
+        moved += updated
+        if updated < batch_size:
+            return moved
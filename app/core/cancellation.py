@@ -0,0 +1,182 @@
+# app/core/cancellation.py
+
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Iterable
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.cost_layers import restore_cost_layer_consumptions
+from app.core.inventory import lock_products_shared, post_movements
+from app.core.lots import restore_lot_allocations
+from app.core.reservations import release_reservations
+from app.models.account_receivable import AccountReceivable
+from app.models.inventory_movement import InventoryMovement
+from app.models.order import Order
+from app.models.stock_reservation import StockReservation
+
+# ---------------------------------------------------------------------------
+# Order cancellation (set-based)
+# ---------------------------------------------------------------------------
+# Canceling an order undoes its side effects in ONE transaction, with a
+# constant number of statements for any number of orders:
+#
+#   reservations   ACTIVE ones released (DRAFT / OPEN orders)
+#   stock          one compensating IN movement per (order, product,
+#                  warehouse) still out, in the warehouse the goods left;
+#                  uncosted (no new layer, average cost unchanged)
+#   FIFO / lots    what the OUT movements took goes back to its cost
+#                  layers (their consumptions are dropped: no COGS) and
+#                  to its lots
+#   receivable     OPEN -> CANCELED (a PAID one blocks the cancellation)
+#   header         status = CANCELED
+#
+# The ledger is never rewritten: the OUT movements stay, the IN
+# movements net them to zero. Orders are row-locked first (id order),
+# then the products of the movements AND reservations in one pass
+# (shared stock locks), then reservation rows and balance counters.
+# ---------------------------------------------------------------------------
+
+
+def cancel_orders(db: Session, order_ids: Iterable[int]) -> dict[int, str | None]:
+    """
+    Cancel orders and reverse their stock and receivable.
+    Returns {order_id: error}, error None when canceled.
+
+    - Orders not found, already canceled, archived or with a PAID
+      receivable are left untouched (reported with their error)
+    - Does NOT commit: the caller owns the transaction
+    """
+    ids = sorted({int(order_id) for order_id in order_ids})
+    results: dict[int, str | None] = {}
+    if not ids:
+        return results
+
+    # ------------------------------------------------------------
+    # 1) Lock the headers, then check their receivables
+    # ------------------------------------------------------------
+    orders = {
+        row.id: row
+        for row in db.execute(
+            select(Order.id, Order.status, Order.archived)
+            .where(Order.id.in_(ids))
+            .order_by(Order.id)
+            .with_for_update()
+        )
+    }
+    # Locked too: a receivable cannot be paid while its order is canceled
+    paid = {
+        row.source_id
+        for row in db.execute(
+            select(AccountReceivable.source_id, AccountReceivable.status)
+            .where(
+                AccountReceivable.source_entity == "ORDER",
+                AccountReceivable.source_id.in_([str(order_id) for order_id in ids]),
+            )
+            .order_by(AccountReceivable.id)
+            .with_for_update()
+        )
+        if row.status == "PAID"
+    }
+
+    for order_id in ids:
+        order = orders.get(order_id)
+        if order is None:
+            results[order_id] = "Order not found"
+        elif order.status == "CANCELED":
+            results[order_id] = "Order already canceled"
+        elif order.archived:
+            results[order_id] = "Order is archived"
+        elif str(order_id) in paid:
+            results[order_id] = "Receivable already paid"
+        else:
+            results[order_id] = None
+
+    canceled = [order_id for order_id, error in results.items() if error is None]
+    if not canceled:
+        return results
+    source_ids = [str(order_id) for order_id in canceled]
+
+    # ------------------------------------------------------------
+    # 2) Reservations and stock (ONE read of the order movements)
+    # ------------------------------------------------------------
+    movements = db.execute(
+        select(
+            InventoryMovement.id,
+            InventoryMovement.product_id,
+            InventoryMovement.warehouse_id,
+            InventoryMovement.quantity,
+            InventoryMovement.source_id,
+        ).where(
+            InventoryMovement.source_entity == "order",
+            InventoryMovement.source_id.in_(source_ids),
+        )
+    ).all()
+
+    out = {}
+    decreases: dict[tuple, list[int]] = {}
+    for m in movements:
+        key = (m.source_id, m.product_id, m.warehouse_id)
+        out[key] = out.get(key, Decimal(0)) - m.quantity
+        if m.quantity < 0:
+            decreases.setdefault(key, []).append(m.id)
+    out = {key: quantity for key, quantity in out.items() if quantity > 0}
+
+    # Every product touched, locked ONCE in id order before any write
+    reserved_products = db.execute(
+        select(StockReservation.product_id).where(
+            StockReservation.order_id.in_(canceled),
+            StockReservation.status == "ACTIVE",
+        )
+    ).scalars().all()
+    lock_products_shared(db, [m.product_id for m in movements] + reserved_products)
+
+    # Released counters and the counters the IN movements update next
+    # are row-locked together (one sorted pass)
+    release_reservations(
+        db,
+        canceled,
+        locked=True,
+        balance_keys=[(product_id, warehouse_id) for _, product_id, warehouse_id in out],
+    )
+
+    if out:
+        returned_at = datetime.now(timezone.utc)
+        post_movements(
+            db,
+            [
+                {
+                    "product_id": product_id,
+                    "movement_type": "IN",
+                    "quantity": quantity,
+                    "warehouse_id": warehouse_id,
+                    "occurred_at": returned_at,
+                    "source_entity": "order",
+                    "source_id": source_id,
+                }
+                for (source_id, product_id, warehouse_id), quantity in sorted(out.items())
+            ],
+        )
+        out_ids = [movement_id for key in out for movement_id in decreases.get(key, [])]
+        restore_cost_layer_consumptions(db, out_ids)
+        restore_lot_allocations(db, out_ids)
+
+    # ------------------------------------------------------------
+    # 3) Receivables and headers
+    # ------------------------------------------------------------
+    db.execute(
+        update(AccountReceivable)
+        .where(
+            AccountReceivable.source_entity == "ORDER",
+            AccountReceivable.source_id.in_(source_ids),
+            AccountReceivable.status == "OPEN",
+        )
+        .values(status="CANCELED")
+    )
+    db.execute(
+        update(Order)
+        .where(Order.id.in_(canceled))
+        .values(status="CANCELED", updated_at=func.now())
+    )
+    return results
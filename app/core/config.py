@@ -5,6 +5,24 @@ class Settings(BaseSettings):
     env: str
     database_url: str
     secret_key: str
+
+    # Database connection pool (per worker process)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+
+    # Global search: each lookup gets this long before it is dropped
+    search_lookup_timeout_seconds: float = 2.0
+
+    # Idempotency-Key retention (stored responses are replayed within this window)
+    idempotency_ttl_hours: int = 24
+
+    # CLOSED / CANCELED orders issued longer ago than this are archived
+    order_archive_horizon_days: int = 365
+
+    # DRAFT / OPEN orders hold their stock this long (then the sweeper
+    # releases it: scripts/maintenance/expire_reservations.py)
+    reservation_ttl_hours: int = 72
+
     class Config:
         env_file = ".env"
         extra = "allow"
@@ -0,0 +1,332 @@
+# app/core/cost_layers.py
+
+from decimal import Decimal
+from itertools import groupby
+from typing import Iterable, Iterator
+
+from sqlalchemy import bindparam, delete, func, insert, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+from sqlalchemy.types import Integer
+
+from app.models.cost_layer import CostLayer
+from app.models.cost_layer_consumption import CostLayerConsumption
+from app.models.inventory_movement import InventoryMovement
+
+# ---------------------------------------------------------------------------
+# FIFO cost layers (cost of goods sold)
+# ---------------------------------------------------------------------------
+# Every costed receipt (quantity > 0 with unit_cost) opens a layer;
+# every stock decrease (OUT, negative ADJUST) takes its quantity from the
+# oldest open layers of the product and records what it took:
+#
+#   cost_layers               receipt, quantity, remaining, unit_cost
+#   cost_layer_consumptions   decrease, layer, quantity, unit_cost
+#
+# The oldest open layer is found through a partial index on
+# (product_id, id) WHERE remaining > 0: O(log n) per product, then O(1)
+# per layer consumed. Closed layers drop out of the index. The first
+# layers of every product of a batch come in ONE query; a product
+# only costs another round trip when it uses them all up.
+#
+# Maintained by post_movements (same transaction); decreases beyond the
+# open layers are recorded without a layer (uncosted quantity).
+# Within one batch, receipts open their layers before decreases consume.
+# Layers are company-wide: transfers between warehouses (LAYER_NEUTRAL_TYPES)
+# neither open nor consume layers.
+#
+# Canceled orders give back what their decreases took: the quantity
+# returns to the layers it came from and the consumptions are removed
+# (restore_cost_layer_consumptions); the compensating IN movement is
+# uncosted, so it opens no layer (RESTORING_SOURCE).
+#
+# Movements inserted outside post_movements (historical imports):
+# scripts/maintenance/rebuild_cost_layers.py replays the ledger.
+# ---------------------------------------------------------------------------
+
+# Open layers read (and row-locked) per round trip while consuming
+LAYER_FETCH_SIZE = 16
+
+# Movements that only relocate stock
+LAYER_NEUTRAL_TYPES = ("TRANSFER",)
+
+# Source whose uncosted receipts give back earlier decreases of the same
+# source_id (order cancellation) instead of being new stock
+RESTORING_SOURCE = "order"
+
+
+def _first_open_layers(db: Session, product_ids: list[int]) -> dict[int, list]:
+    """
+    First LAYER_FETCH_SIZE open layers of many products in ONE query
+    (LATERAL per product on the open-layer index), locked FOR UPDATE
+    in product then layer id order.
+    """
+    rows = db.execute(
+        text(
+            "SELECT layer.product_id, layer.id, layer.remaining, layer.unit_cost "
+            "FROM unnest(:ids) AS p(product_id) "
+            "CROSS JOIN LATERAL ("
+            "  SELECT id, product_id, remaining, unit_cost FROM cost_layers"
+            "  WHERE product_id = p.product_id AND remaining > 0"
+            "  ORDER BY id LIMIT :fetch FOR UPDATE"
+            ") AS layer"
+        ).bindparams(bindparam("ids", type_=ARRAY(Integer))),
+        {"ids": sorted(product_ids), "fetch": LAYER_FETCH_SIZE},
+    ).all()
+    first: dict[int, list] = {}
+    for row in rows:
+        first.setdefault(row.product_id, []).append(row)
+    return first
+
+
+def _open_layers(db: Session, product_id: int, first: list) -> Iterator[list]:
+    """
+    Open layers of a product, oldest first, as [id, remaining, unit_cost]:
+    the prefetched `first` ones, then a few at a time (only when they
+    run out), locked FOR UPDATE.
+    """
+    rows = first
+    while rows:
+        for row in rows:
+            yield [row.id, row.remaining, row.unit_cost]
+        if len(rows) < LAYER_FETCH_SIZE:
+            return
+        rows = db.execute(
+            select(CostLayer.id, CostLayer.remaining, CostLayer.unit_cost)
+            .where(
+                CostLayer.product_id == product_id,
+                CostLayer.remaining > 0,
+                CostLayer.id > rows[-1].id,
+            )
+            .order_by(CostLayer.id)
+            .limit(LAYER_FETCH_SIZE)
+            .with_for_update()
+        ).all()
+
+
+def apply_cost_layers(db: Session, rows: list[dict], movement_ids: list[int]) -> None:
+    """
+    Open layers for the costed receipts of a batch of new movements and
+    consume layers for its decreases. Does NOT commit.
+
+    Products are processed in id order (layer row locks always taken in
+    the same order as the stock advisory locks).
+    """
+    movements = [
+        {**row, "id": movement_id, "quantity": Decimal(row["quantity"])}
+        for row, movement_id in zip(rows, movement_ids)
+        if row["movement_type"] not in LAYER_NEUTRAL_TYPES
+    ]
+
+    receipts = [m for m in movements if m["quantity"] > 0 and m.get("unit_cost") is not None]
+    if receipts:
+        db.execute(
+            insert(CostLayer),
+            [
+                {
+                    "product_id": m["product_id"],
+                    "movement_id": m["id"],
+                    "received_at": m["occurred_at"],
+                    "quantity": m["quantity"],
+                    "remaining": m["quantity"],
+                    "unit_cost": m["unit_cost"],
+                }
+                for m in receipts
+            ],
+        )
+
+    decreases = sorted(
+        (m for m in movements if m["quantity"] < 0),
+        key=lambda m: (m["product_id"], m["id"]),
+    )
+    if not decreases:
+        return
+
+    first = _first_open_layers(db, list({m["product_id"] for m in decreases}))
+    consumptions = []
+    touched = []
+    for product_id, product_decreases in groupby(decreases, key=lambda m: m["product_id"]):
+        layers = _open_layers(db, product_id, first.get(product_id, []))
+        layer = None
+        for m in product_decreases:
+            consumed = {
+                "product_id": product_id,
+                "movement_id": m["id"],
+                "movement_type": m["movement_type"],
+                "consumed_at": m["occurred_at"],
+            }
+            needed = -m["quantity"]
+            while needed > 0:
+                if layer is None or layer[1] == 0:
+                    layer = next(layers, None)
+                    if layer is None:
+                        break
+                    touched.append(layer)
+                taken = min(needed, layer[1])
+                layer[1] -= taken
+                needed -= taken
+                consumptions.append(
+                    {**consumed, "layer_id": layer[0], "quantity": taken, "unit_cost": layer[2]}
+                )
+            if needed > 0:
+                consumptions.append({**consumed, "layer_id": None, "quantity": needed, "unit_cost": None})
+
+    if touched:
+        db.execute(
+            update(CostLayer),
+            [{"id": layer[0], "remaining": layer[1]} for layer in touched],
+        )
+    db.execute(insert(CostLayerConsumption), consumptions)
+
+
+def restore_cost_layer_consumptions(db: Session, movement_ids: list[int]) -> None:
+    """
+    Put back into their layers what the given decreases took and drop
+    their consumptions (their stock came back, e.g. canceled order).
+    Layer rows locked in id order. Does NOT commit.
+    """
+    if not movement_ids:
+        return
+    taken = dict(
+        db.execute(
+            select(CostLayerConsumption.layer_id, func.sum(CostLayerConsumption.quantity))
+            .where(
+                CostLayerConsumption.movement_id.in_(movement_ids),
+                CostLayerConsumption.layer_id.is_not(None),
+            )
+            .group_by(CostLayerConsumption.layer_id)
+        ).all()
+    )
+    if taken:
+        layers = db.execute(
+            select(CostLayer.id, CostLayer.remaining)
+            .where(CostLayer.id.in_(taken))
+            .order_by(CostLayer.id)
+            .with_for_update()
+        ).all()
+        db.execute(
+            update(CostLayer),
+            [{"id": layer.id, "remaining": layer.remaining + taken[layer.id]} for layer in layers],
+        )
+    db.execute(
+        delete(CostLayerConsumption).where(CostLayerConsumption.movement_id.in_(movement_ids))
+    )
+
+
+def replay_cost_layers(movements: Iterable) -> tuple[list[dict], list[dict]]:
+    """
+    Layers and consumptions of one product from its movements (oldest
+    first), same rules as apply_cost_layers one movement at a time;
+    uncosted receipts of RESTORING_SOURCE give back the consumptions of
+    their source's earlier decreases (restore_cost_layer_consumptions).
+    Consumptions reference their layer by position ("layer_index").
+    """
+    layers: list[dict] = []
+    consumptions: list[dict | None] = []
+    # Consumptions (positions) of the decreases of each restoring source
+    restorable: dict[str, list[int]] = {}
+    first_open = 0
+
+    for m in movements:
+        quantity = Decimal(m.quantity)
+        if m.movement_type in LAYER_NEUTRAL_TYPES:
+            continue
+        if quantity > 0 and m.unit_cost is None and m.source_entity == RESTORING_SOURCE:
+            for position in restorable.pop(m.source_id, []):
+                consumption = consumptions[position]
+                consumptions[position] = None
+                if consumption["layer_index"] is not None:
+                    layers[consumption["layer_index"]]["remaining"] += consumption["quantity"]
+                    first_open = min(first_open, consumption["layer_index"])
+        elif quantity > 0 and m.unit_cost is not None:
+            layers.append({
+                "product_id": m.product_id,
+                "movement_id": m.id,
+                "received_at": m.occurred_at,
+                "quantity": quantity,
+                "remaining": quantity,
+                "unit_cost": m.unit_cost,
+            })
+        elif quantity < 0:
+            needed = -quantity
+            consumed = {
+                "product_id": m.product_id,
+                "movement_id": m.id,
+                "movement_type": m.movement_type,
+                "consumed_at": m.occurred_at,
+            }
+            start = len(consumptions)
+            while needed > 0 and first_open < len(layers):
+                layer = layers[first_open]
+                if layer["remaining"] == 0:
+                    # Closed layer behind a restored one
+                    first_open += 1
+                    continue
+                taken = min(needed, layer["remaining"])
+                layer["remaining"] -= taken
+                needed -= taken
+                consumptions.append(
+                    {**consumed, "layer_index": first_open, "quantity": taken, "unit_cost": layer["unit_cost"]}
+                )
+                if layer["remaining"] == 0:
+                    first_open += 1
+            if needed > 0:
+                consumptions.append({**consumed, "layer_index": None, "quantity": needed, "unit_cost": None})
+            if m.source_entity == RESTORING_SOURCE:
+                restorable.setdefault(m.source_id, []).extend(range(start, len(consumptions)))
+
+    return layers, [c for c in consumptions if c is not None]
+
+
+def rebuild_cost_layers(db: Session, product_ids: list[int]) -> tuple[int, int]:
+    """
+    Regenerate the layers and consumptions of `product_ids` from the
+    ledger (movement id order). Returns (layers, consumptions) written.
+
+    - The caller locks the products (lock_products_exclusive) and commits
+    """
+    ids = sorted(set(product_ids))
+    if not ids:
+        return 0, 0
+
+    db.execute(delete(CostLayerConsumption).where(CostLayerConsumption.product_id.in_(ids)))
+    db.execute(delete(CostLayer).where(CostLayer.product_id.in_(ids)))
+
+    rows = db.execute(
+        select(
+            InventoryMovement.id,
+            InventoryMovement.product_id,
+            InventoryMovement.movement_type,
+            InventoryMovement.quantity,
+            InventoryMovement.unit_cost,
+            InventoryMovement.occurred_at,
+            InventoryMovement.source_entity,
+            InventoryMovement.source_id,
+        )
+        .where(InventoryMovement.product_id.in_(ids))
+        .order_by(InventoryMovement.product_id, InventoryMovement.id)
+    ).all()
+
+    layers, consumptions = [], []
+    for _, movements in groupby(rows, key=lambda row: row.product_id):
+        product_layers, product_consumptions = replay_cost_layers(movements)
+        offset = len(layers)
+        layers += product_layers
+        consumptions += [
+            {**c, "layer_index": None if c["layer_index"] is None else offset + c["layer_index"]}
+            for c in product_consumptions
+        ]
+
+    layer_ids = []
+    if layers:
+        layer_ids = db.execute(
+            insert(CostLayer).returning(CostLayer.id, sort_by_parameter_order=True),
+            layers,
+        ).scalars().all()
+
+    if consumptions:
+        for consumption in consumptions:
+            index = consumption.pop("layer_index")
+            consumption["layer_id"] = None if index is None else layer_ids[index]
+        db.execute(insert(CostLayerConsumption), consumptions)
+    return len(layers), len(consumptions)
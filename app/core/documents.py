@@ -0,0 +1,49 @@
+# app/core/documents.py
+
+import re
+
+from sqlalchemy.orm import Session
+
+from app.models.customer import Customer
+
+# ---------------------------------------------------------------------------
+# CPF / CNPJ normalization
+# ---------------------------------------------------------------------------
+# customers.document keeps whatever format the source sent
+# ("12.345.678/0001-90", "12345678000190", ...). The database derives
+# customers.document_normalized from it (generated column, unique index):
+#
+#   digits only, and only when they form a CPF (11) or CNPJ (14)
+#
+# normalize_document() applies the same rule in Python, so lookups by
+# document always hit that index whatever format the caller received.
+# ---------------------------------------------------------------------------
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_document(value: str | None) -> str | None:
+    """
+    Digits-only CPF/CNPJ, or None when `value` is not one.
+    """
+    if not value:
+        return None
+    digits = _NON_DIGITS.sub("", value)
+    if len(digits) in (11, 14):
+        return digits
+    return None
+
+
+def find_by_document(db: Session, value: str | None) -> Customer | None:
+    """
+    Customer / supplier with this CPF/CNPJ (any format), via the
+    document_normalized unique index.
+    """
+    document = normalize_document(value)
+    if document is None:
+        return None
+    return (
+        db.query(Customer)
+        .filter(Customer.document_normalized == document)
+        .one_or_none()
+    )
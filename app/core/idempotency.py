@@ -0,0 +1,292 @@
+# app/core/idempotency.py
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import event, select, update, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.idempotency_key import IdempotencyKey
+
+# ---------------------------------------------------------------------------
+# Idempotency-Key support for write endpoints
+# ---------------------------------------------------------------------------
+# Flow inside an endpoint:
+#
+#   replay = replay_or_claim(db, scope=..., user_id=..., key=..., payload=...)
+#   if replay is not None:
+#       return replay                      # stored response, no domain writes
+#   ... domain writes ...
+#   save_response(db, scope=..., user_id=..., key=..., status_code=..., body=...)
+#   db.commit()                            # claim + response + writes together
+#
+# Keys belong to the calling user: two users sending the same key never
+# see each other's claim or response.
+#
+# The key row is INSERTed before the domain writes. A concurrent request
+# from the same user with the same key blocks on the unique index until the first one commits
+# (then it replays the stored response) or rolls back (then it proceeds).
+#
+# Completed responses are also kept in a small per-process cache, so hot
+# retries are answered without a database round-trip.
+# ---------------------------------------------------------------------------
+
+CACHE_MAX_ENTRIES = 10_000
+
+_cache: OrderedDict = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _fingerprint(payload) -> str:
+    """
+    Stable hash of a request payload (Pydantic model, dict or list).
+    """
+    canonical = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _cache_get(scope: str, user_id: int, key: str):
+    with _cache_lock:
+        entry = _cache.get((scope, user_id, key))
+        if entry is None:
+            return None
+        if entry["expires_at"] <= _now():
+            del _cache[(scope, user_id, key)]
+            return None
+        _cache.move_to_end((scope, user_id, key))
+        return entry
+
+
+def _cache_put(scope: str, user_id: int, key: str, entry: dict) -> None:
+    with _cache_lock:
+        _cache[(scope, user_id, key)] = entry
+        _cache.move_to_end((scope, user_id, key))
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publish_committed_responses(session: Session) -> None:
+    """
+    Move responses saved in this transaction into the hot cache.
+
+    Only committed responses are cached: a rolled-back write must never
+    be replayed.
+    """
+    for scope, user_id, key, entry in session.info.pop("idempotency_pending", []):
+        _cache_put(scope, user_id, key, entry)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_pending_responses(session: Session) -> None:
+    session.info.pop("idempotency_pending", None)
+
+
+def _replay(entry: dict, request_hash: str) -> JSONResponse:
+    if entry["request_hash"] != request_hash:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used with a different payload",
+        )
+
+    if entry["status_code"] is None:
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still being processed",
+        )
+
+    return JSONResponse(
+        status_code=entry["status_code"],
+        content=entry["response_body"],
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def _load(db: Session, scope: str, user_id: int, key: str) -> dict | None:
+    row = db.execute(
+        select(
+            IdempotencyKey.request_hash,
+            IdempotencyKey.status_code,
+            IdempotencyKey.response_body,
+            IdempotencyKey.expires_at,
+        ).where(
+            IdempotencyKey.scope == scope,
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.expires_at > _now(),
+        )
+    ).mappings().first()
+
+    return dict(row) if row else None
+
+
+def replay_or_claim(
+    db: Session,
+    *,
+    scope: str,
+    user_id: int,
+    key: str | None,
+    payload,
+) -> JSONResponse | None:
+    """
+    Return the stored response for a repeated key, or claim the key.
+
+    - key=None: idempotency not requested, nothing happens
+    - Known key of this user (cache, then DB): returns the stored JSONResponse
+    - New key: inserts the claim row (NOT committed) and returns None;
+      the caller must then call save_response() before committing
+    """
+    if key is None:
+        return None
+
+    request_hash = _fingerprint(payload)
+
+    # 1) Hot path: per-process cache (completed responses only)
+    entry = _cache_get(scope, user_id, key)
+    if entry is not None:
+        return _replay(entry, request_hash)
+
+    # 2) Stored response from a previous (committed) request
+    entry = _load(db, scope, user_id, key)
+    if entry is not None:
+        if entry["status_code"] is not None:
+            _cache_put(scope, user_id, key, entry)
+        return _replay(entry, request_hash)
+
+    # 3) Claim the key. An expired row with the same key is taken over.
+    claimed = db.execute(
+        insert(IdempotencyKey)
+        .values(
+            scope=scope,
+            user_id=user_id,
+            key=key,
+            request_hash=request_hash,
+            expires_at=_now() + timedelta(hours=settings.idempotency_ttl_hours),
+        )
+        .on_conflict_do_update(
+            constraint="uq_idempotency_keys_scope_user_key",
+            set_={
+                "request_hash": request_hash,
+                "status_code": None,
+                "response_body": None,
+                "created_at": _now(),
+                "expires_at": _now() + timedelta(hours=settings.idempotency_ttl_hours),
+            },
+            where=IdempotencyKey.expires_at <= _now(),
+        )
+        .returning(IdempotencyKey.id)
+    ).first()
+
+    if claimed is None:
+        # Lost the race: another request with this key committed first
+        db.rollback()
+        entry = _load(db, scope, user_id, key)
+        if entry is None:
+            raise HTTPException(
+                status_code=409,
+                detail="A request with this Idempotency-Key is still being processed",
+            )
+        return _replay(entry, request_hash)
+
+    return None
+
+
+def save_response(
+    db: Session,
+    *,
+    scope: str,
+    user_id: int,
+    key: str | None,
+    status_code: int,
+    body,
+) -> None:
+    """
+    Store the response for a claimed key (NOT committed).
+
+    Must run in the same transaction as the domain writes, so the
+    stored response and the data it describes commit together.
+    """
+    if key is None:
+        return
+
+    content = jsonable_encoder(body)
+
+    stored = db.execute(
+        update(IdempotencyKey)
+        .where(
+            IdempotencyKey.scope == scope,
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+        )
+        .values(status_code=status_code, response_body=content)
+        .returning(IdempotencyKey.request_hash, IdempotencyKey.expires_at)
+    ).mappings().one()
+
+    db.info.setdefault("idempotency_pending", []).append(
+        (
+            scope,
+            user_id,
+            key,
+            {
+                **stored,
+                "status_code": status_code,
+                "response_body": content,
+            },
+        )
+    )
+
+
+def release_claim(db: Session, *, scope: str, user_id: int, key: str | None) -> None:
+    """
+    Free a committed claim whose request failed before saving a
+    response (multi-transaction endpoints), so a retry can run.
+    Commits.
+
+    Only a pending claim is removed: a stored response is kept.
+    """
+    if key is None:
+        return
+    db.execute(
+        delete(IdempotencyKey).where(
+            IdempotencyKey.scope == scope,
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.status_code.is_(None),
+        )
+    )
+    db.commit()
+
+
+def purge_expired(db: Session, batch_size: int = 5000) -> int:
+    """
+    Delete expired keys in batches. Returns the number of rows removed.
+    """
+    removed = 0
+    while True:
+        expired_ids = (
+            select(IdempotencyKey.id)
+            .where(IdempotencyKey.expires_at <= _now())
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        deleted = db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.id.in_(expired_ids))
+        ).rowcount
+        db.commit()
+
+        removed += deleted
+        if deleted < batch_size:
+            return removed
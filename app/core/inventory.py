@@ -0,0 +1,238 @@
+# app/core/inventory.py
+
+from decimal import Decimal
+from typing import Iterable
+
+from sqlalchemy import bindparam, delete, func, insert, select, text, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.types import Integer
+
+from app.core.cost_layers import apply_cost_layers
+from app.core.lots import apply_lots
+from app.core.valuation import apply_costs
+from app.models.inventory_movement import InventoryMovement
+from app.models.stock_reservation import StockReservation
+from app.models.warehouse_balance import WarehouseBalance
+
+# ---------------------------------------------------------------------------
+# Per-product stock locks (transaction-level advisory locks)
+# ---------------------------------------------------------------------------
+# The balance is SUM(quantity) over the ledger. Writers that only APPEND
+# movements (orders, purchases) never read it, so they can run in
+# parallel; a stock count (ADJUST = counted - current) must read it
+# and write the delta with nobody appending in between.
+#
+#   lock_products_shared()     order / purchase writes (many at once)
+#   lock_products_exclusive()  adjustments (waits for in-flight writers,
+#                              blocks new ones until it commits)
+#
+# Locks are pg_advisory_xact_lock(STOCK_LOCK_NAMESPACE, product_id):
+# no table rows, released automatically at commit / rollback.
+# Several products are always locked in ascending id order, so two
+# transactions can never wait on each other's products (no deadlocks).
+# ---------------------------------------------------------------------------
+
+# First key of the two-key advisory lock: keeps product ids apart from
+# any other advisory lock user in the database
+STOCK_LOCK_NAMESPACE = 1001
+
+
+def _lock_products(db: Session, product_ids: Iterable[int], function: str) -> None:
+    ids = sorted({int(product_id) for product_id in product_ids})
+    if not ids:
+        return
+    # unnest() yields the (sorted) array in order: locks are taken in order
+    db.execute(
+        text(
+            f"SELECT {function}(:namespace, product_id) "
+            f"FROM unnest(:ids) AS product_id"
+        ).bindparams(bindparam("ids", type_=ARRAY(Integer))),
+        {"namespace": STOCK_LOCK_NAMESPACE, "ids": ids},
+    )
+
+
+def lock_products_shared(db: Session, product_ids: Iterable[int]) -> None:
+    """
+    Lock products for appending movements (compatible with each other).
+    Held until the transaction ends.
+    """
+    _lock_products(db, product_ids, "pg_advisory_xact_lock_shared")
+
+
+def lock_products_exclusive(db: Session, product_ids: Iterable[int]) -> None:
+    """
+    Lock products for a read-balance-then-write (stock count).
+    Held until the transaction ends.
+    """
+    _lock_products(db, product_ids, "pg_advisory_xact_lock")
+
+
+# Main stock location: movements posted without a warehouse_id
+DEFAULT_WAREHOUSE_ID = 1
+
+
+def stock_balance(db: Session, product_id: int, warehouse_id: int | None = None):
+    """
+    Current balance of one product (SUM of its movements), company-wide
+    or in one warehouse.
+    """
+    query = (
+        db.query(func.coalesce(func.sum(InventoryMovement.quantity), 0))
+        .filter(InventoryMovement.product_id == product_id)
+    )
+    if warehouse_id is not None:
+        query = query.filter(InventoryMovement.warehouse_id == warehouse_id)
+    return query.scalar()
+
+
+def stock_balances(
+    db: Session,
+    product_ids: Iterable[int],
+    warehouse_id: int | None = None,
+) -> dict:
+    """
+    Current balance of many products in ONE grouped query, company-wide
+    or in one warehouse. Products without movements are returned with 0.
+    """
+    ids = sorted(set(product_ids))
+    balances = dict.fromkeys(ids, 0)
+    if ids:
+        query = (
+            select(InventoryMovement.product_id, func.sum(InventoryMovement.quantity))
+            .where(InventoryMovement.product_id.in_(ids))
+            .group_by(InventoryMovement.product_id)
+        )
+        if warehouse_id is not None:
+            query = query.where(InventoryMovement.warehouse_id == warehouse_id)
+        balances.update(db.execute(query).all())
+    return balances
+
+
+# ---------------------------------------------------------------------------
+# Per-warehouse balances (projection of the ledger)
+# ---------------------------------------------------------------------------
+# warehouse_balances holds SUM(quantity) per (product, warehouse),
+# updated by post_movements in the same transaction: per-location reads
+# are primary key lookups instead of ledger scans.
+# Movements inserted outside post_movements (legacy ETL) are not
+# projected: scripts/maintenance/rebuild_warehouse_balances.py.
+# ---------------------------------------------------------------------------
+
+
+def apply_warehouse_balances(db: Session, rows: list[dict]) -> None:
+    """
+    Add a batch of new movements to warehouse_balances with ONE upsert
+    (keys in product order, like the stock locks). Does NOT commit.
+    """
+    totals: dict[tuple[int, int], Decimal] = {}
+    for row in rows:
+        key = (row["product_id"], row.get("warehouse_id", DEFAULT_WAREHOUSE_ID))
+        totals[key] = totals.get(key, Decimal(0)) + Decimal(row["quantity"])
+    if not totals:
+        return
+
+    stmt = pg_insert(WarehouseBalance).values([
+        {"product_id": product_id, "warehouse_id": warehouse_id, "quantity": quantity}
+        for (product_id, warehouse_id), quantity in sorted(totals.items())
+    ])
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[WarehouseBalance.product_id, WarehouseBalance.warehouse_id],
+            set_={
+                "quantity": WarehouseBalance.quantity + stmt.excluded.quantity,
+                "updated_at": func.now(),
+            },
+        )
+    )
+
+
+def lock_warehouse_balances(db: Session, keys: Iterable[tuple[int, int]]) -> None:
+    """
+    Row-lock the existing balances of (product_id, warehouse_id) keys in
+    key order, for a transaction that updates them in several
+    statements. Does NOT commit.
+    """
+    keys = sorted(set(keys))
+    if keys:
+        db.execute(
+            select(WarehouseBalance.product_id)
+            .where(tuple_(WarehouseBalance.product_id, WarehouseBalance.warehouse_id).in_(keys))
+            .order_by(WarehouseBalance.product_id, WarehouseBalance.warehouse_id)
+            .with_for_update()
+        )
+
+
+def rebuild_warehouse_balances(db: Session, product_ids: list[int]) -> int:
+    """
+    Recompute warehouse_balances of `product_ids` from the ledger (ONE
+    grouped query) and the reserved counters from the ACTIVE
+    reservations. Returns the number of balances written.
+
+    - The caller locks the products (lock_products_exclusive) and commits
+    """
+    ids = sorted(set(product_ids))
+    if not ids:
+        return 0
+
+    db.execute(delete(WarehouseBalance).where(WarehouseBalance.product_id.in_(ids)))
+    written = db.execute(
+        insert(WarehouseBalance).from_select(
+            ["product_id", "warehouse_id", "quantity"],
+            select(
+                InventoryMovement.product_id,
+                InventoryMovement.warehouse_id,
+                func.sum(InventoryMovement.quantity),
+            )
+            .where(InventoryMovement.product_id.in_(ids))
+            .group_by(InventoryMovement.product_id, InventoryMovement.warehouse_id),
+        )
+    ).rowcount
+
+    reserved = pg_insert(WarehouseBalance).from_select(
+        ["product_id", "warehouse_id", "reserved"],
+        select(
+            StockReservation.product_id,
+            StockReservation.warehouse_id,
+            func.sum(StockReservation.quantity),
+        )
+        .where(
+            StockReservation.product_id.in_(ids),
+            StockReservation.status == "ACTIVE",
+        )
+        .group_by(StockReservation.product_id, StockReservation.warehouse_id),
+    )
+    db.execute(
+        reserved.on_conflict_do_update(
+            index_elements=[WarehouseBalance.product_id, WarehouseBalance.warehouse_id],
+            set_={"reserved": reserved.excluded.reserved},
+        )
+    )
+    return written
+
+
+def post_movements(db: Session, rows: list[dict]) -> list[int]:
+    """
+    Append movements with ONE multi-row INSERT.
+    Returns the new ids, in the same order as `rows`.
+
+    - warehouse_balances, product_costs (quantity / average cost), the
+      FIFO cost layers and the lot allocations updated in the same
+      transaction: see above, app.core.valuation, app.core.cost_layers
+      and app.core.lots
+    - Does NOT lock or commit: the caller owns the transaction
+    """
+    if not rows:
+        return []
+    rows = [{"warehouse_id": DEFAULT_WAREHOUSE_ID, **row} for row in rows]
+    ids = db.execute(
+        insert(InventoryMovement).returning(
+            InventoryMovement.id, sort_by_parameter_order=True
+        ),
+        rows,
+    ).scalars().all()
+    apply_warehouse_balances(db, rows)
+    apply_costs(db, rows)
+    apply_cost_layers(db, rows, ids)
+    apply_lots(db, rows, ids)
+    return ids
@@ -0,0 +1,221 @@
+# app/core/lots.py
+
+from datetime import datetime
+from decimal import Decimal
+from itertools import groupby
+from typing import Iterator
+
+from sqlalchemy import delete, func, insert, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.models.lot import Lot
+from app.models.lot_allocation import LotAllocation
+
+# ---------------------------------------------------------------------------
+# Lots and expiry (FEFO allocation)
+# ---------------------------------------------------------------------------
+# Purchase lines carrying NF-e rastro data open one lot per rastro line
+# in the receiving warehouse (open_lots); every stock decrease of a
+# lot-tracked product takes its quantity from the open lots of its
+# warehouse, earliest expiry first, oldest receipt on ties (FEFO/FIFO):
+#
+#   lots              receipt, lot number, expiry, quantity, remaining
+#   lot_allocations   decrease, lot, quantity
+#
+# The next lot is found through a partial index on
+# (product_id, warehouse_id, expires_on, id) WHERE remaining > 0;
+# closed lots drop out of it. Maintained by post_movements (same
+# transaction). Products / warehouses without open lots are not
+# allocated, and quantity beyond the open lots is left unallocated.
+# Transfers carry their lots: the receiving side opens lots with the
+# number and dates of the lots taken at the source.
+# Sales (SALE_TYPES) never take a lot expired on their date: expired
+# stock stays for the near-expiry report and is written off (negative
+# ADJUST) or moved (TRANSFER), which take expired lots first.
+# ---------------------------------------------------------------------------
+
+# Open lots read (and row-locked) per round trip while allocating
+LOT_FETCH_SIZE = 16
+
+# Decreases that must not take expired lots
+SALE_TYPES = ("OUT",)
+
+
+def _open_lots(db: Session, product_id: int, warehouse_id: int) -> Iterator[list]:
+    """
+    Open lots of a product in a warehouse, FEFO order, as
+    [id, remaining, lot_number, manufactured_on, expires_on].
+    Fetched a few at a time and locked FOR UPDATE.
+    """
+    after = None
+    while True:
+        query = (
+            select(
+                Lot.id,
+                Lot.remaining,
+                Lot.lot_number,
+                Lot.manufactured_on,
+                Lot.expires_on,
+            )
+            .where(
+                Lot.product_id == product_id,
+                Lot.warehouse_id == warehouse_id,
+                Lot.remaining > 0,
+            )
+            .order_by(Lot.expires_on, Lot.id)
+            .limit(LOT_FETCH_SIZE)
+            .with_for_update()
+        )
+        if after is not None:
+            query = query.where(tuple_(Lot.expires_on, Lot.id) > after)
+        rows = db.execute(query).all()
+        if not rows:
+            return
+        for row in rows:
+            yield list(row)
+        after = (rows[-1].expires_on, rows[-1].id)
+
+
+def _candidates(fetched: list, lots: Iterator[list]) -> Iterator[list]:
+    """
+    Lots of a pair in FEFO order: the ones already fetched (a sale may
+    have skipped expired ones), then more from `lots` as needed.
+    """
+    yield from fetched
+    for lot in lots:
+        fetched.append(lot)
+        yield lot
+
+
+def open_lots(db: Session, lots: list[dict]) -> None:
+    """
+    Open lots for received movements. Each dict: product_id,
+    warehouse_id, lot_number, manufactured_on, expires_on, movement_id,
+    received_at, quantity. Does NOT commit.
+    """
+    if lots:
+        db.execute(insert(Lot), [{**lot, "remaining": lot["quantity"]} for lot in lots])
+
+
+def apply_lots(db: Session, rows: list[dict], movement_ids: list[int]) -> None:
+    """
+    Allocate the decreases of a batch of new movements to open lots
+    (FEFO; sales skip lots expired on their date) and move the lots of
+    its transfers. Does NOT commit.
+
+    (product, warehouse) pairs are processed in order (lot row locks
+    always taken in the same order as the stock advisory locks).
+    """
+    movements = [
+        {**row, "id": movement_id, "quantity": Decimal(row["quantity"])}
+        for row, movement_id in zip(rows, movement_ids)
+    ]
+    decreases = sorted(
+        (m for m in movements if m["quantity"] < 0),
+        key=lambda m: (m["product_id"], m["warehouse_id"], m["id"]),
+    )
+    if not decreases:
+        return
+
+    # Pairs that have open lots at all: ONE query on the open-lot index
+    tracked = set(
+        db.execute(
+            select(Lot.product_id, Lot.warehouse_id)
+            .where(
+                Lot.product_id.in_({m["product_id"] for m in decreases}),
+                Lot.remaining > 0,
+            )
+            .distinct()
+        ).all()
+    )
+    if not tracked:
+        return
+
+    # Receiving side of each transfer (same product and source_id)
+    transfer_in = {
+        (m["product_id"], m["source_id"]): m
+        for m in movements
+        if m["movement_type"] == "TRANSFER" and m["quantity"] > 0
+    }
+
+    allocations = []
+    moved = []
+    touched = {}
+    for key, pair_decreases in groupby(decreases, key=lambda m: (m["product_id"], m["warehouse_id"])):
+        if key not in tracked:
+            continue
+        lots = _open_lots(db, *key)
+        fetched = []
+        for m in pair_decreases:
+            receiver = transfer_in.get((m["product_id"], m.get("source_id")))
+            on = m["occurred_at"]
+            on = on.date() if isinstance(on, datetime) else on
+            needed = -m["quantity"]
+            for lot in _candidates(fetched, lots):
+                if lot[1] == 0 or (m["movement_type"] in SALE_TYPES and lot[4] < on):
+                    continue
+                taken = min(needed, lot[1])
+                lot[1] -= taken
+                needed -= taken
+                touched[lot[0]] = lot
+                allocations.append({
+                    "lot_id": lot[0],
+                    "product_id": m["product_id"],
+                    "movement_id": m["id"],
+                    "movement_type": m["movement_type"],
+                    "allocated_at": m["occurred_at"],
+                    "quantity": taken,
+                })
+                if m["movement_type"] == "TRANSFER" and receiver is not None:
+                    moved.append({
+                        "product_id": receiver["product_id"],
+                        "warehouse_id": receiver["warehouse_id"],
+                        "lot_number": lot[2],
+                        "manufactured_on": lot[3],
+                        "expires_on": lot[4],
+                        "movement_id": receiver["id"],
+                        "received_at": receiver["occurred_at"],
+                        "quantity": taken,
+                    })
+                if needed == 0:
+                    break
+
+    if touched:
+        db.execute(
+            update(Lot),
+            [{"id": lot[0], "remaining": lot[1]} for lot in touched.values()],
+        )
+    if allocations:
+        db.execute(insert(LotAllocation), allocations)
+    open_lots(db, moved)
+
+
+def restore_lot_allocations(db: Session, movement_ids: list[int]) -> None:
+    """
+    Put back into their lots what the given decreases took and drop
+    their allocations (their stock came back, e.g. canceled order).
+    Lot rows locked in id order. Does NOT commit.
+    """
+    if not movement_ids:
+        return
+    taken = dict(
+        db.execute(
+            select(LotAllocation.lot_id, func.sum(LotAllocation.quantity))
+            .where(LotAllocation.movement_id.in_(movement_ids))
+            .group_by(LotAllocation.lot_id)
+        ).all()
+    )
+    if taken:
+        lots = db.execute(
+            select(Lot.id, Lot.remaining)
+            .where(Lot.id.in_(taken))
+            .order_by(Lot.id)
+            .with_for_update()
+        ).all()
+        db.execute(
+            update(Lot),
+            [{"id": lot.id, "remaining": lot.remaining + taken[lot.id]} for lot in lots],
+        )
+        db.execute(
+            delete(LotAllocation).where(LotAllocation.movement_id.in_(movement_ids))
+        )
@@ -0,0 +1,113 @@
+# app/core/pagination.py
+
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+from sqlalchemy.types import Date, DateTime
+
+# ---------------------------------------------------------------------------
+# Keyset (cursor) pagination
+# ---------------------------------------------------------------------------
+# List endpoints page on an indexed, unique sort key such as
+# (created_at, id) or (name, id):
+#
+#   WHERE (created_at, id) < (:last_created_at, :last_id)
+#   ORDER BY created_at DESC, id DESC
+#   LIMIT :limit
+#
+# Cost per page is constant (index seek), and rows inserted while a client
+# is paging do not shift the following pages.
+#
+# The cursor is opaque to clients (base64 JSON of the last row's key).
+# The next cursor is returned in the X-Next-Cursor response header, so
+# list response bodies keep their shape.
+# ---------------------------------------------------------------------------
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values],
+        separators=(",", ":"),
+        default=str,
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys) -> list:
+    """
+    Decode a cursor back into typed key values (400 if it is malformed).
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError("cursor length mismatch")
+        if any(isinstance(v, (list, dict)) for v in values):
+            raise TypeError("cursor values must be scalars")
+
+        return [
+            datetime.fromisoformat(v) if isinstance(key.type, DateTime) and v is not None
+            else date.fromisoformat(v) if isinstance(key.type, Date) and v is not None
+            else v
+            for key, v in zip(keys, values)
+        ]
+    # Tampered cursors: bad base64 / UTF-8 / JSON, wrong value types
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(
+    query,
+    keys,
+    *,
+    cursor: str | None,
+    skip: int,
+    limit: int,
+    response: Response,
+    descending: bool = False,
+    row_keys=None,
+):
+    """
+    Apply keyset ordering/filtering to a query and fetch one page.
+
+    - keys: columns of the sort key; the last one must be unique (id)
+    - cursor: value from a previous X-Next-Cursor header (takes precedence)
+    - skip: DEPRECATED offset fallback, only used without a cursor
+    - row_keys: extracts the key values from a result row
+      (default: attributes named after the key columns)
+
+    Returns the rows and sets X-Next-Cursor when more rows exist.
+    """
+    if cursor:
+        after = decode_cursor(cursor, keys)
+        if descending:
+            query = query.filter(tuple_(*keys) < tuple_(*after))
+        else:
+            query = query.filter(tuple_(*keys) > tuple_(*after))
+
+    query = query.order_by(*[k.desc() if descending else k.asc() for k in keys])
+
+    if not cursor and skip:
+        query = query.offset(skip)
+
+    # One extra row tells us whether a next page exists
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if has_more:
+        last = rows[-1]
+        values = (
+            row_keys(last)
+            if row_keys
+            else [getattr(last, k.key) for k in keys]
+        )
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(values)
+
+    return rows
@@ -0,0 +1,219 @@
+# app/core/partitions.py
+
+from datetime import date, datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# ---------------------------------------------------------------------------
+# Monthly range partitions
+# ---------------------------------------------------------------------------
+# Append-only ledgers (inventory_movements) are RANGE partitioned by a
+# timestamp, one partition per calendar month:
+#
+#   inventory_movements_2026_10  FOR VALUES FROM ('2026-10-01') TO ('2026-11-01')
+#   inventory_movements_default  DEFAULT (rows outside every month range)
+#
+# Orders / order items are LIST partitioned by `archived` first, then by
+# issue date (monthly hot, yearly archive): see app/core/archive.py.
+#
+# Partitions must exist BEFORE rows arrive, otherwise they land in the
+# DEFAULT partition: ensure_partitions() is run ahead of time by
+# scripts/maintenance/manage_partitions.py (cron).
+#
+# Old months can be detached (kept as plain tables for archive / dump)
+# or dropped; indexes, vacuum and queries then only touch recent data.
+# Only EMPTY months can go: stock balances, average costs, FIFO layers and
+# lots are all sums / replays over the full ledger, so removing a month
+# that still holds movements would silently change on-hand stock.
+# ---------------------------------------------------------------------------
+
+# Partitioned table -> partition key column
+PARTITIONED_TABLES = {
+    "inventory_movements": "occurred_at",
+}
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month.year:04d}_{month.month:02d}"
+
+
+def year_partition_name(table: str, year: int) -> str:
+    return f"{table}_{year:04d}"
+
+
+def list_partitions(db: Session, table: str) -> list[tuple[str, str]]:
+    """
+    (partition name, bound expression) of `table`, oldest first.
+    """
+    rows = db.execute(
+        text("""
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = CAST(:table AS regclass)
+            ORDER BY c.relname
+        """),
+        {"table": table},
+    ).all()
+    return [(name, bound) for name, bound in rows]
+
+
+def create_month_partition(db: Session, table: str, column: str, month: date) -> bool:
+    """
+    Create the partition for `month` if missing. Returns True if created.
+
+    Rows of that month already sitting in the DEFAULT partition are moved
+    into the new partition (Postgres refuses to create it otherwise).
+    Tables referenced by foreign keys must have no such rows (the move is
+    a DELETE + INSERT): see archive.create_order_month_partitions().
+    """
+    month = month_start(month)
+    return create_range_partition(
+        db, table, column, partition_name(table, month), month, add_months(month, 1)
+    )
+
+
+def create_year_partition(db: Session, table: str, column: str, year: int) -> bool:
+    """
+    Create the partition for calendar `year` if missing (cold data).
+    Returns True if created.
+    """
+    return create_range_partition(
+        db, table, column, year_partition_name(table, year), date(year, 1, 1), date(year + 1, 1, 1)
+    )
+
+
+def create_range_partition(
+    db: Session,
+    table: str,
+    column: str,
+    name: str,
+    start: date,
+    end: date,
+) -> bool:
+    """
+    Create partition `name` of `table` for [start, end) if missing.
+    Returns True if created.
+    """
+    exists = db.execute(
+        text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}
+    ).scalar()
+    if exists:
+        return False
+
+    default = f"{table}_default"
+    has_default = db.execute(
+        text("SELECT to_regclass(:name) IS NOT NULL"), {"name": default}
+    ).scalar()
+
+    bounds = {"start": start, "end": end}
+    stray = has_default and db.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {column} >= :start AND {column} < :end)"),
+        bounds,
+    ).scalar()
+
+    if not stray:
+        db.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        return True
+
+    # Move the stray rows: build the partition detached, fill it, attach
+    db.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    db.execute(
+        text(f"""
+            WITH moved AS (
+                DELETE FROM {default}
+                WHERE {column} >= :start AND {column} < :end
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+        """),
+        bounds,
+    )
+    db.execute(text(
+        f"ALTER TABLE {table} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+    return True
+
+
+def ensure_partitions(
+    db: Session,
+    table: str,
+    column: str,
+    months_ahead: int = 3,
+    today: date | None = None,
+) -> list[str]:
+    """
+    Make sure the current month and the next `months_ahead` months have
+    a partition. Returns the names of the partitions created.
+    """
+    current = month_start(today or datetime.now(timezone.utc).date())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if create_month_partition(db, table, column, month):
+            created.append(partition_name(table, month))
+    return created
+
+
+def detach_partitions_before(
+    db: Session,
+    table: str,
+    cutoff: date,
+    drop: bool = False,
+) -> list[str]:
+    """
+    Detach (or drop) monthly partitions that end on or before `cutoff`.
+
+    Detached partitions stay as plain tables (same name) until archived.
+    The DEFAULT partition is never touched.
+
+    Raises ValueError (nothing detached) if any of those months still
+    holds rows: balances are computed over the whole ledger.
+    """
+    cutoff = month_start(cutoff)
+    prefix = f"{table}_"
+    candidates = []
+
+    for name, _ in list_partitions(db, table):
+        suffix = name[len(prefix):]
+        try:
+            month = datetime.strptime(suffix, "%Y_%m").date()
+        except ValueError:
+            continue  # default / non-monthly partition
+        if add_months(month, 1) > cutoff:
+            continue
+        candidates.append(name)
+
+    # Lock first so no movement can be back-dated into a checked month
+    for name in candidates:
+        db.execute(text(f"LOCK TABLE {name} IN SHARE MODE"))
+
+    not_empty = [
+        name for name in candidates
+        if db.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})")).scalar()
+    ]
+    if not_empty:
+        raise ValueError(
+            f"partitions still hold movements and would change stock balances: {', '.join(not_empty)}"
+        )
+
+    for name in candidates:
+        db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        if drop:
+            db.execute(text(f"DROP TABLE {name}"))
+
+    return candidates
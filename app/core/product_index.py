@@ -0,0 +1,273 @@
+# app/core/product_index.py
+
+import re
+import sys
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import timedelta
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.product import Product
+
+# ---------------------------------------------------------------------------
+# In-memory product prefix index (autocomplete)
+# ---------------------------------------------------------------------------
+# One index per worker process. Every active product is reachable by:
+#
+#   - code, barcode, manufacturer_code (whole value, and without
+#     punctuation: "FO-77" -> "fo-77", "fo77")
+#   - each word of its name ("FILTRO DE OLEO" -> "filtro", "de", "oleo")
+#
+# Keys are normalized (lowercase, no accents) and kept in ONE sorted list
+# of (key, kind, product_id) tuples (keys interned: name words repeat a
+# lot across a catalog). A prefix lookup is a bisect to the first
+# key >= prefix followed by a short forward scan: no database round trip.
+#
+# Refresh is incremental: at most every REFRESH_INTERVAL seconds, products
+# with updated_at >= the last seen value are re-read and their keys
+# replaced (inactive products are dropped). The watermark is moved back by
+# REFRESH_OVERLAP because updated_at is the writer's transaction start
+# time, which can be older than its commit; rows of the overlap already
+# applied (same updated_at) are skipped. Changed keys are merged in bulk
+# (one sort of the kept entries + the new ones, already sorted runs) and
+# swapped in: lookups only wait for the swap.
+# ---------------------------------------------------------------------------
+
+REFRESH_INTERVAL = 5.0
+REFRESH_OVERLAP = timedelta(minutes=5)
+
+# Incremental batches larger than this rebuild the whole index instead
+REBUILD_THRESHOLD = 5_000
+
+# Prefix matches examined per lookup before ranking
+MAX_CANDIDATES = 200
+
+# Product fields kept in memory and returned as suggestions
+FIELDS = ("id", "code", "name", "barcode", "manufacturer_code")
+_Stored = namedtuple("_Stored", FIELDS)
+
+# Key kinds (lower ranks first)
+KIND_IDENTIFIER = 0
+KIND_NAME = 1
+
+_SPLIT = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(value: str) -> str:
+    """
+    Lowercase, accent-free form used for keys and prefixes.
+    """
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower().strip()
+
+
+def _words(value: str) -> list[str]:
+    return [w for w in _SPLIT.split(normalize(value)) if w]
+
+
+def _product_entries(product) -> list[tuple[str, int, int]]:
+    """
+    (key, kind, product_id) entries under which a product is indexed.
+    """
+    keys: dict[str, int] = {}
+
+    for identifier in (product.code, product.barcode, product.manufacturer_code):
+        if not identifier:
+            continue
+        keys[normalize(identifier)] = KIND_IDENTIFIER
+        compact = "".join(_words(identifier))
+        if compact:
+            keys[compact] = KIND_IDENTIFIER
+
+    for word in _words(product.name or ""):
+        keys.setdefault(word, KIND_NAME)
+
+    return [(sys.intern(key), kind, product.id) for key, kind in keys.items()]
+
+
+class ProductPrefixIndex:
+    """
+    Sorted-array prefix index over active products.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()  # lookups / swaps
+        self._refresh_lock = threading.Lock()  # one refresher at a time
+        self._entries: list[tuple[str, int, int]] = []  # sorted (key, kind, id)
+        # product_id -> (*FIELDS, updated_at, name words)
+        self._products: dict[int, tuple] = {}
+        self._watermark = None
+        self._loaded = False
+        self._next_refresh = 0.0
+
+    # -----------------------------------------------------------------------
+    # Maintenance
+    # -----------------------------------------------------------------------
+    def invalidate(self) -> None:
+        """
+        Force a refresh on the next lookup (call after local writes).
+        """
+        self._next_refresh = 0.0
+
+    def refresh(self, db: Session) -> None:
+        """
+        Load the index (first call) or apply product changes since the
+        last refresh.
+        """
+        with self._refresh_lock:
+            if self._loaded and time.monotonic() < self._next_refresh:
+                return
+
+            if not self._loaded:
+                self._rebuild(db)
+            else:
+                self._apply_changes(db)
+
+            self._next_refresh = time.monotonic() + REFRESH_INTERVAL
+
+    def _select(self):
+        return select(
+            Product.id,
+            Product.code,
+            Product.name,
+            Product.barcode,
+            Product.manufacturer_code,
+            Product.active,
+            Product.updated_at,
+        )
+
+    def _rebuild(self, db: Session) -> None:
+        rows = db.execute(self._select().where(Product.active.is_(True))).all()
+
+        products = {}
+        entries = []
+        watermark = None
+
+        for row in rows:
+            products[row.id] = self._stored(row)
+            entries.extend(_product_entries(row))
+            if watermark is None or row.updated_at > watermark:
+                watermark = row.updated_at
+
+        entries.sort()
+        with self._lock:
+            self._products = products
+            self._entries = entries
+        self._watermark = watermark
+        self._loaded = True
+
+    def _apply_changes(self, db: Session) -> None:
+        query = self._select()
+        if self._watermark is not None:
+            query = query.where(Product.updated_at >= self._watermark - REFRESH_OVERLAP)
+
+        rows = db.execute(query).all()
+
+        if len(rows) > REBUILD_THRESHOLD:
+            self._rebuild(db)
+            return
+
+        # Only rows newer than what is applied (the overlap re-reads them)
+        changed = []
+        for row in rows:
+            stored = self._products.get(row.id)
+            if stored is None or row.updated_at > stored[len(FIELDS)]:
+                changed.append(row)
+            if self._watermark is None or row.updated_at > self._watermark:
+                self._watermark = row.updated_at
+
+        removed = set()
+        added = []
+        for row in changed:
+            stored = self._products.get(row.id)
+            if stored is not None:
+                removed.update(_product_entries(_Stored(*stored[:len(FIELDS)])))
+            if row.active:
+                added.extend(_product_entries(row))
+        if not removed and not added:
+            return
+
+        # Bulk merge off the lookup lock (only this thread writes entries)
+        entries = [e for e in self._entries if e not in removed] if removed else self._entries[:]
+        added.sort()
+        entries.extend(added)
+        entries.sort()
+
+        with self._lock:
+            for row in changed:
+                if row.active:
+                    self._products[row.id] = self._stored(row)
+                else:
+                    self._products.pop(row.id, None)
+            self._entries = entries
+
+    def _stored(self, row) -> tuple:
+        # Plain tuples: far smaller than dicts or ORM objects per product
+        return (
+            *(getattr(row, field) for field in FIELDS),
+            row.updated_at,
+            tuple(sys.intern(w) for w in _words(row.name or "")),
+        )
+
+    # -----------------------------------------------------------------------
+    # Lookup
+    # -----------------------------------------------------------------------
+    def suggest(self, prefix: str, limit: int = 10) -> list[dict]:
+        """
+        Top `limit` products matching `prefix`.
+
+        A single term is looked up as typed ("fo-7", "78912", "filt").
+        With several terms the longest one is looked up and the others
+        must prefix a word of the product name ("filtro ol").
+        Ranking: exact key match, then identifiers before name words,
+        then name.
+        """
+        value = normalize(prefix)
+        if not value:
+            return []
+
+        terms = value.split()
+        lookup = max(terms, key=len)
+        others = [w for t in terms if t is not lookup for w in _words(t)]
+
+        with self._lock:
+            best: dict[int, tuple] = {}
+            pos = bisect_left(self._entries, (lookup,))
+            scanned = 0
+
+            while pos < len(self._entries) and scanned < MAX_CANDIDATES:
+                key, kind, product_id = self._entries[pos]
+                if not key.startswith(lookup):
+                    break
+                pos += 1
+                scanned += 1
+
+                if others and not all(
+                    any(w.startswith(o) for w in self._products[product_id][-1])
+                    for o in others
+                ):
+                    continue
+
+                rank = (
+                    0 if key == lookup else 1,
+                    kind,
+                    self._products[product_id][2] or "",
+                    product_id,
+                )
+                if product_id not in best or rank < best[product_id]:
+                    best[product_id] = rank
+
+            ranked = sorted(best, key=best.__getitem__)[:limit]
+            return [
+                dict(zip(FIELDS, self._products[product_id]))
+                for product_id in ranked
+            ]
+
+
+# Per-worker singleton
+product_index = ProductPrefixIndex()
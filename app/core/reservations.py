@@ -0,0 +1,231 @@
+# app/core/reservations.py
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Iterable
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.inventory import lock_products_shared, lock_warehouse_balances, post_movements
+from app.models.stock_reservation import StockReservation
+from app.models.warehouse_balance import WarehouseBalance
+
+# ---------------------------------------------------------------------------
+# Stock reservations (DRAFT / OPEN orders)
+# ---------------------------------------------------------------------------
+# A DRAFT / OPEN order does not move stock: each line holds an ACTIVE
+# reservation, counted in warehouse_balances.reserved, and
+#
+#   available to promise = on hand - reserved
+#
+# is read from the counters (no scan of the reservations). Lifecycle:
+#
+#   order confirmed    CONSUMED  (OUT movement posted, counter released)
+#   order canceled     RELEASED  (counter released)
+#   TTL elapsed        EXPIRED   (counter released by the sweeper,
+#                                 scripts/maintenance/expire_reservations.py)
+#
+# An order confirmed after its reservations expired still ships: the
+# OUT movements are posted from the expired rows.
+# Counter row locks are taken in (product, warehouse) order, after the
+# reservation rows, like every other warehouse_balances writer.
+# ---------------------------------------------------------------------------
+
+# Order statuses that reserve instead of moving stock
+RESERVING_STATUSES = ("DRAFT", "OPEN")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _apply_reserved(db: Session, rows: Iterable, sign: int) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) reservations from the reserved
+    counters with ONE upsert (keys in product order).
+    """
+    totals: dict[tuple[int, int], Decimal] = {}
+    for row in rows:
+        key = (row.product_id, row.warehouse_id)
+        totals[key] = totals.get(key, Decimal(0)) + sign * Decimal(row.quantity)
+    if not totals:
+        return
+
+    stmt = pg_insert(WarehouseBalance).values([
+        {"product_id": product_id, "warehouse_id": warehouse_id, "reserved": reserved}
+        for (product_id, warehouse_id), reserved in sorted(totals.items())
+    ])
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[WarehouseBalance.product_id, WarehouseBalance.warehouse_id],
+            set_={
+                "reserved": WarehouseBalance.reserved + stmt.excluded.reserved,
+                "updated_at": func.now(),
+            },
+        )
+    )
+
+
+def reserve(db: Session, rows: list[dict]) -> None:
+    """
+    Reserve stock for new order lines. Each dict: order_id,
+    order_item_id, product_id, warehouse_id, quantity.
+    Does NOT lock or commit.
+    """
+    if not rows:
+        return
+    expires_at = _now() + timedelta(hours=settings.reservation_ttl_hours)
+    reserved = db.execute(
+        insert(StockReservation).returning(
+            StockReservation.product_id,
+            StockReservation.warehouse_id,
+            StockReservation.quantity,
+        ),
+        [{**row, "expires_at": expires_at} for row in rows],
+    ).all()
+    _apply_reserved(db, reserved, 1)
+
+
+def _close(db: Session, reservations: list, status: str) -> None:
+    """
+    Close locked reservations and release the ACTIVE ones from the counters.
+    """
+    active = [r for r in reservations if r.status == "ACTIVE"]
+    db.execute(
+        update(StockReservation)
+        .where(StockReservation.id.in_([r.id for r in reservations]))
+        .values(status=status, closed_at=func.now())
+    )
+    _apply_reserved(db, active, -1)
+
+
+def _lock_order_reservations(
+    db: Session,
+    order_ids: list[int],
+    statuses: tuple[str, ...],
+    locked: bool = False,
+) -> list:
+    if not locked:
+        product_ids = db.execute(
+            select(StockReservation.product_id).where(
+                StockReservation.order_id.in_(order_ids),
+                StockReservation.status.in_(statuses),
+            )
+        ).scalars().all()
+        if not product_ids:
+            return []
+
+        # Advisory locks before the reservation rows (same order as every writer)
+        lock_products_shared(db, product_ids)
+    return db.execute(
+        select(StockReservation)
+        .where(
+            StockReservation.order_id.in_(order_ids),
+            StockReservation.status.in_(statuses),
+        )
+        .order_by(StockReservation.id)
+        .with_for_update()
+    ).scalars().all()
+
+
+def consume_reservations(db: Session, order_id: int) -> list[int]:
+    """
+    Turn the reservations of a confirmed order into OUT movements
+    (ACTIVE and EXPIRED ones). Returns the new movement ids.
+
+    - Takes the shared stock locks of the products; does NOT commit
+    """
+    reservations = _lock_order_reservations(db, [order_id], ("ACTIVE", "EXPIRED"))
+    if not reservations:
+        return []
+
+    occurred_at = _now()
+    _close(db, reservations, "CONSUMED")
+    return post_movements(
+        db,
+        [
+            {
+                "product_id": r.product_id,
+                "movement_type": "OUT",
+                "quantity": -r.quantity,
+                "occurred_at": occurred_at,
+                "warehouse_id": r.warehouse_id,
+                "source_entity": "order",
+                "source_id": str(order_id),
+            }
+            for r in reservations
+        ],
+    )
+
+
+def release_reservations(
+    db: Session,
+    order_ids: list[int],
+    locked: bool = False,
+    balance_keys: Iterable[tuple[int, int]] = (),
+) -> int:
+    """
+    Release the ACTIVE reservations of canceled orders. Returns the
+    number released. Does NOT commit.
+
+    - locked=True: the caller already holds the stock locks of the
+      products (taken once with its other products)
+    - balance_keys: (product_id, warehouse_id) counters the caller
+      updates next; row-locked with the released ones in one pass
+    """
+    reservations = _lock_order_reservations(db, order_ids, ("ACTIVE",), locked)
+    lock_warehouse_balances(
+        db, [(r.product_id, r.warehouse_id) for r in reservations] + list(balance_keys)
+    )
+    if reservations:
+        _close(db, reservations, "RELEASED")
+    return len(reservations)
+
+
+def expire_reservations(db: Session, batch_size: int = 1000) -> int:
+    """
+    Expire ACTIVE reservations past their TTL in batches (one commit
+    per batch). Returns the number expired.
+
+    Rows locked by an order being confirmed / canceled are skipped
+    (SKIP LOCKED) and picked up by a later run.
+    """
+    expired = 0
+    while True:
+        batch = db.execute(
+            select(StockReservation)
+            .where(
+                StockReservation.status == "ACTIVE",
+                StockReservation.expires_at <= _now(),
+            )
+            .order_by(StockReservation.expires_at, StockReservation.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if batch:
+            _close(db, batch, "EXPIRED")
+        db.commit()
+
+        expired += len(batch)
+        if len(batch) < batch_size:
+            return expired
+
+
+def reserved_quantities(db: Session, product_ids: Iterable[int]) -> dict:
+    """
+    Reserved quantity of many products, all warehouses (counters).
+    """
+    ids = sorted(set(product_ids))
+    reserved = dict.fromkeys(ids, 0)
+    if ids:
+        reserved.update(
+            db.execute(
+                select(WarehouseBalance.product_id, func.sum(WarehouseBalance.reserved))
+                .where(WarehouseBalance.product_id.in_(ids))
+                .group_by(WarehouseBalance.product_id)
+            ).all()
+        )
+    return reserved
@@ -0,0 +1,104 @@
+# app/core/search.py
+
+from sqlalchemy import Double, cast, func, literal, or_
+
+TEXT_SEARCH_CONFIG = "portuguese"
+
+# ---------------------------------------------------------------------------
+# Shared free-text search (pg_trgm)
+# ---------------------------------------------------------------------------
+# Every searchable text column has a GIN trigram index (gin_trgm_ops),
+# which serves both predicates used here:
+#
+#   column ILIKE '%term%'     exact substring, case-insensitive
+#   term <% column            fuzzy word match (typos, partial words)
+#
+# Results can be ranked by word_similarity(term, column): the best match
+# across the searched columns wins.
+#
+# Fuzzy matching is for finding things by name (product / customer
+# search). Ledger and financial filters look up exact references
+# (documents, NF-e keys, codes): they use substring_filter, ILIKE only,
+# so a near-miss never shows up as a hit.
+# ---------------------------------------------------------------------------
+
+
+def _like_pattern(term: str) -> str:
+    """
+    Substring pattern with LIKE wildcards in the user term escaped.
+    """
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def substring_filter(columns, term: str):
+    """
+    WHERE clause: `term` is a substring of any of `columns`
+    (case-insensitive, trigram-indexed), no fuzzy matches.
+    """
+    pattern = _like_pattern(term.strip())
+    return or_(*(column.ilike(pattern, escape="\\") for column in columns))
+
+
+def fuzzy_filter(columns, term: str):
+    """
+    WHERE clause matching `term` in any of `columns` (trigram-indexed).
+    """
+    term = term.strip()
+    pattern = _like_pattern(term)
+
+    clauses = []
+    for column in columns:
+        clauses.append(column.ilike(pattern, escape="\\"))
+        clauses.append(literal(term).op("<%")(column))
+
+    return or_(*clauses)
+
+
+def fuzzy_rank(columns, term: str):
+    """
+    Relevance of the best-matching column, 0..1 (higher is better).
+
+    Cast to double precision so the value round-trips exactly through
+    a pagination cursor.
+    """
+    term = term.strip()
+    scores = [
+        func.coalesce(func.word_similarity(term, column), 0)
+        for column in columns
+    ]
+    best = scores[0] if len(scores) == 1 else func.greatest(*scores)
+    return cast(best, Double)
+
+
+# ---------------------------------------------------------------------------
+# Full-text search (tsvector)
+# ---------------------------------------------------------------------------
+# For tables with a stored, GIN-indexed tsvector column. The user query is
+# parsed with websearch_to_tsquery (quoted phrases, OR, -negation) using
+# the Portuguese dictionary, so word variants match ("filtros" ~ "filtro").
+# ---------------------------------------------------------------------------
+
+
+def text_query(q: str):
+    """
+    tsquery for a user-typed web-style search string.
+    """
+    return func.websearch_to_tsquery(TEXT_SEARCH_CONFIG, q.strip())
+
+
+def text_filter(vector, q: str):
+    """
+    WHERE clause: `vector` matches the query (GIN-indexed).
+    """
+    return vector.op("@@")(text_query(q))
+
+
+def text_rank(vector, q: str):
+    """
+    ts_rank relevance of `vector` for the query (higher is better).
+
+    Cast to double precision so the value round-trips exactly through
+    a pagination cursor.
+    """
+    return cast(func.ts_rank(vector, text_query(q)), Double)
@@ -0,0 +1,181 @@
+# app/core/valuation.py
+
+from decimal import Decimal, ROUND_HALF_UP
+from itertools import groupby
+from typing import Iterable
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.inventory_movement import InventoryMovement
+from app.models.product_cost import ProductCost
+
+# ---------------------------------------------------------------------------
+# Inventory valuation (moving weighted-average cost)
+# ---------------------------------------------------------------------------
+# product_costs keeps, per product, the quantity on hand and its moving
+# average unit cost. It is updated in the same transaction as the
+# movements (post_movements -> apply_costs), so valuing the inventory is
+# a read of one row per product, never a replay of the ledger.
+#
+#   receipt (quantity > 0 with unit_cost):
+#       average = (on_hand * average + received * unit_cost)
+#                 / (on_hand + received)          on_hand = max(quantity, 0)
+#   anything else (sales, counts, returns without cost):
+#       quantity changes, average unchanged
+#
+# Within one batch the receipts of a product are averaged together and
+# applied to the quantity on hand before the batch.
+#
+# Movements inserted outside post_movements (legacy ETL scripts) are not
+# valued: run scripts/maintenance/rebuild_product_costs.py afterwards.
+# ---------------------------------------------------------------------------
+
+# Scale of product_costs.average_cost (NUMERIC(14, 4))
+COST_QUANTUM = Decimal("0.0001")
+
+
+def _batch_totals(rows: Iterable[dict]) -> dict[int, list[Decimal]]:
+    """
+    Per product: [net quantity, costed quantity received, received value].
+    """
+    totals: dict[int, list[Decimal]] = {}
+    for row in rows:
+        quantity = Decimal(row["quantity"])
+        unit_cost = row.get("unit_cost")
+        total = totals.setdefault(row["product_id"], [Decimal(0), Decimal(0), Decimal(0)])
+        total[0] += quantity
+        if unit_cost is not None and quantity > 0:
+            total[1] += quantity
+            total[2] += quantity * Decimal(unit_cost)
+    return totals
+
+
+def apply_costs(db: Session, rows: list[dict]) -> None:
+    """
+    Update product_costs for a batch of new movements, with ONE upsert.
+
+    Rows are applied in product_id order (row locks always taken in the
+    same order as the stock advisory locks). Does NOT commit.
+    """
+    totals = _batch_totals(rows)
+    if not totals:
+        return
+
+    values = [
+        {
+            "product_id": product_id,
+            "quantity": quantity,
+            "received_quantity": received,
+            # Average cost of this batch's receipts (NULL: none)
+            "average_cost": (value / received) if received else None,
+        }
+        for product_id, (quantity, received, value) in sorted(totals.items())
+    ]
+
+    stmt = insert(ProductCost).values(values)
+    batch = stmt.excluded
+    on_hand = func.greatest(ProductCost.quantity, 0)
+
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ProductCost.product_id],
+            set_={
+                "average_cost": case(
+                    (
+                        batch.received_quantity > 0,
+                        (
+                            on_hand * func.coalesce(ProductCost.average_cost, batch.average_cost)
+                            + batch.received_quantity * batch.average_cost
+                        )
+                        / (on_hand + batch.received_quantity),
+                    ),
+                    else_=ProductCost.average_cost,
+                ),
+                "quantity": ProductCost.quantity + batch.quantity,
+                "received_quantity": ProductCost.received_quantity + batch.received_quantity,
+                "updated_at": func.now(),
+            },
+        )
+    )
+
+
+def replay_costs(movements: Iterable[dict]) -> dict:
+    """
+    Valuation of one product from its movements, oldest first.
+
+    Movements posted together (same source and occurred_at) are applied
+    as one batch, exactly like apply_costs did when they were posted.
+    """
+    quantity = received = Decimal(0)
+    average = None
+    batches = groupby(
+        movements, key=lambda m: (m["source_entity"], m["source_id"], m["occurred_at"])
+    )
+    for _, batch in batches:
+        for batch_quantity, batch_received, batch_value in _batch_totals(batch).values():
+            if batch_received > 0:
+                on_hand = max(quantity, Decimal(0))
+                batch_average = (batch_value / batch_received).quantize(COST_QUANTUM, ROUND_HALF_UP)
+                previous = batch_average if average is None else average
+                average = (
+                    (on_hand * previous + batch_received * batch_average)
+                    / (on_hand + batch_received)
+                ).quantize(COST_QUANTUM, ROUND_HALF_UP)
+                received += batch_received
+            quantity += batch_quantity
+    return {"quantity": quantity, "received_quantity": received, "average_cost": average}
+
+
+def rebuild_product_costs(db: Session, product_ids: list[int]) -> int:
+    """
+    Recompute product_costs of `product_ids` by replaying their ledger
+    (movement id order, batches as posted). Products without movements
+    lose their row.
+    Returns the number of products valued.
+
+    - The caller locks the products (lock_products_exclusive) and commits
+    """
+    ids = sorted(set(product_ids))
+    if not ids:
+        return 0
+
+    rows = db.execute(
+        select(
+            InventoryMovement.product_id,
+            InventoryMovement.quantity,
+            InventoryMovement.unit_cost,
+            InventoryMovement.source_entity,
+            InventoryMovement.source_id,
+            InventoryMovement.occurred_at,
+        )
+        .where(InventoryMovement.product_id.in_(ids))
+        .order_by(InventoryMovement.product_id, InventoryMovement.id)
+    ).all()
+
+    values = [
+        {"product_id": product_id, **replay_costs(row._asdict() for row in movements)}
+        for product_id, movements in groupby(rows, key=lambda row: row.product_id)
+    ]
+
+    db.execute(
+        delete(ProductCost).where(
+            ProductCost.product_id.in_(ids),
+            ProductCost.product_id.notin_([v["product_id"] for v in values]),
+        )
+    )
+    if values:
+        stmt = insert(ProductCost).values(values)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[ProductCost.product_id],
+                set_={
+                    "quantity": stmt.excluded.quantity,
+                    "received_quantity": stmt.excluded.received_quantity,
+                    "average_cost": stmt.excluded.average_cost,
+                    "updated_at": func.now(),
+                },
+            )
+        )
+    return len(values)
@@ -11,6 +11,7 @@ from app.api.v1.inventory import router as inventory_router
 from app.api.v1.purchases import router as purchases_router
 from app.api.v1.payables import router as payables_router
 from app.api.v1.receivables import router as receivables_router
+from app.api.v1.search import router as search_router
 
 # Create FastAPI application instance
 app = FastAPI(title=settings.app_name)
@@ -25,6 +26,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Keyset pagination: next page cursor for list endpoints
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Health check routes
@@ -54,3 +57,5 @@ app.include_router(payables_router)
 # Receivables routes
 app.include_router(receivables_router)
 
+# Global search routes
+app.include_router(search_router)
@@ -9,4 +9,13 @@ from .order import Order
 from .order_item import OrderItem
 from .inventory_movement import InventoryMovement
 from .account_payable import AccountPayable
-from .account_receivable import AccountReceivable
\ No newline at end of file
+from .account_receivable import AccountReceivable
+from .idempotency_key import IdempotencyKey
+from .product_cost import ProductCost
+from .cost_layer import CostLayer
+from .cost_layer_consumption import CostLayerConsumption
+from .warehouse import Warehouse
+from .warehouse_balance import WarehouseBalance
+from .lot import Lot
+from .lot_allocation import LotAllocation
+from .stock_reservation import StockReservation
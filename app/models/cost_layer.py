@@ -0,0 +1,40 @@
+# app/models/cost_layer.py
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, Numeric, text
+from app.core.database import Base
+
+
+class CostLayer(Base):
+    """
+    FIFO cost layer: one costed receipt (IN movement with unit_cost)
+    and the part of it still in stock.
+
+    Consumed oldest first by stock decreases (app.core.cost_layers);
+    a layer with remaining = 0 is closed and leaves the open-layer index.
+    """
+
+    __tablename__ = "cost_layers"
+    __table_args__ = (
+        # Oldest open layer of a product (partial: open layers only)
+        Index(
+            "ix_cost_layers_open_product_id_id",
+            "product_id",
+            "id",
+            postgresql_where=text("remaining > 0"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
+
+    # Receipt that created the layer (inventory_movements id / occurred_at;
+    # no FK: partitioned ledger)
+    movement_id = Column(Integer, nullable=False)
+    received_at = Column(DateTime(timezone=True), nullable=False)
+
+    # Quantity received / still in stock
+    quantity = Column(Numeric(14, 4), nullable=False)
+    remaining = Column(Numeric(14, 4), nullable=False)
+
+    unit_cost = Column(Numeric(14, 4), nullable=False)
@@ -0,0 +1,39 @@
+# app/models/cost_layer_consumption.py
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, Numeric, String
+from app.core.database import Base
+
+
+class CostLayerConsumption(Base):
+    """
+    Quantity taken from one FIFO layer by one stock decrease.
+
+    COGS of a period = SUM(quantity * unit_cost) of the OUT consumptions.
+    layer_id / unit_cost are NULL when no layer was left (stock sold
+    before any costed receipt): that quantity is reported as uncosted.
+    """
+
+    __tablename__ = "cost_layer_consumptions"
+    __table_args__ = (
+        Index("ix_cost_layer_consumptions_product_id_consumed_at", "product_id", "consumed_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+
+    layer_id = Column(
+        Integer,
+        ForeignKey("cost_layers.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
+    )
+
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+
+    # Stock decrease (inventory_movements id / type / occurred_at)
+    movement_id = Column(Integer, nullable=False, index=True)
+    movement_type = Column(String, nullable=False)
+    consumed_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    # Positive quantity taken, at the layer's unit cost
+    quantity = Column(Numeric(14, 4), nullable=False)
+    unit_cost = Column(Numeric(14, 4), nullable=True)
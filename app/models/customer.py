@@ -1,6 +1,6 @@
 # app/models/customer.py
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Computed
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -30,6 +30,21 @@ class Customer(Base):
     # CPF / CNPJ / any external identifier
     document = Column(String(50), unique=True, nullable=True)
 
+    # Digits-only CPF (11) / CNPJ (14) derived from document (generated,
+    # unique). Lookups by document go through this column:
+    # see app/core/documents.py
+    document_normalized = Column(
+        String(14),
+        Computed(
+            "CASE WHEN length(regexp_replace(document, '\\D', '', 'g')) IN (11, 14) "
+            "THEN regexp_replace(document, '\\D', '', 'g') END",
+            persisted=True,
+        ),
+        unique=True,
+        index=True,
+        nullable=True,
+    )
+
     # Contact info
     email = Column(String(255), nullable=True)
     phone = Column(String(50), nullable=True)
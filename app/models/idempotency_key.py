@@ -0,0 +1,47 @@
+# app/models/idempotency_key.py
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Stored outcome of a write request sent with an `Idempotency-Key` header.
+
+    A retried request (same scope + user + key) returns the stored response
+    instead of executing the write again.
+
+    Lifecycle:
+    - Claimed (status_code NULL) inside the same transaction as the write
+    - Completed with the response before that transaction commits
+    - Ignored and reusable after expires_at (TTL)
+    """
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("scope", "user_id", "key", name="uq_idempotency_keys_scope_user_key"),
+    )
+
+    id = Column(Integer, primary_key=True)
+
+    # Endpoint the key belongs to (e.g. "POST /api/v1/orders")
+    scope = Column(String(100), nullable=False)
+
+    # Caller: keys of different users never collide
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    # Client-provided key (Idempotency-Key header)
+    key = Column(String(255), nullable=False)
+
+    # Hash of the request payload: a key cannot be reused for another payload
+    request_hash = Column(String(64), nullable=False)
+
+    # Stored response (NULL while the original request is still running)
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(JSONB, nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
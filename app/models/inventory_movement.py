@@ -7,16 +7,26 @@ from app.core.database import Base
 class InventoryMovement(Base):
     __tablename__ = "inventory_movements"
 
-    # Internal identifier
-    id = Column(Integer, primary_key=True)
+    # Range partitioned by month on occurred_at (see app/core/partitions.py)
+    __table_args__ = {"postgresql_partition_by": "RANGE (occurred_at)"}
+
+    # Internal identifier (unique via sequence; the primary key also
+    # carries occurred_at because it is the partition key)
+    id = Column(Integer, primary_key=True, autoincrement=True)
 
     # Product affected by the movement
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
 
+    # Stock location (1 = main warehouse)
+    warehouse_id = Column(
+        Integer, ForeignKey("warehouses.id"), nullable=False, server_default="1"
+    )
+
     # Type of movement:
     # IN  = stock increase (purchase, return)
     # OUT = stock decrease (sale)
     # ADJUST = manual or inventory adjustment
+    # TRANSFER = between warehouses (one negative + one positive row)
     movement_type = Column(String, nullable=False)
 
     # Signed quantity:
@@ -24,13 +34,19 @@ class InventoryMovement(Base):
     # negative = OUT
     quantity = Column(Numeric(14, 4), nullable=False)
 
+    # Unit cost of the goods received (IN movements with a known cost,
+    # e.g. the NF-e unit price); feeds the weighted-average valuation
+    unit_cost = Column(Numeric(14, 4), nullable=True)
+
     # Business datetime when the movement actually occurred
-    occurred_at = Column(DateTime(timezone=True), nullable=False)
+    # (partition key)
+    occurred_at = Column(DateTime(timezone=True), primary_key=True, nullable=False)
 
     # Where this movement comes from (order, purchase, adjustment, etc.)
     source_entity = Column(String, nullable=False)
 
-    # Reference to the source record (order_id, external_id, etc.)
+    # Reference to the source record (order_id, external_id, etc.);
+    # indexed with source_entity (movements of one order)
     source_id = Column(String, nullable=False)
 
     # Audit timestamp
@@ -0,0 +1,54 @@
+# app/models/lot.py
+
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Index, Integer, Numeric, String, text
+from app.core.database import Base
+
+
+class Lot(Base):
+    """
+    Lot of one product received in one warehouse (NF-e rastro data) and
+    the part of it still in stock.
+
+    Stock decreases take their quantity from the lots expiring first
+    (FEFO, then oldest receipt: app.core.lots); a lot with remaining = 0
+    is closed and leaves the open-lot indexes.
+    """
+
+    __tablename__ = "lots"
+    __table_args__ = (
+        # FEFO allocation: open lots of a product in a warehouse by expiry
+        Index(
+            "ix_lots_open_product_id_warehouse_id_expires_on_id",
+            "product_id",
+            "warehouse_id",
+            "expires_on",
+            "id",
+            postgresql_where=text("remaining > 0"),
+        ),
+        # Near-expiry report over all open lots
+        Index(
+            "ix_lots_open_expires_on_id",
+            "expires_on",
+            "id",
+            postgresql_where=text("remaining > 0"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
+    warehouse_id = Column(Integer, ForeignKey("warehouses.id"), nullable=False)
+
+    # Supplier lot number (NF-e nLote) and dates (dFab / dVal)
+    lot_number = Column(String(20), nullable=False)
+    manufactured_on = Column(Date, nullable=True)
+    expires_on = Column(Date, nullable=False)
+
+    # Receipt that created the lot (inventory_movements id / occurred_at;
+    # no FK: partitioned ledger)
+    movement_id = Column(Integer, nullable=False)
+    received_at = Column(DateTime(timezone=True), nullable=False)
+
+    # Quantity received / still in stock
+    quantity = Column(Numeric(14, 4), nullable=False)
+    remaining = Column(Numeric(14, 4), nullable=False)
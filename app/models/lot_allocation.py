@@ -0,0 +1,35 @@
+# app/models/lot_allocation.py
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, Numeric, String
+from app.core.database import Base
+
+
+class LotAllocation(Base):
+    """
+    Quantity taken from one lot by one stock decrease (order line,
+    negative adjustment, transfer out).
+
+    Only lot-tracked stock is allocated: a decrease of a product without
+    open lots in its warehouse has no allocation.
+    """
+
+    __tablename__ = "lot_allocations"
+
+    id = Column(Integer, primary_key=True)
+
+    lot_id = Column(
+        Integer,
+        ForeignKey("lots.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+
+    # Stock decrease (inventory_movements id / type / occurred_at)
+    movement_id = Column(Integer, nullable=False, index=True)
+    movement_type = Column(String, nullable=False)
+    allocated_at = Column(DateTime(timezone=True), nullable=False)
+
+    # Positive quantity taken from the lot
+    quantity = Column(Numeric(14, 4), nullable=False)
@@ -7,6 +7,8 @@ from sqlalchemy import (
     Boolean,
     ForeignKey,
     Text,
+    PrimaryKeyConstraint,
+    false,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -21,16 +23,25 @@ class Order(Base):
     Represents a business transaction header.
     This model is domain-agnostic and does NOT contain
     fiscal, payment, or logistics details.
+
+    Storage: LIST partitioned by `archived` (hot / archive), each side
+    RANGE partitioned by `issued_at` (see app/core/archive.py).
+    The table key is (id, archived, issued_at); ids are still unique,
+    so the ORM identity stays `id`.
     """
 
     __tablename__ = "orders"
+    __table_args__ = (
+        PrimaryKeyConstraint("id", "archived", "issued_at", name="orders_pkey"),
+        {"postgresql_partition_by": "LIST (archived)"},
+    )
 
     # ------------------------------------------------------------------
     # Primary key
     # ------------------------------------------------------------------
     id = Column(
         BigInteger,
-        primary_key=True,
+        autoincrement=True,
         comment="Internal unique identifier of the order",
     )
 
@@ -40,6 +51,7 @@ class Order(Base):
     external_id = Column(
         String(50),
         nullable=True,
+        index=True,
         comment="External or legacy order identifier (optional)",
     )
 
@@ -85,6 +97,14 @@ class Order(Base):
         comment="Logical deletion flag (soft delete)",
     )
 
+    archived = Column(
+        Boolean,
+        nullable=False,
+        default=False,
+        server_default=false(),
+        comment="Moved to the cold (archive) partitions",
+    )
+
     # ------------------------------------------------------------------
     # Monetary values
     # ------------------------------------------------------------------
@@ -136,3 +156,5 @@ class Order(Base):
         cascade="all, delete-orphan",
         #comment="Items belonging to this order",
     )
+
+    __mapper_args__ = {"primary_key": [id]}
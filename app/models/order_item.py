@@ -1,9 +1,14 @@
 from sqlalchemy import (
     Column,
     BigInteger,
+    Boolean,
+    DateTime,
     Numeric,
     ForeignKey,
+    ForeignKeyConstraint,
+    PrimaryKeyConstraint,
     Text,
+    false,
 )
 from sqlalchemy.orm import relationship
 
@@ -17,16 +22,30 @@ class OrderItem(Base):
     Represents a single line item within an order.
     Contextual information about the sale lives here,
     not product definition.
+
+    Storage: co-partitioned with orders. The partition keys of the
+    parent order (archived, issued_at) are copied into every item, so
+    an order and its items always live in matching partitions.
     """
 
     __tablename__ = "order_items"
+    __table_args__ = (
+        PrimaryKeyConstraint("id", "archived", "order_issued_at", name="order_items_pkey"),
+        ForeignKeyConstraint(
+            ["order_id", "archived", "order_issued_at"],
+            ["orders.id", "orders.archived", "orders.issued_at"],
+            name="order_items_order_id_fkey",
+            onupdate="CASCADE",
+        ),
+        {"postgresql_partition_by": "LIST (archived)"},
+    )
 
     # ------------------------------------------------------------------
     # Primary key
     # ------------------------------------------------------------------
     id = Column(
         BigInteger,
-        primary_key=True,
+        autoincrement=True,
         comment="Internal unique identifier of the order item",
     )
 
@@ -35,11 +54,28 @@ class OrderItem(Base):
     # ------------------------------------------------------------------
     order_id = Column(
         BigInteger,
-        ForeignKey("orders.id", ondelete="CASCADE"),
         nullable=False,
+        index=True,
         comment="Parent order identifier",
     )
 
+    # ------------------------------------------------------------------
+    # Partition keys (copied from the parent order)
+    # ------------------------------------------------------------------
+    order_issued_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        comment="Copy of orders.issued_at (partition key)",
+    )
+
+    archived = Column(
+        Boolean,
+        nullable=False,
+        default=False,
+        server_default=false(),
+        comment="Copy of orders.archived (partition key)",
+    )
+
     product_id = Column(
         BigInteger,
         ForeignKey("products.id"),
@@ -90,3 +126,5 @@ class OrderItem(Base):
         "Order",
         back_populates="items",
     )
+
+    __mapper_args__ = {"primary_key": [id]}
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -51,7 +53,7 @@ class Product(Base):
     # -----------------------------------------------------
     # Barcode (EAN / GTIN)
     # -----------------------------------------------------
-    barcode = Column(String(50), nullable=True)
+    barcode = Column(String(50), nullable=True, index=True)
 
     # -----------------------------------------------------
     # Unit of measure (PC, CX, LT, etc.)
@@ -63,6 +65,25 @@ class Product(Base):
     # -----------------------------------------------------
     active = Column(Boolean, nullable=False, default=True)
 
+    # -----------------------------------------------------
+    # Full-text search document (generated, GIN-indexed)
+    # Weighted: name / manufacturer code (A), short name (B),
+    # description (C). Deferred: never loaded with the entity.
+    # -----------------------------------------------------
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "setweight(to_tsvector('portuguese', coalesce(name, '')), 'A') || "
+                "setweight(to_tsvector('portuguese', coalesce(manufacturer_code, '')), 'A') || "
+                "setweight(to_tsvector('portuguese', coalesce(short_name, '')), 'B') || "
+                "setweight(to_tsvector('portuguese', coalesce(description, '')), 'C')",
+                persisted=True,
+            ),
+            nullable=True,
+        )
+    )
+
     # -----------------------------------------------------
     # Audit fields
     # -----------------------------------------------------
@@ -0,0 +1,42 @@
+# app/models/product_cost.py
+
+from sqlalchemy import Column, Computed, DateTime, ForeignKey, Index, Integer, Numeric
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class ProductCost(Base):
+    """
+    Running valuation of one product (moving weighted-average cost).
+
+    Maintained incrementally by app.core.valuation every time movements
+    are posted: valuing the inventory never replays the ledger.
+    Can be rebuilt from the ledger with
+    scripts/maintenance/rebuild_product_costs.py.
+    """
+
+    __tablename__ = "product_costs"
+    __table_args__ = (
+        # Valuation listing (keyset, most valuable first)
+        Index("ix_product_costs_stock_value_product_id", "stock_value", "product_id"),
+    )
+
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+
+    # Stock quantity (same as SUM of the product movements)
+    quantity = Column(Numeric(14, 4), nullable=False, server_default="0")
+
+    # Lifetime quantity received with a known unit cost
+    received_quantity = Column(Numeric(14, 4), nullable=False, server_default="0")
+
+    # Moving weighted-average unit cost (NULL: never received with a cost)
+    average_cost = Column(Numeric(14, 4), nullable=True)
+
+    # Value of the stock on hand (negative stock is valued at 0)
+    stock_value = Column(
+        Numeric(18, 4),
+        Computed("GREATEST(quantity, 0) * COALESCE(average_cost, 0)", persisted=True),
+        nullable=False,
+    )
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,46 @@
+# app/models/stock_reservation.py
+
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, Numeric, String, text
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class StockReservation(Base):
+    """
+    Stock held for one line of a DRAFT / OPEN order.
+
+    ACTIVE reservations are counted in warehouse_balances.reserved
+    (app.core.reservations); they end CONSUMED (order confirmed: the OUT
+    movement is posted), RELEASED (order canceled) or EXPIRED (TTL).
+    """
+
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        # Expiry sweeper (partial: active reservations only)
+        Index(
+            "ix_stock_reservations_active_expires_at_id",
+            "expires_at",
+            "id",
+            postgresql_where=text("status = 'ACTIVE'"),
+        ),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+
+    # Order line holding the stock (no FK: partitioned orders)
+    order_id = Column(BigInteger, nullable=False, index=True)
+    order_item_id = Column(BigInteger, nullable=False)
+
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    warehouse_id = Column(Integer, ForeignKey("warehouses.id"), nullable=False)
+
+    quantity = Column(Numeric(14, 4), nullable=False)
+
+    # ACTIVE, CONSUMED, RELEASED, EXPIRED
+    status = Column(String(20), nullable=False, server_default="ACTIVE")
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    # When the reservation stopped being ACTIVE
+    closed_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,28 @@
+# app/models/warehouse.py
+
+from sqlalchemy import Boolean, Column, DateTime, Integer, String
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class Warehouse(Base):
+    """
+    Stock location (store, warehouse).
+
+    Every inventory movement belongs to one warehouse; id 1 is the
+    main location (default for writers that do not choose one).
+    """
+
+    __tablename__ = "warehouses"
+
+    id = Column(Integer, primary_key=True)
+
+    # Short business code (e.g. "MAIN", "STORE-02")
+    code = Column(String(20), unique=True, nullable=False)
+
+    name = Column(String(255), nullable=False)
+
+    # Soft delete flag (inactive: no new transfers in or out)
+    active = Column(Boolean, nullable=False, server_default="true")
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
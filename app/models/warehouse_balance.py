@@ -0,0 +1,37 @@
+# app/models/warehouse_balance.py
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, Numeric
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class WarehouseBalance(Base):
+    """
+    Stock of one product in one warehouse (projection of the ledger).
+
+    Updated by post_movements in the same transaction as the movements
+    (app.core.inventory); rebuilt from the ledger with
+    scripts/maintenance/rebuild_warehouse_balances.py.
+    """
+
+    __tablename__ = "warehouse_balances"
+    __table_args__ = (
+        # Stock of one warehouse (listing by product)
+        Index(
+            "ix_warehouse_balances_warehouse_id_product_id",
+            "warehouse_id",
+            "product_id",
+            postgresql_include=["quantity"],
+        ),
+    )
+
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    warehouse_id = Column(Integer, ForeignKey("warehouses.id"), primary_key=True)
+
+    # SUM of the product movements in this warehouse
+    quantity = Column(Numeric(14, 4), nullable=False, server_default="0")
+
+    # Held by ACTIVE reservations (available to promise = quantity - reserved)
+    reserved = Column(Numeric(14, 4), nullable=False, server_default="0")
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,139 @@
+# scripts/bench/bench_create_order.py
+#
+# Benchmark: order aggregate write path.
+#
+# Compares the previous per-row ORM path (db.add per item/movement + flush
+# + refresh) with the batched multi-row INSERT path used by create_order,
+# for orders of 10, 100 and 1000 lines.
+#
+# - Uses the database configured in .env (DATABASE_URL)
+# - Needs at least one customer and one product
+# - Every run is rolled back: no data is left behind
+#
+# Usage (from the repository root):
+#   python -m scripts.bench.bench_create_order
+
+import time
+from datetime import datetime, UTC
+from decimal import Decimal
+
+from app.core.database import SessionLocal
+from app.models.customer import Customer
+from app.models.product import Product
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.inventory_movement import InventoryMovement
+from app.models.account_receivable import AccountReceivable
+from app.api.v1.schemas import OrderCreate
+from app.api.v1.orders import _insert_orders
+
+LINE_COUNTS = (10, 100, 1000)
+REPEAT = 5
+
+
+def build_payload(customer_id: int, product_ids: list[int], lines: int) -> OrderCreate:
+    return OrderCreate(
+        external_id=f"BENCH-{lines}",
+        customer_id=customer_id,
+        issued_at=datetime.now(UTC),
+        status="CONFIRMED",  # posts the OUT movements (OPEN only reserves)
+        total_amount=Decimal("10.00") * lines,
+        items=[
+            {
+                "product_id": product_ids[i % len(product_ids)],
+                "quantity": Decimal("1"),
+                "unit_price": Decimal("10.00"),
+                "total_price": Decimal("10.00"),
+            }
+            for i in range(lines)
+        ],
+    )
+
+
+def write_per_row(db, payload: OrderCreate):
+    """Previous create_order path: one ORM add per row, flush + refresh."""
+    order = Order(
+        external_id=payload.external_id,
+        customer_id=payload.customer_id,
+        issued_at=payload.issued_at,
+        status=payload.status,
+        total_amount=payload.total_amount,
+    )
+    db.add(order)
+    db.flush()
+
+    for item in payload.items:
+        db.add(OrderItem(
+            order_id=order.id,
+            order_issued_at=order.issued_at,
+            product_id=item.product_id,
+            quantity=item.quantity,
+            unit_price=item.unit_price,
+            total_price=item.total_price,
+        ))
+        db.add(InventoryMovement(
+            product_id=item.product_id,
+            movement_type="OUT",
+            quantity=-item.quantity,
+            occurred_at=order.issued_at,
+            source_entity="order",
+            source_id=str(order.id),
+        ))
+
+    db.add(AccountReceivable(
+        customer_id=order.customer_id,
+        source_entity="ORDER",
+        source_id=str(order.id),
+        amount=order.total_amount,
+        due_date=order.issued_at.date(),
+        status="OPEN",
+    ))
+    db.flush()
+    db.refresh(order)
+
+
+def write_batched(db, payload: OrderCreate):
+    """Current create_order path: multi-row INSERT ... RETURNING."""
+    _insert_orders(db, [payload])
+
+
+def timed(write, payload: OrderCreate) -> float:
+    """Best-of-N wall time (ms) for one order write, rolled back each time."""
+    best = None
+    for _ in range(REPEAT):
+        db = SessionLocal()
+        try:
+            start = time.perf_counter()
+            write(db, payload)
+            db.flush()
+            elapsed = (time.perf_counter() - start) * 1000
+        finally:
+            db.rollback()
+            db.close()
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    db = SessionLocal()
+    try:
+        customer_id = db.query(Customer.id).order_by(Customer.id).limit(1).scalar()
+        product_ids = [row[0] for row in db.query(Product.id).order_by(Product.id).limit(1000)]
+    finally:
+        db.close()
+
+    if not customer_id or not product_ids:
+        raise SystemExit("Benchmark needs at least one customer and one product")
+
+    print(f"{'lines':>6} | {'per-row ORM (ms)':>17} | {'batched (ms)':>12} | {'speedup':>7}")
+    print("-" * 54)
+
+    for lines in LINE_COUNTS:
+        payload = build_payload(customer_id, product_ids, lines)
+        per_row = timed(write_per_row, payload)
+        batched = timed(write_batched, payload)
+        print(f"{lines:>6} | {per_row:>17.1f} | {batched:>12.1f} | {per_row / batched:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# scripts/bench/bench_search.py
+#
+# Benchmark: free-text search with and without the pg_trgm GIN indexes.
+#
+# - Seeds 1M products and 500k customers inside ONE transaction
+# - Runs the same queries the list endpoints build (app.core.search)
+#   twice: planner free to use the trigram indexes, then forced to
+#   sequential scans (the behaviour before the indexes existed)
+# - Rolls everything back at the end: no data is left behind
+#
+# Requires the pg_trgm migration to be applied.
+#
+# Usage (from the repository root):
+#   python -m scripts.bench.bench_search
+
+import statistics
+import time
+
+from sqlalchemy import select, text
+
+from app.core.database import SessionLocal
+from app.core.search import fuzzy_filter, fuzzy_rank
+from app.models.product import Product
+from app.models.customer import Customer
+
+PRODUCTS = 1_000_000
+CUSTOMERS = 500_000
+REPEAT = 5
+
+PRODUCT_TERMS = ["ABRACADEIRA", "filtro oleo", "pastilha frei", "7891234"]
+CUSTOMER_TERMS = ["AUTO PECAS", "silva", "12345678", "@gmail"]
+
+
+def seed(db):
+    print(f"Seeding {PRODUCTS:,} products and {CUSTOMERS:,} customers...")
+    db.execute(text("""
+        INSERT INTO products (code, name, description, barcode, manufacturer_code, unit, active)
+        SELECT
+            'BENCH-' || g,
+            (ARRAY['ABRACADEIRA', 'FILTRO OLEO', 'PASTILHA FREIO', 'AMORTECEDOR', 'VELA IGNICAO'])[1 + g % 5]
+                || ' ' || md5(g::text),
+            'Peca automotiva ' || md5((g * 7)::text) || ' aplicacao veiculo ' || (g % 997),
+            lpad((7891234000000 + g)::text, 13, '0'),
+            'MC' || (g % 50000),
+            'PC',
+            TRUE
+        FROM generate_series(1, :n) g
+    """), {"n": PRODUCTS})
+    db.execute(text("""
+        INSERT INTO customers (name, document, email, phone, type, active)
+        SELECT
+            (ARRAY['AUTO PECAS', 'OFICINA', 'MECANICA', 'JOAO SILVA', 'MARIA SOUZA'])[1 + g % 5]
+                || ' ' || md5(g::text),
+            'BENCH' || lpad(g::text, 14, '0'),
+            'cliente' || g || (ARRAY['@gmail.com', '@hotmail.com', '@empresa.com.br'])[1 + g % 3],
+            '11' || lpad(g::text, 9, '9'),
+            'customer',
+            TRUE
+        FROM generate_series(1, :n) g
+    """), {"n": CUSTOMERS})
+    db.execute(text("ANALYZE products"))
+    db.execute(text("ANALYZE customers"))
+
+
+def search_query(model, columns, term):
+    rank = fuzzy_rank(columns, term)
+    return (
+        select(model.id)
+        .where(fuzzy_filter(columns, term))
+        .order_by(rank.desc(), model.id.desc())
+        .limit(20)
+    )
+
+
+def timed(db, stmt) -> float:
+    """Median wall time (ms) of one page of results."""
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        db.execute(stmt).all()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run(db, label, model, columns, terms):
+    print(f"\n{label}")
+    print(f"{'term':<16} | {'seq scan (ms)':>13} | {'trigram (ms)':>12} | {'speedup':>7}")
+    print("-" * 58)
+
+    for term in terms:
+        stmt = search_query(model, columns, term)
+
+        db.execute(text("SET LOCAL enable_bitmapscan = off"))
+        db.execute(text("SET LOCAL enable_indexscan = off"))
+        seq = timed(db, stmt)
+
+        db.execute(text("SET LOCAL enable_bitmapscan = on"))
+        db.execute(text("SET LOCAL enable_indexscan = on"))
+        indexed = timed(db, stmt)
+
+        print(f"{term:<16} | {seq:>13.1f} | {indexed:>12.1f} | {seq / indexed:>6.1f}x")
+
+
+def main():
+    db = SessionLocal()
+    try:
+        seed(db)
+        run(
+            db,
+            "Products (name / description / manufacturer_code)",
+            Product,
+            [Product.name, Product.description, Product.manufacturer_code],
+            PRODUCT_TERMS,
+        )
+        run(
+            db,
+            "Customers (name / document / email / phone)",
+            Customer,
+            [Customer.name, Customer.document, Customer.email, Customer.phone],
+            CUSTOMER_TERMS,
+        )
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+# scripts/bench/check_query_plans.py
+#
+# Query plan check: no sequential scans on large tables.
+#
+# - Seeds large tables inside ONE transaction (rolled back at the end)
+# - Calls the list / detail endpoints directly, capturing every SELECT
+#   they send to the database
+# - EXPLAINs each captured statement (same parameters) and fails when
+#   the plan has a Seq Scan over one of LARGE_TABLES
+#
+# Exit code 1 on any violation, so it can gate CI / deploys.
+# Requires the migrations to be applied (indexes + pg_trgm).
+#
+# Usage (from the repository root):
+#   python -m scripts.bench.check_query_plans
+
+import hashlib
+import inspect
+import json
+import sys
+from datetime import date
+
+from fastapi import Response
+from fastapi.params import Depends as DependsParam
+from pydantic.fields import FieldInfo
+from pydantic_core import PydanticUndefined
+from sqlalchemy import event, text
+
+from app.core.database import SessionLocal, engine
+from app.core.inventory import stock_balances
+from app.api.v1.schemas_inventory import InventoryBalancesRequest
+from app.api.v1 import customers, inventory, orders, payables, products, receivables, search
+
+PRODUCTS = 100_000
+CUSTOMERS = 20_000
+ORDERS = 50_000
+ITEMS_PER_ORDER = 3
+MOVEMENTS = 300_000
+RECEIVABLES = 50_000
+PAYABLES = 20_000
+
+# Tables big enough in production that a Seq Scan is a bug
+LARGE_TABLES = {
+    "products",
+    "customers",
+    "orders",
+    "order_items",
+    "inventory_movements",
+    "product_costs",
+    "cost_layer_consumptions",
+    "warehouse_balances",
+    "lots",
+    "accounts_payable",
+    "accounts_receivable",
+}
+
+# Endpoints whose query reads the whole table by design
+ALLOW_SEQ_SCAN: set[str] = {
+    "inventory.get_inventory_valuation",  # totals: SUM over product_costs
+}
+
+
+def seed(db):
+    print("Seeding large tables...")
+    db.execute(text("""
+        INSERT INTO customers (name, document, email, type, active)
+        SELECT 'PLAN CUSTOMER ' || g, '9' || lpad(g::text, 13, '0'), 'plan' || g || '@example.com',
+               CASE WHEN g % 10 = 0 THEN 'supplier' ELSE 'customer' END, TRUE
+        FROM generate_series(1, :n) g
+    """), {"n": CUSTOMERS})
+    db.execute(text("""
+        INSERT INTO products (code, name, description, barcode, manufacturer_code, unit, active)
+        SELECT 'PLAN-' || g, 'PLAN PRODUCT ' || md5(g::text), 'Plan product ' || g,
+               '2' || lpad(g::text, 12, '0'), 'PMC' || g, 'PC', TRUE
+        FROM generate_series(1, :n) g
+    """), {"n": PRODUCTS})
+
+    ids = db.execute(text("""
+        SELECT
+            (SELECT min(id) FROM customers WHERE name LIKE 'PLAN CUSTOMER %') AS customer,
+            (SELECT min(id) FROM products WHERE code LIKE 'PLAN-%') AS product
+    """)).one()
+
+    db.execute(text("""
+        INSERT INTO orders (external_id, customer_id, issued_at, status, total_amount, active, created_at)
+        SELECT 'PLAN-' || g, :c + g % :nc, now() - g * interval '1 minute',
+               (ARRAY['OPEN', 'CLOSED', 'CANCELED'])[1 + g % 3], 100, TRUE,
+               now() - g * interval '1 minute'
+        FROM generate_series(1, :n) g
+    """), {"n": ORDERS, "c": ids.customer, "nc": CUSTOMERS})
+    db.execute(text("""
+        INSERT INTO order_items (order_id, order_issued_at, product_id, quantity, unit_price, total_price)
+        SELECT o.id, o.issued_at, :p + (o.id * 7 + k) % :np, 1, 10, 10
+        FROM orders o, generate_series(1, :k) k
+        WHERE o.external_id LIKE 'PLAN-%'
+    """), {"k": ITEMS_PER_ORDER, "p": ids.product, "np": PRODUCTS})
+    db.execute(text("""
+        INSERT INTO inventory_movements
+            (product_id, movement_type, quantity, occurred_at, source_entity, source_id, created_at)
+        SELECT :p + g % :np, CASE WHEN g % 2 = 0 THEN 'IN' ELSE 'OUT' END,
+               CASE WHEN g % 2 = 0 THEN 5 ELSE -1 END,
+               now() - g * interval '1 second', 'PLAN', g::text, now() - g * interval '1 second'
+        FROM generate_series(1, :n) g
+    """), {"n": MOVEMENTS, "p": ids.product, "np": PRODUCTS})
+    db.execute(text("""
+        INSERT INTO product_costs (product_id, quantity, received_quantity, average_cost)
+        SELECT product_id, SUM(quantity), COALESCE(SUM(quantity) FILTER (WHERE quantity > 0), 0), 10 + product_id % 50
+        FROM inventory_movements
+        WHERE source_entity = 'PLAN'
+        GROUP BY product_id
+    """))
+    db.execute(text("""
+        INSERT INTO warehouse_balances (product_id, warehouse_id, quantity)
+        SELECT product_id, warehouse_id, SUM(quantity)
+        FROM inventory_movements
+        WHERE source_entity = 'PLAN'
+        GROUP BY product_id, warehouse_id
+    """))
+    db.execute(text("""
+        INSERT INTO cost_layer_consumptions
+            (product_id, movement_id, movement_type, consumed_at, quantity, unit_cost)
+        SELECT product_id, id, movement_type, occurred_at, -quantity, 10
+        FROM inventory_movements
+        WHERE source_entity = 'PLAN' AND quantity < 0
+    """))
+    db.execute(text("""
+        INSERT INTO lots
+            (product_id, warehouse_id, lot_number, expires_on, movement_id, received_at, quantity, remaining)
+        SELECT product_id, warehouse_id, 'L' || id, current_date + (id % 720) - 30, id, occurred_at,
+               quantity, CASE WHEN id % 3 = 0 THEN 0 ELSE quantity END
+        FROM inventory_movements
+        WHERE source_entity = 'PLAN' AND quantity > 0
+    """))
+    db.execute(text("""
+        INSERT INTO accounts_receivable (customer_id, source_entity, source_id, amount, due_date, status, created_at)
+        SELECT :c + g % :nc, 'ORDER', 'PLAN-' || g, 100, current_date + g % 30,
+               CASE WHEN g % 4 = 0 THEN 'PAID' ELSE 'OPEN' END, now() - g * interval '1 minute'
+        FROM generate_series(1, :n) g
+    """), {"n": RECEIVABLES, "c": ids.customer, "nc": CUSTOMERS})
+    db.execute(text("""
+        INSERT INTO accounts_payable (supplier_id, source_entity, source_id, amount, due_date, status, created_at)
+        SELECT :c + (g * 10) % :nc, 'PURCHASE', 'NFe35' || lpad(g::text, 42, '0'), 100, current_date + g % 30,
+               CASE WHEN g % 4 = 0 THEN 'PAID' ELSE 'OPEN' END, now() - g * interval '1 minute'
+        FROM generate_series(1, :n) g
+    """), {"n": PAYABLES, "c": ids.customer, "nc": CUSTOMERS})
+
+    for table in sorted(LARGE_TABLES):
+        db.execute(text(f"ANALYZE {table}"))
+
+    order_id = db.execute(text("SELECT min(id) FROM orders WHERE external_id LIKE 'PLAN-%'")).scalar()
+    return ids.customer, ids.product, order_id
+
+
+def call(endpoint, db, **kwargs):
+    """
+    Call an endpoint function directly: Query() defaults resolved,
+    the seeded session injected, auth dependencies skipped.
+    """
+    params = {}
+    for name, param in inspect.signature(endpoint).parameters.items():
+        default = param.default
+        if name in kwargs:
+            params[name] = kwargs[name]
+        elif name == "db":
+            params[name] = db
+        elif name == "response":
+            params[name] = Response()
+        elif isinstance(default, DependsParam):
+            params[name] = None
+        elif isinstance(default, FieldInfo):
+            params[name] = None if default.default is PydanticUndefined else default.default
+        else:
+            params[name] = default
+    return endpoint(**params)
+
+
+# Partitions below this many rows are read with a Seq Scan by design
+SMALL_RELATION_ROWS = 1000
+
+
+def small_relations(db) -> set[str]:
+    """
+    Analyzed tables with (almost) no rows, e.g. future monthly partitions:
+    a Seq Scan over them reads a page or two and is what the planner prefers.
+    """
+    return set(db.execute(
+        text("SELECT relname FROM pg_class WHERE relkind = 'r' AND reltuples BETWEEN 0 AND :rows"),
+        {"rows": SMALL_RELATION_ROWS},
+    ).scalars())
+
+
+def seq_scans(plan, ignore=frozenset()) -> list[str]:
+    """
+    Large relations read with a Seq Scan anywhere in the plan tree.
+    """
+    found = []
+    relation = plan.get("Relation Name")
+    if plan["Node Type"] == "Seq Scan" and relation and relation not in ignore and any(
+        relation == table or relation.startswith(f"{table}_")  # partitions
+        for table in LARGE_TABLES
+    ):
+        found.append(relation)
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child, ignore))
+    return found
+
+
+def main():
+    db = SessionLocal()
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    try:
+        customer_id, product_id, order_id = seed(db)
+        ean = db.execute(text("SELECT barcode FROM products WHERE id = :id"), {"id": product_id}).scalar()
+        nfe_digits = "35" + "1".zfill(42)
+        # Selective search terms (one matching row), as typed by users
+        name_token = hashlib.md5(b"12345").hexdigest()
+        small = small_relations(db)
+
+        checks = [
+            ("products.list_products", lambda: call(products.list_products, db)),
+            ("products.list_products?barcode", lambda: call(products.list_products, db, barcode=ean)),
+            ("products.list_products?q", lambda: call(products.list_products, db, q=name_token)),
+            ("products.list_products?search", lambda: call(products.list_products, db, search=name_token[:12])),
+            ("products.get_product", lambda: call(products.get_product, db, product_id=product_id)),
+            ("customers.list_customers", lambda: call(customers.list_customers, db)),
+            ("customers.list_customers?search", lambda: call(customers.list_customers, db, search="plan customer 12345")),
+            ("customers.get_customer", lambda: call(customers.get_customer, db, customer_id=customer_id)),
+            (
+                "customers.get_customer_by_document",
+                lambda: call(customers.get_customer_by_document, db, document="9" + "1".zfill(13)),
+            ),
+            ("orders.list_orders", lambda: call(orders.list_orders, db)),
+            ("orders.list_orders?customer_id", lambda: call(orders.list_orders, db, customer_id=customer_id)),
+            ("orders.list_orders?status", lambda: call(orders.list_orders, db, status="OPEN")),
+            ("orders.list_orders?include_items", lambda: call(orders.list_orders, db, include_items=True)),
+            ("orders.list_orders?archived", lambda: call(orders.list_orders, db, archived=True)),
+            ("orders.get_order", lambda: call(orders.get_order, db, order_id=order_id)),
+            ("inventory.get_stock_balance", lambda: call(inventory.get_stock_balance, db, product_id=product_id)),
+            ("inventory.list_stock", lambda: call(inventory.list_stock, db)),
+            ("inventory.list_stock?below", lambda: call(inventory.list_stock, db, below=0, active=True)),
+            ("inventory.list_stock?warehouse_id", lambda: call(inventory.list_stock, db, warehouse_id=1)),
+            (
+                "inventory.get_stock_balance?warehouse_id",
+                lambda: call(inventory.get_stock_balance, db, product_id=product_id, warehouse_id=1),
+            ),
+            (
+                "inventory.get_stock_by_warehouse",
+                lambda: call(inventory.get_stock_by_warehouse, db, product_id=product_id),
+            ),
+            ("inventory.get_inventory_valuation", lambda: call(inventory.get_inventory_valuation, db)),
+            ("inventory.get_product_lots", lambda: call(inventory.get_product_lots, db, product_id=product_id)),
+            ("inventory.get_stock_history", lambda: call(inventory.get_stock_history, db, product_id=product_id)),
+            (
+                "inventory.get_stock_history?warehouse_id",
+                lambda: call(inventory.get_stock_history, db, product_id=product_id, bucket="week", warehouse_id=1),
+            ),
+            ("inventory.list_expiring_lots", lambda: call(inventory.list_expiring_lots, db, days=30)),
+            (
+                "inventory.list_expiring_lots?warehouse_id",
+                lambda: call(inventory.list_expiring_lots, db, days=30, warehouse_id=1),
+            ),
+            (
+                "inventory.get_cost_of_goods_sold",
+                lambda: call(inventory.get_cost_of_goods_sold, db, date_from=date.today(), date_to=date.today()),
+            ),
+            (
+                "inventory.get_stock_balances",
+                lambda: inventory.get_stock_balances(
+                    InventoryBalancesRequest(
+                        product_ids=list(range(product_id, product_id + 200)),
+                        codes=["PLAN-10", "PLAN-20"],
+                        barcodes=[ean],
+                    ),
+                    db,
+                ),
+            ),
+            ("inventory.list_inventory_movements", lambda: call(inventory.list_inventory_movements, db)),
+            (
+                "inventory.list_inventory_movements?product_id",
+                lambda: call(inventory.list_inventory_movements, db, product_id=product_id),
+            ),
+            (
+                "inventory.count_resolve_products",
+                lambda: inventory._resolve_products(db, {"PLAN-10", "PLAN-20", ean}),
+            ),
+            ("inventory.count_balances", lambda: stock_balances(db, range(product_id, product_id + 50))),
+            (
+                "inventory.count_balances?warehouse_id",
+                lambda: stock_balances(db, range(product_id, product_id + 50), 1),
+            ),
+            (
+                "inventory.get_stock_balances?warehouse_id",
+                lambda: inventory.get_stock_balances(
+                    InventoryBalancesRequest(
+                        product_ids=list(range(product_id, product_id + 200)),
+                        warehouse_id=1,
+                    ),
+                    db,
+                ),
+            ),
+            ("receivables.list_receivables", lambda: call(receivables.list_receivables, db)),
+            (
+                "receivables.list_receivables?customer_id",
+                lambda: call(receivables.list_receivables, db, customer_id=customer_id),
+            ),
+            ("payables.list_payables", lambda: call(payables.list_payables, db)),
+            ("payables.list_payables?status", lambda: call(payables.list_payables, db, status="OPEN")),
+            ("search.products_by_barcode", lambda: search._products_by_barcode(db, ean, 5)),
+            ("search.orders_by_external_id", lambda: search._orders_by_external_id(db, "PLAN-10", 5)),
+            ("search.payables_by_nfe_key", lambda: search._payables_by_nfe_key(db, nfe_digits, 5)),
+        ]
+
+        failures = 0
+        event.listen(engine, "before_cursor_execute", capture)
+
+        for name, run in checks:
+            captured.clear()
+            run()
+            statements = list(captured)
+
+            scanned = []
+            for statement, parameters in statements:
+                plan = db.connection().exec_driver_sql(
+                    f"EXPLAIN (FORMAT JSON) {statement}", parameters
+                ).scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                scanned.extend(seq_scans(plan[0]["Plan"], small))
+
+            if not scanned:
+                status = "ok"
+            elif name.split("?")[0] in ALLOW_SEQ_SCAN:
+                status = f"allowed seq scan ({', '.join(sorted(set(scanned)))})"
+            else:
+                status = f"SEQ SCAN on {', '.join(sorted(set(scanned)))}"
+                failures += 1
+
+            print(f"{name:<50} {len(statements):>2} queries  {status}")
+
+        event.remove(engine, "before_cursor_execute", capture)
+
+        if failures:
+            print(f"\n{failures} endpoint(s) with sequential scans on large tables")
+            sys.exit(1)
+        print("\nAll plans use indexes")
+
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# scripts/bench/stress_stock_adjustments.py
+#
+# Concurrency stress test: stock counts vs order writes.
+#
+# - Creates scratch products + customer (tagged, removed at the end)
+# - ADJUSTERS threads post stock counts (create_inventory_adjustment)
+#   while WRITERS threads create orders on the same products
+#   (_insert_orders), each thread with its own session
+# - Checks every ADJUST movement: the running balance right after it
+#   (ledger ordered by id) must equal the quantity that was counted
+#
+# With the per-product locks (app.core.inventory) movement ids follow
+# the lock order, so any lost update shows up as a mismatch.
+# Exit code 1 on any mismatch.
+#
+# Usage (from the repository root):
+#   python -m scripts.bench.stress_stock_adjustments
+
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, UTC
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from app.core.database import SessionLocal
+from app.models.customer import Customer
+from app.models.product import Product
+from app.api.v1.inventory import create_inventory_adjustment
+from app.api.v1.orders import _insert_orders
+from app.api.v1.schemas import OrderCreate
+
+PRODUCTS = 3
+ADJUSTERS = 8
+WRITERS = 8
+ROUNDS = 40  # per thread
+
+
+def setup(tag: str) -> tuple[int, list[int]]:
+    db = SessionLocal()
+    try:
+        customer = Customer(name=f"STRESS {tag}", type="customer", active=True)
+        products = [
+            Product(
+                code=f"STRESS-{tag}-{i}",
+                name=f"STRESS {tag} {i}",
+                description="Stress test product",
+                unit="PC",
+                active=True,
+            )
+            for i in range(PRODUCTS)
+        ]
+        db.add(customer)
+        db.add_all(products)
+        db.commit()
+        return customer.id, [p.id for p in products]
+    finally:
+        db.close()
+
+
+def cleanup(tag: str, customer_id: int, product_ids: list[int]) -> None:
+    db = SessionLocal()
+    try:
+        params = {"tag": f"STRESS-{tag}", "ids": product_ids, "customer": customer_id}
+        db.execute(text("DELETE FROM inventory_movements WHERE product_id = ANY(:ids)"), params)
+        db.execute(text("DELETE FROM product_costs WHERE product_id = ANY(:ids)"), params)
+        db.execute(text("DELETE FROM cost_layer_consumptions WHERE product_id = ANY(:ids)"), params)
+        db.execute(text("DELETE FROM cost_layers WHERE product_id = ANY(:ids)"), params)
+        db.execute(text("DELETE FROM warehouse_balances WHERE product_id = ANY(:ids)"), params)
+        db.execute(text("DELETE FROM lot_allocations WHERE product_id = ANY(:ids)"), params)
+        db.execute(text("DELETE FROM lots WHERE product_id = ANY(:ids)"), params)
+        db.execute(text("DELETE FROM stock_reservations WHERE product_id = ANY(:ids)"), params)
+        db.execute(text("DELETE FROM accounts_receivable WHERE customer_id = :customer"), params)
+        db.execute(text("DELETE FROM order_items WHERE product_id = ANY(:ids)"), params)
+        db.execute(text("DELETE FROM orders WHERE external_id = :tag"), params)
+        db.execute(text("DELETE FROM products WHERE id = ANY(:ids)"), params)
+        db.execute(text("DELETE FROM customers WHERE id = :customer"), params)
+        db.commit()
+    finally:
+        db.close()
+
+
+def adjuster(product_ids, counts, errors):
+    db = SessionLocal()
+    rng = random.Random()
+    try:
+        for _ in range(ROUNDS):
+            product_id = rng.choice(product_ids)
+            counted = rng.randint(0, 500)
+            result = create_inventory_adjustment(product_id=product_id, counted_quantity=counted, db=db)
+            counts.append((product_id, result["movement_id"], counted))
+    except Exception as exc:  # report, do not hang the other threads
+        errors.append(repr(exc))
+    finally:
+        db.close()
+
+
+def writer(tag, customer_id, product_ids, done, errors):
+    db = SessionLocal()
+    rng = random.Random()
+    try:
+        for _ in range(ROUNDS):
+            # Several products per order, in random order (lock ordering)
+            lines = rng.sample(product_ids, rng.randint(1, len(product_ids)))
+            payload = OrderCreate(
+                external_id=f"STRESS-{tag}",
+                customer_id=customer_id,
+                issued_at=datetime.now(UTC),
+                status="CONFIRMED",  # stock OUT (OPEN would only reserve)
+                total_amount=Decimal("1.00") * len(lines),
+                items=[
+                    {"product_id": p, "quantity": Decimal(rng.randint(1, 5)),
+                     "unit_price": Decimal("1.00"), "total_price": Decimal("1.00")}
+                    for p in lines
+                ],
+            )
+            _insert_orders(db, [payload])
+            db.commit()
+            done.append(1)
+    except Exception as exc:
+        db.rollback()
+        errors.append(repr(exc))
+    finally:
+        db.close()
+
+
+def verify(product_ids, counts) -> int:
+    """
+    Mismatches between counted quantities and the ledger running balance.
+    """
+    counted = {(product_id, movement_id): value for product_id, movement_id, value in counts}
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            text("""
+                SELECT product_id, id, movement_type,
+                       SUM(quantity) OVER (PARTITION BY product_id ORDER BY id) AS running
+                FROM inventory_movements
+                WHERE product_id = ANY(:ids)
+                ORDER BY product_id, id
+            """),
+            {"ids": product_ids},
+        ).all()
+    finally:
+        db.close()
+
+    mismatches = 0
+    for row in rows:
+        if row.movement_type != "ADJUST":
+            continue
+        expected = counted[(row.product_id, row.id)]
+        if row.running != expected:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"  product {row.product_id} movement {row.id}: counted {expected}, ledger {row.running}")
+    return mismatches
+
+
+def main():
+    tag = uuid.uuid4().hex[:8]
+    customer_id, product_ids = setup(tag)
+    counts, orders, errors = [], [], []
+
+    try:
+        threads = [
+            threading.Thread(target=adjuster, args=(product_ids, counts, errors))
+            for _ in range(ADJUSTERS)
+        ] + [
+            threading.Thread(target=writer, args=(tag, customer_id, product_ids, orders, errors))
+            for _ in range(WRITERS)
+        ]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        print(f"{len(counts)} counts + {len(orders)} orders on {PRODUCTS} products in {elapsed:.2f}s "
+              f"({(len(counts) + len(orders)) / elapsed:.0f} tx/s)")
+
+        mismatches = verify(product_ids, counts)
+
+    finally:
+        cleanup(tag, customer_id, product_ids)
+
+    if errors:
+        print(f"\n{len(errors)} thread error(s), first: {errors[0]}")
+        sys.exit(1)
+    if mismatches:
+        print(f"\n{mismatches} adjustment(s) computed against a stale balance")
+        sys.exit(1)
+    print("\nAll adjustments match the ledger")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,10 @@ SOURCE_ENTITY = "suppliers"
 
 
 def normalize_doc(value: str) -> str:
-    # Keep only digits (CPF/CNPJ)
-    return "".join(c for c in value if c.isdigit()) if value else ""
+    # Keep only digits (CPF/CNPJ); anything that is not 11 / 14 digits
+    # is rejected, same rule as customers.document_normalized
+    digits = "".join(c for c in value if c.isdigit()) if value else ""
+    return digits if len(digits) in (11, 14) else ""
 
 
 def build_phone(ddd, phone):
@@ -49,9 +51,9 @@ def main():
             if not document:
                 continue
 
-            # Check if already exists in customers
+            # Check if already exists in customers (any stored format)
             cur.execute(
-                "SELECT 1 FROM customers WHERE document = %s",
+                "SELECT 1 FROM customers WHERE document_normalized = %s",
                 (document,),
             )
             if cur.fetchone():
@@ -15,6 +15,8 @@ SOURCE_SYSTEM = "cmsys"
 # - Keep only digits
 # - CPF => 11 digits
 # - CNPJ => 14 digits
+# Same rule as customers.document_normalized
+# (app/core/documents.py)
 # ---------------------------------------------------------
 def normalize_document(value: str | None) -> str | None:
     if not value:
@@ -85,7 +87,7 @@ def main():
             # 2) FIND CUSTOMER IN CORE BY DOCUMENT
             # -----------------------------------------------
             cur.execute(
-                "SELECT id FROM customers WHERE document = %s",
+                "SELECT id FROM customers WHERE document_normalized = %s",
                 (document,),
             )
             row = cur.fetchone()
@@ -146,7 +148,7 @@ def main():
                     active
                 )
                 VALUES (%s,%s,%s,%s,%s,%s,%s,TRUE)
-                RETURNING id
+                RETURNING id, issued_at
             """, (
                 str(nr_pedido),
                 customer_id,
@@ -156,7 +158,7 @@ def main():
                 Decimal(h.get("Pc_Desc_Concedido") or 0),
                 h.get("Ds_Obs"),
             ))
-            order_id = cur.fetchone()[0]
+            order_id, issued_at = cur.fetchone()
 
             # -----------------------------------------------
             # 5) CREATE ORDER ITEMS (CORE)
@@ -165,6 +167,7 @@ def main():
                 cur.execute("""
                     INSERT INTO order_items (
                         order_id,
+                        order_issued_at,
                         product_id,
                         quantity,
                         unit_price,
@@ -172,9 +175,10 @@ def main():
                         total_price,
                         notes
                     )
-                    VALUES (%s,%s,%s,%s,%s,%s,%s)
+                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
                 """, (
                     order_id,
+                    issued_at,
                     it.get("Cd_Produto"),
                     Decimal(it.get("Qt_Pedida") or 0),
                     Decimal(it.get("Vl_Unitario_Venda") or 0),
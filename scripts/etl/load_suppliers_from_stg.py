@@ -12,8 +12,12 @@ def normalize_doc(value: str) -> str:
     """
     Normalize CPF/CNPJ to digits only.
     Keeps comparison stable between legacy and core.
+
+    Same rule as customers.document_normalized: only 11 (CPF) or
+    14 (CNPJ) digits are documents, anything else becomes "".
     """
-    return "".join(c for c in value if c.isdigit()) if value else ""
+    digits = "".join(c for c in value if c.isdigit()) if value else ""
+    return digits if len(digits) in (11, 14) else ""
 
 
 def main():
@@ -34,49 +38,26 @@ def main():
             (SOURCE_SYSTEM, SOURCE_ENTITY),
         )
 
-        supplier_docs = {
-            normalize_doc(r[0]) for r in pg_cur.fetchall() if r[0]
-        }
+        supplier_docs = sorted(
+            {normalize_doc(r[0]) for r in pg_cur.fetchall() if r[0]} - {""}
+        )
 
         # ---------------------------------------------------------
-        # 2) Fetch all customers from core
+        # 2) Promote customers to supplier (idempotent)
         # ---------------------------------------------------------
+        # One set-based UPDATE resolved through the unique
+        # document_normalized index (no full scan of customers).
+        # "supplier" / "both" are left as they are.
         pg_cur.execute(
             """
-            SELECT id, document, type
-            FROM customers
-            """
+            UPDATE customers
+            SET type = 'supplier'
+            WHERE document_normalized = ANY(%s)
+              AND type = 'customer'
+            """,
+            (supplier_docs,),
         )
-
-        customers = pg_cur.fetchall()
-
-        updated = 0
-
-        # ---------------------------------------------------------
-        # 3) Promote customers to supplier / both (idempotent)
-        # ---------------------------------------------------------
-        for customer_id, document, current_type in customers:
-            doc = normalize_doc(document)
-
-            if doc not in supplier_docs:
-                continue
-
-            # Decide new type
-            if current_type == "customer":
-                new_type = "supplier"
-            else:
-                new_type = current_type  # supplier or both already
-
-            if new_type != current_type:
-                pg_cur.execute(
-                    """
-                    UPDATE customers
-                    SET type = %s
-                    WHERE id = %s
-                    """,
-                    (new_type, customer_id),
-                )
-                updated += 1
+        updated = pg_cur.rowcount
 
         pg_conn.commit()
         print(f"[OK] Suppliers promoted | updated={updated}")
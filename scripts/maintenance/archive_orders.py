@@ -0,0 +1,39 @@
+# scripts/maintenance/archive_orders.py
+#
+# Move CLOSED / CANCELED orders (and their items) issued before the
+# horizon into the cold archive partitions (app.core.archive).
+# Safe to run at any time (e.g. nightly cron); moves in small batches.
+#
+# Usage (from the repository root):
+#   python -m scripts.maintenance.archive_orders
+#   python -m scripts.maintenance.archive_orders --horizon-days 180
+
+import argparse
+
+from app.core.archive import archive_cutoff, archive_orders
+from app.core.database import SessionLocal
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive finished orders")
+    parser.add_argument(
+        "--horizon-days",
+        type=int,
+        default=None,
+        help="Archive orders issued more than N days ago (default: ORDER_ARCHIVE_HORIZON_DAYS)",
+    )
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    cutoff = archive_cutoff(args.horizon_days)
+
+    db = SessionLocal()
+    try:
+        moved = archive_orders(db, cutoff, batch_size=args.batch_size)
+        print(f"[OK] {moved} orders issued before {cutoff:%Y-%m-%d} archived")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
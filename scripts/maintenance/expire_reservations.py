@@ -0,0 +1,33 @@
+# scripts/maintenance/expire_reservations.py
+#
+# Expire stock reservations of DRAFT / OPEN orders older than their TTL
+# (RESERVATION_TTL_HOURS) and release them from the reserved counters.
+# Safe to run at any time (e.g. every few minutes from cron): works in
+# small batches, one commit each, skipping reservations locked by an
+# order being confirmed or canceled (picked up by the next run).
+#
+# Usage (from the repository root):
+#   python -m scripts.maintenance.expire_reservations
+#   python -m scripts.maintenance.expire_reservations --batch-size 500
+
+import argparse
+
+from app.core.database import SessionLocal
+from app.core.reservations import expire_reservations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Expire stale stock reservations")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        expired = expire_reservations(db, batch_size=args.batch_size)
+        print(f"[OK] {expired} reservations expired")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
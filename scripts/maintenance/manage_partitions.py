@@ -0,0 +1,71 @@
+# scripts/maintenance/manage_partitions.py
+#
+# Monthly partition upkeep for the partitioned ledgers
+# (app.core.partitions.PARTITIONED_TABLES) and the hot order partitions
+# (app.core.archive).
+#
+# - Creates the current month + the next --ahead months (default 3),
+#   moving any rows that already landed in the DEFAULT partition
+# - Optionally detaches (or drops, with --drop) months ending on or
+#   before --detach-before YYYY-MM. Only empty months: if any of them
+#   still holds movements nothing is detached and the script exits 1
+#   (balances are sums over the whole ledger)
+#
+# Safe to run at any time (e.g. daily cron): existing partitions are kept.
+#
+# Usage (from the repository root):
+#   python -m scripts.maintenance.manage_partitions
+#   python -m scripts.maintenance.manage_partitions --ahead 6
+#   python -m scripts.maintenance.manage_partitions --detach-before 2023-01 [--drop]
+
+import argparse
+import sys
+from datetime import datetime
+
+from app.core.archive import ensure_order_partitions
+from app.core.database import SessionLocal
+from app.core.partitions import PARTITIONED_TABLES, detach_partitions_before, ensure_partitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create / detach monthly partitions")
+    parser.add_argument("--ahead", type=int, default=3, help="Months to create ahead of the current one")
+    parser.add_argument("--detach-before", help="Detach months ending on or before YYYY-MM")
+    parser.add_argument("--drop", action="store_true", help="Drop detached partitions instead of keeping them")
+    args = parser.parse_args()
+
+    cutoff = None
+    if args.detach_before:
+        cutoff = datetime.strptime(args.detach_before, "%Y-%m").date()
+
+    db = SessionLocal()
+    try:
+        for table, column in PARTITIONED_TABLES.items():
+            created = ensure_partitions(db, table, column, months_ahead=args.ahead)
+            print(f"[OK] {table}: {len(created)} partitions created {created or ''}")
+
+        created = ensure_order_partitions(db, months_ahead=args.ahead)
+        print(f"[OK] orders (hot): {len(created)} partitions created {created or ''}")
+
+        db.commit()
+
+        if cutoff is not None:
+            for table in PARTITIONED_TABLES:
+                try:
+                    removed = detach_partitions_before(db, table, cutoff, drop=args.drop)
+                except ValueError as exc:
+                    db.rollback()
+                    print(f"[FAIL] {table}: {exc}")
+                    sys.exit(1)
+                action = "dropped" if args.drop else "detached"
+                print(f"[OK] {table}: {len(removed)} partitions {action} {removed or ''}")
+                db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
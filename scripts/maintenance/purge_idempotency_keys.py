@@ -0,0 +1,23 @@
+# scripts/maintenance/purge_idempotency_keys.py
+#
+# Delete expired Idempotency-Key records (TTL = IDEMPOTENCY_TTL_HOURS).
+# Safe to run at any time (e.g. hourly cron); deletes in small batches.
+#
+# Usage (from the repository root):
+#   python -m scripts.maintenance.purge_idempotency_keys
+
+from app.core.database import SessionLocal
+from app.core.idempotency import purge_expired
+
+
+def main():
+    db = SessionLocal()
+    try:
+        removed = purge_expired(db)
+        print(f"[OK] {removed} expired idempotency keys removed")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
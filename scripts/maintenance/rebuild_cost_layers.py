@@ -0,0 +1,79 @@
+# scripts/maintenance/rebuild_cost_layers.py
+#
+# Regenerate the FIFO cost layers and their consumptions by replaying
+# the inventory ledger (app.core.cost_layers), e.g. after a historical
+# import wrote movements directly.
+#
+# Products are split into chunks processed by parallel workers, each
+# with its own session. A chunk is locked exclusively (like a stock
+# count), replayed and committed on its own: products never share
+# layers, so chunks are independent and the API can keep running.
+#
+# Usage (from the repository root):
+#   python -m scripts.maintenance.rebuild_cost_layers
+#   python -m scripts.maintenance.rebuild_cost_layers --workers 8 --chunk-size 200
+#   python -m scripts.maintenance.rebuild_cost_layers --product-id 42
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import select
+
+from app.core.cost_layers import rebuild_cost_layers
+from app.core.database import SessionLocal
+from app.core.inventory import lock_products_exclusive
+from app.models.product import Product
+
+
+def rebuild_chunk(product_ids: list[int]) -> tuple[int, int]:
+    db = SessionLocal()
+    try:
+        lock_products_exclusive(db, product_ids)
+        written = rebuild_cost_layers(db, product_ids)
+        db.commit()
+        return written
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild FIFO cost layers from the ledger")
+    parser.add_argument("--product-id", type=int, action="append", default=None,
+                        help="Only this product (repeatable; default: all products)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    if args.product_id:
+        product_ids = sorted(set(args.product_id))
+    else:
+        db = SessionLocal()
+        try:
+            product_ids = db.execute(select(Product.id).order_by(Product.id)).scalars().all()
+        finally:
+            db.close()
+
+    chunks = [
+        product_ids[start:start + args.chunk_size]
+        for start in range(0, len(product_ids), args.chunk_size)
+    ]
+
+    start = time.perf_counter()
+    layers = consumptions = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for chunk_layers, chunk_consumptions in pool.map(rebuild_chunk, chunks):
+            layers += chunk_layers
+            consumptions += chunk_consumptions
+
+    print(
+        f"[OK] {len(product_ids)} products in {len(chunks)} chunks: "
+        f"{layers} layers, {consumptions} consumptions ({time.perf_counter() - start:.1f}s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# scripts/maintenance/rebuild_product_costs.py
+#
+# Recompute product_costs (quantity + moving weighted-average cost)
+# by replaying the inventory ledger (app.core.valuation).
+#
+# Needed after movements were written outside post_movements (legacy
+# ETL: scripts/etl/load_inventory_from_stg.py,
+# scripts/xml/promote_purchase_in.py) or to audit the running values.
+# Products are processed in chunks, each chunk locked exclusively
+# (like a stock count) and committed on its own: safe while the API runs.
+#
+# Usage (from the repository root):
+#   python -m scripts.maintenance.rebuild_product_costs
+#   python -m scripts.maintenance.rebuild_product_costs --product-id 42 --product-id 43
+
+import argparse
+
+from sqlalchemy import select
+
+from app.core.database import SessionLocal
+from app.core.inventory import lock_products_exclusive
+from app.core.valuation import rebuild_product_costs
+from app.models.product import Product
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild product costs from the ledger")
+    parser.add_argument("--product-id", type=int, action="append", default=None,
+                        help="Only this product (repeatable; default: all products)")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        product_ids = args.product_id or db.execute(
+            select(Product.id).order_by(Product.id)
+        ).scalars().all()
+
+        valued = 0
+        for start in range(0, len(product_ids), args.chunk_size):
+            chunk = product_ids[start:start + args.chunk_size]
+            lock_products_exclusive(db, chunk)
+            valued += rebuild_product_costs(db, chunk)
+            db.commit()
+
+        print(f"[OK] {valued} of {len(product_ids)} products valued from the ledger")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
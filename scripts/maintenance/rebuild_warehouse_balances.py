@@ -0,0 +1,51 @@
+# scripts/maintenance/rebuild_warehouse_balances.py
+#
+# Recompute warehouse_balances (stock per product and warehouse) from
+# the inventory ledger (app.core.inventory).
+#
+# Needed after movements were written outside post_movements (legacy
+# ETL: scripts/etl/load_inventory_from_stg.py,
+# scripts/xml/promote_purchase_in.py) or to audit the projection.
+# Products are processed in chunks, each chunk locked exclusively
+# (like a stock count) and committed on its own: safe while the API runs.
+#
+# Usage (from the repository root):
+#   python -m scripts.maintenance.rebuild_warehouse_balances
+#   python -m scripts.maintenance.rebuild_warehouse_balances --product-id 42
+
+import argparse
+
+from sqlalchemy import select
+
+from app.core.database import SessionLocal
+from app.core.inventory import lock_products_exclusive, rebuild_warehouse_balances
+from app.models.product import Product
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild per-warehouse balances from the ledger")
+    parser.add_argument("--product-id", type=int, action="append", default=None,
+                        help="Only this product (repeatable; default: all products)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        product_ids = args.product_id or db.execute(
+            select(Product.id).order_by(Product.id)
+        ).scalars().all()
+
+        written = 0
+        for start in range(0, len(product_ids), args.chunk_size):
+            chunk = product_ids[start:start + args.chunk_size]
+            lock_products_exclusive(db, chunk)
+            written += rebuild_warehouse_balances(db, chunk)
+            db.commit()
+
+        print(f"[OK] {written} (product, warehouse) balances rebuilt for {len(product_ids)} products")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
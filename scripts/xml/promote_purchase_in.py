@@ -15,7 +15,7 @@ def promote_purchase_in(matched_items, source_id: str):
     """
     Create inventory IN movements from matched XML items.
 
-    - matched_items: list with product_id, quantity
+    - matched_items: list with product_id, quantity, unit_price
     - source_id: invoice identifier (e.g., NF-e key)
     """
 
@@ -30,16 +30,18 @@ def promote_purchase_in(matched_items, source_id: str):
                     product_id,
                     movement_type,
                     quantity,
+                    unit_cost,
                     occurred_at,
                     source_entity,
                     source_id
                 )
-                VALUES (%s, %s, %s, %s, %s, %s)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
                 """,
                 (
                     item["product_id"],
                     "IN",
                     Decimal(item["quantity"]),
+                    Decimal(item["unit_price"]) if item.get("unit_price") else None,
                     datetime.now(UTC),
                     SOURCE_ENTITY,
                     source_id,
@@ -47,6 +49,8 @@ def promote_purchase_in(matched_items, source_id: str):
             )
 
         pg.commit()
+        # Raw inserts bypass product_costs: run
+        # scripts/maintenance/rebuild_product_costs.py afterwards
         print("[OK] Purchase IN movements created")
 
     except Exception:
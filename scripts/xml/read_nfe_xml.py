@@ -40,6 +40,17 @@ def read_nfe_xml(path: str):
         if prod is None:
             continue
 
+        # Lot / expiry tracking (rastro: one element per lot, optional)
+        lots = [
+            {
+                "lot_number": rastro.findtext("nfe:nLote", default="", namespaces=ns),
+                "quantity": rastro.findtext("nfe:qLote", default="0", namespaces=ns),
+                "manufactured_on": rastro.findtext("nfe:dFab", default=None, namespaces=ns),
+                "expires_on": rastro.findtext("nfe:dVal", default=None, namespaces=ns),
+            }
+            for rastro in prod.findall("nfe:rastro", ns)
+        ]
+
         items.append(
             {
                 "ean": prod.findtext("nfe:cEAN", default=None, namespaces=ns),
@@ -48,6 +59,7 @@ def read_nfe_xml(path: str):
                 "quantity": prod.findtext("nfe:qCom", default="0", namespaces=ns),
                 "unit_price": prod.findtext("nfe:vUnCom", default="0", namespaces=ns),
                 "description": prod.findtext("nfe:xProd", default="", namespaces=ns),
+                "lots": lots,
             }
         )
 